@@ -1,7 +1,15 @@
 import re
 import string
+import sys
+from pathlib import Path
 import emoji
-from textblob import TextBlob
+
+# Make the Scriptss package importable when run as `python Scriptss/CleanNPreprocess.py`
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from Scriptss.normalizer import Normalizer
+from Scriptss.spell import default_corrector
 
 # Dictionary of English contractions
 contractions_dict = {
@@ -128,6 +136,12 @@ contractions_dict = {
     "you've": "you have"
 }
 
+# Compiled once; same output as expand_contractions -> ... -> normalize_elongated_words below
+normalizer = Normalizer(
+    contractions_dict, fix_im=True, keep_first_char=True, strip_apostrophes=True,
+    remove_punctuation=True, demojize=True,
+)
+
 def expand_contractions(text):
     """
     Expands contractions in a text string.
@@ -180,22 +194,17 @@ def normalize_elongated_words(text):
 
 def correct_spelling(text):
     """
-    Uses TextBlob to correct common spelling mistakes.
-    Caution: This might incorrectly "fix" intentional slang.
+    Corrects common spelling mistakes with the symmetric-delete index in spell.py.
+    Slang seen on the informal side of our data is left as it is.
     """
-    # Use TextBlob for spelling correction
-    text_blob = TextBlob(text)
-    return str(text_blob.correct())
+    return default_corrector().correct(text)
 
 def preprocess_text(text):
     """
     A pipeline function that applies all the preprocessing steps in order.
+    The steps before spelling correction run as one compiled normalizer.
     """
-    text = expand_contractions(text)
-    text = normalize_case(text)
-    text = remove_punctuation(text)
-    text = handle_emojis(text)
-    text = normalize_elongated_words(text)
+    text = normalizer.normalize(text)
     # Spelling correction is last as it's computationally more expensive
     # and works best on cleaner text.
     text = correct_spelling(text)
@@ -0,0 +1,147 @@
+"""
+Request-coalescing scheduler for the translation model.
+
+Callers submit one prompt at a time and get a Future back. A single worker
+thread drains up to `max_batch_size` prompts from the queue (waiting at most
+`max_wait_ms` after the first one arrives), runs one batched call and hands
+every caller its own result.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from Scriptss.metrics import record
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler queue is at capacity."""
+
+
+class BatchStats:
+    """Running batch-fill and queue-wait statistics for a MicroBatcher."""
+
+    def __init__(self, max_batch_size, window=1000):
+        self.max_batch_size = max_batch_size
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = [0] * (max_batch_size + 1)
+        self.recent_waits = deque(maxlen=window)
+        self.total_wait = 0.0
+
+    def record_batch(self, waits):
+        with self.lock:
+            self.batches += 1
+            self.items += len(waits)
+            self.batch_sizes[len(waits)] += 1
+            self.recent_waits.extend(waits)
+            self.total_wait += sum(waits)
+
+    def snapshot(self):
+        with self.lock:
+            waits = sorted(self.recent_waits)
+            batches, items = self.batches, self.items
+            sizes = list(self.batch_sizes)
+            total_wait = self.total_wait
+
+        def percentile(p):
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p / 100 * len(waits)))]
+
+        return {
+            "batches": batches,
+            "requests": items,
+            "avg_batch_size": items / batches if batches else 0.0,
+            "batch_fill": items / (batches * self.max_batch_size) if batches else 0.0,
+            "batch_size_histogram": {str(size): n for size, n in enumerate(sizes) if n},
+            "queue_wait_ms": {
+                "avg": 1000 * total_wait / items if items else 0.0,
+                "p50": 1000 * percentile(50),
+                "p99": 1000 * percentile(99),
+            },
+        }
+
+
+class MicroBatcher:
+    """Coalesces single prompts into batched calls of `batch_fn`.
+
+    `batch_fn` takes a list of prompts and must return a list of results of
+    the same length and order.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=10, max_queue_size=64):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.stats = BatchStats(max_batch_size)
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Start the worker thread (no-op if it is already running)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Ask the worker to exit once the current batch is done."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, prompt):
+        """Queue a prompt and return a Future resolving to its result."""
+        future = Future()
+        try:
+            self.queue.put_nowait((prompt, future, time.perf_counter()))
+        except queue.Full:
+            raise QueueFullError(f"Request queue is full ({self.queue.maxsize} pending)")
+        return future
+
+    def _collect_batch(self):
+        """Block for the first item, then fill the batch until full or the wait expires."""
+        try:
+            batch = [self.queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect_batch()
+            # Drop requests whose caller already gave up
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            waits = [started - enqueued for _, _, enqueued in batch]
+            self.stats.record_batch(waits)
+            for wait in waits:
+                record("queue_wait", wait)
+
+            prompts = [prompt for prompt, _, _ in batch]
+            try:
+                results = self.batch_fn(prompts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
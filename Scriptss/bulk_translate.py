@@ -0,0 +1,188 @@
+"""
+Offline bulk translation of a corpus.
+
+Sentences are streamed from a CSV or JSONL file (or stdin, one sentence per
+line), so only one window of them is in memory at a time. Each window is
+queued on the generation engine shortest-first: sequences decoded together
+then have similar lengths and waste little padding. Results are appended to a
+JSONL file in input order, and after every window a checkpoint records how
+many input records are done and how many bytes of output are valid. A killed
+run started again with the same arguments resumes from there.
+
+Usage:
+    python Scriptss/bulk_translate.py Dataa/raw_data_fixed.csv translations.jsonl
+    cat sentences.txt | python Scriptss/bulk_translate.py - translations.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+
+# Make the Scriptss package importable when run as `python Scriptss/bulk_translate.py`
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from Scriptss.infer import load_model, translation_cache
+from Scriptss.prompts import build_prompt
+
+# Source column, in order of preference, when --column is not given
+DEFAULT_COLUMNS = ("formal_text", "formal_text_cleaned", "text")
+
+
+# --- Input ---
+
+def detect_format(path):
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".jsonl", ".json"):
+        return "jsonl"
+    return "text"
+
+
+def pick_column(fields, column):
+    if column:
+        return column
+    for candidate in DEFAULT_COLUMNS:
+        if candidate in fields:
+            return candidate
+    raise ValueError(f"No formal text column found in {sorted(fields)}; pass --column")
+
+
+def read_sentences(stream, fmt, column=None):
+    """Yields one sentence per input record, lazily."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream, skipinitialspace=True)
+        column = pick_column(reader.fieldnames or [], column)
+        for row in reader:
+            yield (row.get(column) or "").strip()
+    elif fmt == "jsonl":
+        for line in stream:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            column = column or pick_column(record, None)
+            yield str(record.get(column) or "").strip()
+    else:
+        for line in stream:
+            yield line.strip()
+
+
+# --- Checkpointing ---
+
+def load_checkpoint(path):
+    if not path.exists():
+        return {"next_index": 0, "output_bytes": 0}
+    return json.loads(path.read_text())
+
+
+def save_checkpoint(path, next_index, output_bytes):
+    # Write then rename, so a crash never leaves a half-written checkpoint
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"next_index": next_index, "output_bytes": output_bytes}))
+    os.replace(tmp, path)
+
+
+# --- Translation ---
+
+def translate_window(engine, sentences):
+    """Translates one window of sentences; returns their translations in input order."""
+    settings = engine.generation_settings()
+    results = [None] * len(sentences)
+    futures = {}
+    for i, text in enumerate(sentences):
+        if not text:
+            results[i] = ""
+            continue
+        cached = translation_cache.get(text, settings)
+        if cached is not None:
+            results[i] = cached
+
+    # Queue shortest first so each decode step batches sequences of similar length
+    pending = sorted((i for i, r in enumerate(results) if r is None), key=lambda i: len(sentences[i]))
+    for i in pending:
+        futures[i] = engine.submit(build_prompt(sentences[i]))
+    for i, future in futures.items():
+        results[i] = future.result()
+        translation_cache.put(sentences[i], settings, results[i])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV, JSONL or text file; '-' reads one sentence per line from stdin")
+    parser.add_argument("output", help="JSONL file to append translations to")
+    parser.add_argument("--format", choices=["csv", "jsonl", "text"], help="input format (default: from extension)")
+    parser.add_argument("--column", help=f"field holding the formal text (default: first of {DEFAULT_COLUMNS})")
+    parser.add_argument("--window", type=int, default=64, help="sentences read, sorted and queued at a time")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint and start over")
+    args = parser.parse_args()
+
+    output_path = Path(args.output)
+    checkpoint_path = output_path.with_name(output_path.name + ".ckpt")
+    if args.restart:
+        checkpoint_path.unlink(missing_ok=True)
+    checkpoint = load_checkpoint(checkpoint_path)
+    if not checkpoint_path.exists() and output_path.exists() and output_path.stat().st_size and not args.restart:
+        print(f"{output_path} exists but has no checkpoint; pass --restart to overwrite it.")
+        return
+
+    engine, _ = load_model()
+    if engine is None:
+        print("Failed to load model. Exiting.")
+        return
+    # A window must fit in the engine queue, which rejects rather than blocks
+    window = max(1, min(args.window, engine.queue.maxsize))
+
+    fmt = args.format or ("text" if args.input == "-" else detect_format(args.input))
+    stream = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    sentences = read_sentences(stream, fmt, args.column)
+
+    index = checkpoint["next_index"]
+    if index:
+        print(f"Resuming at record {index} ({checkpoint['output_bytes']} bytes of output kept)")
+        for _ in islice(sentences, index):
+            pass
+
+    # Drop anything written after the last checkpoint, e.g. by a run killed mid-window
+    with open(output_path, "a", encoding="utf-8") as out:
+        out.truncate(checkpoint["output_bytes"])
+
+    started = time.perf_counter()
+    tokens_before = engine.tokens_generated
+    translated = 0
+    with open(output_path, "a", encoding="utf-8") as out:
+        while True:
+            batch = list(islice(sentences, window))
+            if not batch:
+                break
+            for offset, (formal, informal) in enumerate(zip(batch, translate_window(engine, batch))):
+                record = {"index": index + offset, "formal": formal, "informal": informal}
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            index += len(batch)
+            translated += len(batch)
+            save_checkpoint(checkpoint_path, index, out.tell())
+
+            elapsed = time.perf_counter() - started
+            tokens = engine.tokens_generated - tokens_before
+            print(f"{index} records done | {translated / elapsed:.2f} sentences/s | {tokens / elapsed:.1f} tokens/s")
+
+    if stream is not sys.stdin:
+        stream.close()
+    engine.stop()
+
+    elapsed = time.perf_counter() - started
+    tokens = engine.tokens_generated - tokens_before
+    print(f"\nTranslated {translated} records in {elapsed:.1f}s "
+          f"({translated / elapsed if elapsed else 0:.2f} sentences/s, {tokens / elapsed if elapsed else 0:.1f} tokens/s)")
+    print(f"Output: {output_path} (checkpoint: {checkpoint_path})")
+
+
+if __name__ == "__main__":
+    main()
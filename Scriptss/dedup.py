@@ -0,0 +1,278 @@
+"""
+Exact and near-duplicate removal for the cleaned training pairs.
+
+Pairs are grouped by their formal side. Formal texts that are equal once
+lowercased and stripped of punctuation and extra whitespace are exact
+duplicates. The remaining distinct texts are MinHashed over byte
+5-grams and bucketed with LSH (banded signatures): texts sharing a bucket in
+any band are candidates, and candidates whose estimated Jaccard similarity
+reaches the threshold join the earliest such text's cluster. Everything but
+that last step is hashing, sorting and NumPy, and it only visits candidate
+pairs, so the cost grows roughly linearly with the number of rows.
+
+One pair is kept per cluster, the one whose informal side is non-empty,
+differs from the formal side and is the most common variant in the cluster
+(earliest row on ties). Clusters without any usable informal side are
+dropped. Kept rows stay in their original order.
+
+    python Scriptss/dedup.py --input Dataa/cleaned_data.csv --output Dataa/deduped_data.csv
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Make the Scriptss package importable when run as `python Scriptss/dedup.py`
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+DEFAULT_INPUT_PATH = "Dataa/cleaned_data.csv"
+DEFAULT_OUTPUT_PATH = "Dataa/deduped_data.csv"
+DEFAULT_REPORT_PATH = "Dataa/dedup_report.json"
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 16
+THRESHOLD = 0.85
+
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+
+
+def normalize_key(text):
+    """The text duplicates are compared on: lowercase, no punctuation, single spaces."""
+    return " ".join(PUNCTUATION_PATTERN.sub("", text.lower()).split())
+
+
+def shingles(texts, size=SHINGLE_SIZE):
+    """Every byte n-gram of the UTF-8 texts packed into a uint64, and where each text's n-grams start.
+
+    Texts shorter than `size` bytes are zero-padded to one shingle.
+    """
+    encoded = [text.encode("utf-8").ljust(size, b"\0") for text in texts]
+    lengths = np.array([len(b) for b in encoded], dtype=np.int64)
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    counts = lengths - size + 1
+    offsets = np.cumsum(counts) - counts
+    # Window starts in the joined buffer, none crossing into the next text
+    starts = np.arange(counts.sum()) + np.repeat(np.cumsum(lengths) - lengths - offsets, counts)
+    packed = np.zeros(len(starts), dtype=np.uint64)
+    for k in range(size):
+        packed |= buffer[starts + k] << np.uint64(8 * k)
+    return packed, offsets
+
+
+# --- MinHash / LSH ---
+
+class MinHasher:
+    """MinHash signatures from `num_perm` multiply-shift hash functions of the shingles."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signatures(self, texts, batch_size=128):
+        """(len(texts), num_perm) uint32 signatures, computed a batch of texts at a time."""
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(texts), batch_size):
+            hashes, offsets = shingles(texts[start:start + batch_size])
+            # (a * h + b) mod 2**64, keeping the well-mixed high 32 bits; in place to limit temporaries
+            permuted = np.multiply(self.a[:, None], hashes[None, :])
+            permuted += self.b[:, None]
+            permuted >>= np.uint64(32)
+            result[start:start + len(offsets)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return result
+
+
+def candidate_pairs(signatures, bands=BANDS):
+    """Index pairs (i, j), i < j, that share an LSH bucket in at least one band."""
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    mixers = np.random.default_rng(0).integers(1, 2**63, size=rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    pairs = []
+    for band in range(bands):
+        block = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        keys = (block * mixers).sum(axis=1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.ones(n, dtype=bool)
+        starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        # Link every bucket member to the first (lowest-index) member of its bucket
+        first = order[np.maximum.accumulate(np.where(starts, np.arange(n), 0))]
+        pairs.append(np.stack([first[~starts], order[~starts]], axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def similar_pairs(signatures, pairs, threshold=THRESHOLD, batch_size=100_000):
+    """The candidate pairs whose estimated Jaccard similarity is at least `threshold`."""
+    keep = np.zeros(len(pairs), dtype=bool)
+    for start in range(0, len(pairs), batch_size):
+        batch = pairs[start:start + batch_size]
+        agreement = (signatures[batch[:, 0]] == signatures[batch[:, 1]]).mean(axis=1)
+        keep[start:start + batch_size] = agreement >= threshold
+    return pairs[keep]
+
+
+def leader_clusters(n, pairs):
+    """Cluster label for each of `n` items given similar pairs (i, j), i < j.
+
+    Each item joins the earliest similar item that leads a cluster itself, and
+    otherwise leads a new one. Every member is therefore similar to its leader;
+    unlike connected components, chains of small edits (a ~ b ~ c ~ ...) cannot
+    merge texts that are not alike.
+    """
+    label = np.arange(n)
+    # Sorted by j, then i: every i < j already has its final label when j is reached
+    for i, j in pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))].tolist():
+        if label[j] == j and label[i] == i:
+            label[j] = i
+    return label
+
+
+def cluster_texts(texts, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+    """Near-duplicate cluster label for each of the (distinct) texts."""
+    if not texts:
+        return np.empty(0, dtype=np.int64)
+    signatures = MinHasher(num_perm).signatures(texts)
+    pairs = similar_pairs(signatures, candidate_pairs(signatures, bands), threshold)
+    return leader_clusters(len(texts), pairs)
+
+
+# --- Deduplication ---
+
+def dedup_frame(df, formal_col="formal_text_cleaned", informal_col="informal_text_cleaned",
+                threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS, examples=10):
+    """Returns (deduplicated DataFrame, report dict)."""
+    formal = df[formal_col].fillna("").astype(str)
+    informal = df[informal_col].fillna("").astype(str)
+    formal_keys = formal.map(normalize_key)
+    informal_keys = informal.map(normalize_key)
+
+    # Exact duplicates share a code; near duplicates are clustered over the distinct texts only
+    codes, uniques = pd.factorize(formal_keys)
+    cluster = cluster_texts(list(uniques), threshold, num_perm, bands)[codes]
+
+    rows = pd.DataFrame({
+        "cluster": cluster,
+        "usable": (informal_keys != "").to_numpy(),
+        "rewritten": (informal_keys != formal_keys).to_numpy(),
+        "informal_key": informal_keys.to_numpy(),
+        "position": np.arange(len(df)),
+    })
+    rows["votes"] = rows.groupby(["cluster", "informal_key"])["position"].transform("size")
+    best = (
+        rows.sort_values(["cluster", "usable", "rewritten", "votes", "position"],
+                         ascending=[True, False, False, False, True])
+        .drop_duplicates("cluster")
+    )
+    kept = np.sort(best.loc[best["usable"], "position"].to_numpy())
+
+    sizes = rows["cluster"].value_counts()
+    report = {
+        "rows_in": len(df),
+        "rows_out": len(kept),
+        "exact_duplicates_removed": len(df) - len(uniques),
+        "near_duplicates_removed": len(uniques) - len(sizes),
+        "empty_clusters_dropped": int((~best["usable"]).sum()),
+        "clusters_collapsed": int((sizes > 1).sum()),
+        "threshold": threshold,
+        "num_perm": num_perm,
+        "bands": bands,
+        "largest_clusters": [],
+    }
+    kept_by_cluster = best.set_index("cluster")["position"]
+    for label, size in sizes[sizes > 1].head(examples).items():
+        position = kept_by_cluster[label]
+        members = rows.index[rows["cluster"] == label]
+        report["largest_clusters"].append({
+            "size": int(size),
+            "kept": {"formal": formal.iat[position], "informal": informal.iat[position]},
+            "formal_variants": sorted(set(formal.iloc[members]))[:5],
+        })
+    return df.iloc[kept].reset_index(drop=True), report
+
+
+def read_pairs(path):
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path, keep_default_na=False, dtype=str)
+
+
+def write_pairs(df, path):
+    path = Path(path)
+    if path.suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def dedup_file(input_path, output_path=DEFAULT_OUTPUT_PATH, report_path=DEFAULT_REPORT_PATH,
+               formal_col="formal_text_cleaned", informal_col="informal_text_cleaned",
+               threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+    """Deduplicates a CSV/Parquet file of pairs, writes the result and a JSON report; returns the report."""
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+    started = time.perf_counter()
+    df = read_pairs(input_path)
+    for column in (formal_col, informal_col):
+        if column not in df.columns:
+            raise KeyError(f"Expected column '{column}' not found; available columns: {df.columns.tolist()}")
+
+    deduped, report = dedup_frame(df, formal_col, informal_col, threshold, num_perm, bands)
+    write_pairs(deduped, output_path)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    if report_path:
+        Path(report_path).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return report
+
+
+def print_report(report):
+    print(f"Kept {report['rows_out']}/{report['rows_in']} pairs in {report['seconds']:.2f}s:")
+    print(f"  exact duplicates removed: {report['exact_duplicates_removed']}")
+    print(f"  near duplicates removed:  {report['near_duplicates_removed']} "
+          f"(Jaccard >= {report['threshold']}, {report['num_perm']} permutations, {report['bands']} bands)")
+    print(f"  clusters without a usable informal side: {report['empty_clusters_dropped']}")
+    print(f"  clusters collapsed: {report['clusters_collapsed']}")
+    for cluster in report["largest_clusters"][:5]:
+        print(f"  {cluster['size']:>4} x '{cluster['kept']['formal']}' -> '{cluster['kept']['informal']}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove exact and near-duplicate training pairs.")
+    parser.add_argument("--input", default=DEFAULT_INPUT_PATH, help="CSV or Parquet of cleaned pairs")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH, help="CSV, or Parquet if it ends in .parquet")
+    parser.add_argument("--report", default=DEFAULT_REPORT_PATH, help="JSON report of what was collapsed")
+    parser.add_argument("--formal-column", default="formal_text_cleaned")
+    parser.add_argument("--informal-column", default="informal_text_cleaned")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Jaccard similarity to merge at")
+    parser.add_argument("--num-perm", type=int, default=NUM_PERM, help="MinHash permutations")
+    parser.add_argument("--bands", type=int, default=BANDS, help="LSH bands (must divide --num-perm)")
+    args = parser.parse_args()
+
+    if not Path(args.input).is_file():
+        print(f"Error: Data file not found at {args.input}")
+        print("Please run the data preprocessing first.")
+        return
+
+    print(f"Deduplicating {args.input} into {args.output}...")
+    try:
+        report = dedup_file(args.input, args.output, args.report, args.formal_column, args.informal_column,
+                            args.threshold, args.num_perm, args.bands)
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e.args[0]}")
+        return
+    print_report(report)
+    print(f"Report saved to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
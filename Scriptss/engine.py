@@ -0,0 +1,501 @@
+"""
+Continuous (iteration-level) batching generation engine.
+
+The engine owns the KV cache of every sequence it is decoding. Between decode
+steps it drops sequences that emitted EOS or hit their token budget, and admits
+queued prompts into the freed slots. Short outputs therefore leave the batch
+early instead of waiting for the longest sequence to reach `max_new_tokens`.
+
+`stream(prompt)` yields the completion as text deltas while it is decoded, so
+callers can show the first words long before the last token is produced.
+
+With a `drafter` (see speculative.py), each step instead lets the drafter
+propose up to `num_draft_tokens` tokens per sequence and checks them all in
+one batched forward pass; the sampled output distribution is unchanged.
+Every speculative request logs its acceptance rate and tokens per pass.
+
+With `stopping` (see stopping.py), each sequence gets a token budget learned
+from its input length and ends at the first sentence boundary after a
+minimum length, instead of always running to `max_new_tokens` or </s>.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+import torch
+
+from Scriptss.batching import QueueFullError
+from Scriptss.kv_cache import from_legacy_cache, left_pad_caches, slice_cache, to_legacy_cache
+from Scriptss.metrics import TOKENS_GENERATED, record, span
+from Scriptss.prefix_cache import PrefixCache, prefill
+
+logger = logging.getLogger(__name__)
+
+# --- Sampling ---
+
+def token_probabilities(logits, do_sample=True, temperature=0.7, top_p=0.9):
+    """The distribution the next token is sampled from, over the last axis of logits (one-hot when greedy)."""
+    if not do_sample:
+        return torch.nn.functional.one_hot(logits.argmax(dim=-1), logits.shape[-1]).float()
+
+    logits = logits.float() / temperature
+    if top_p < 1.0:
+        sorted_logits, sorted_idx = torch.sort(logits, descending=True, dim=-1)
+        cumulative = sorted_logits.softmax(dim=-1).cumsum(dim=-1)
+        # Drop tokens once the mass before them already reaches top_p (always keep the first)
+        remove = cumulative - sorted_logits.softmax(dim=-1) >= top_p
+        sorted_logits = sorted_logits.masked_fill(remove, float("-inf"))
+        logits = torch.full_like(logits, float("-inf")).scatter(-1, sorted_idx, sorted_logits)
+
+    return logits.softmax(dim=-1)
+
+
+def sample_next_tokens(logits, do_sample=True, temperature=0.7, top_p=0.9):
+    """Picks the next token for each row of a (batch, vocab) logits tensor."""
+    if not do_sample:
+        return logits.argmax(dim=-1)
+    probs = token_probabilities(logits, do_sample, temperature, top_p)
+    return torch.multinomial(probs, num_samples=1).squeeze(-1)
+
+
+def generation_settings(model, max_new_tokens, do_sample, temperature, top_p, stopping=None):
+    """Describes everything that determines a completion besides the prompt."""
+    settings = {
+        "model": getattr(model.config, "_name_or_path", ""),
+        "quantization": getattr(model, "quantization_mode", "none"),
+        "max_new_tokens": max_new_tokens,
+        "do_sample": do_sample,
+    }
+    if do_sample:
+        settings.update(temperature=temperature, top_p=top_p)
+    if stopping is not None:
+        settings["stopping"] = stopping.describe()
+    return settings
+
+
+class Sequence:
+    """One in-flight request: prompt, generated tokens and its own KV cache."""
+
+    def __init__(self, prompt, max_new_tokens, future, on_text=None):
+        self.prompt = prompt
+        self.prompt_ids = None
+        self.max_new_tokens = max_new_tokens
+        self.min_new_tokens = 0
+        self.future = future
+        self.generated = []
+        self.past = None
+        self.cache_len = 0
+        self.finished = False
+        self.cancelled = False
+        self.enqueued = time.perf_counter()
+        self.first_token_at = None
+        # Seconds per stage (queue_wait, tokenize, prefill, decode, detokenize), see metrics.py
+        self.timings = {}
+        # Streaming: called with each new piece of decoded text
+        self.on_text = on_text
+        self.emitted = ""
+        # Speculative decoding: the drafter's per-sequence state and acceptance counters
+        self.draft_state = None
+        self.drafted = 0
+        self.accepted = 0
+        self.target_passes = 0
+
+    def cancel(self):
+        """Stop this request: a queued sequence is never admitted, a running one frees its slot."""
+        self.cancelled = True
+        self.future.cancel()
+
+    def speculation_stats(self):
+        """Drafted / accepted tokens and forward passes of the model for this request."""
+        tokens = len(self.generated)
+        return {
+            "drafted": self.drafted,
+            "accepted": self.accepted,
+            "acceptance_rate": self.accepted / self.drafted if self.drafted else 0.0,
+            "tokens": tokens,
+            "target_passes": self.target_passes,
+            "tokens_per_pass": tokens / self.target_passes if self.target_passes else 0.0,
+        }
+
+
+class GenerationEngine:
+    """Continuous-batching text generator around a causal LM and its tokenizer.
+
+    `submit(prompt)` returns a Future resolving to the decoded completion (the
+    prompt is never echoed); `generate(prompts)` is the blocking equivalent.
+    The Future also carries `time_to_first_token` (seconds from submit),
+    `timings` (seconds per stage, see metrics.py) and, with speculative
+    decoding, `speculation`, the request's `Sequence.speculation_stats()`.
+    Its `cancel_generation()` stops the request even after it was admitted,
+    which plain `Future.cancel()` cannot do once the sequence is running.
+
+    Speculation only runs while at most `max_speculative_batch` sequences are
+    decoding: with a full batch a step is no longer bound by reading the
+    weights, and verifying drafts would cost more than it saves.
+    """
+
+    def __init__(self, model, tokenizer, max_batch_size=8, max_queue_size=64,
+                 max_new_tokens=50, do_sample=True, temperature=0.7, top_p=0.9,
+                 use_prefix_cache=True, drafter=None, num_draft_tokens=4, max_speculative_batch=4,
+                 stopping=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.max_new_tokens = max_new_tokens
+        self.do_sample = do_sample
+        self.temperature = temperature
+        self.top_p = top_p
+        self.eos_token_id = tokenizer.eos_token_id
+        self.device = next(model.parameters()).device
+        # Built lazily on the engine thread, once per loaded model
+        self.use_prefix_cache = use_prefix_cache
+        self.prefix_cache = None
+        self.drafter = drafter
+        self.num_draft_tokens = num_draft_tokens
+        self.max_speculative_batch = max_speculative_batch
+        self.stopping = stopping
+
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.running = []
+        self._thread = None
+        self._stopping = threading.Event()
+
+        self._stats_lock = threading.Lock()
+        self.decode_steps = 0
+        self.decode_slots = 0
+        self.tokens_generated = 0
+        self.completed = 0
+        self.admitted = 0
+        self.queue_wait_total = 0.0
+        self.draft_tokens = 0
+        self.draft_tokens_accepted = 0
+
+    @classmethod
+    def from_pipeline(cls, pipe, **kwargs):
+        """Builds an engine from a transformers text-generation pipeline."""
+        return cls(pipe.model, pipe.tokenizer, **kwargs)
+
+    # --- Public API ---
+
+    def start(self):
+        """Start the decode loop thread (no-op if it is already running)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="generation-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Ask the decode loop to exit after the current step."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, prompt, max_new_tokens=None):
+        """Queue a prompt and return a Future resolving to its completion text."""
+        return self._enqueue(prompt, max_new_tokens).future
+
+    def stream(self, prompt, max_new_tokens=None, timeout=None):
+        """Queue a prompt and return an iterator over its completion as text deltas.
+
+        The prompt is queued immediately, so QueueFullError is raised here rather
+        than on the first `next()`. Closing the iterator early (e.g. the client
+        disconnected) cancels the sequence and frees its slot.
+        """
+        deltas = queue.Queue()
+        seq = self._enqueue(prompt, max_new_tokens, on_text=deltas.put)
+        seq.future.add_done_callback(lambda _: deltas.put(None))
+        return self._drain(seq, deltas, timeout)
+
+    def generate(self, prompts, max_new_tokens=None, timeout=None):
+        """Generate completions for a prompt or list of prompts, blocking until done."""
+        single = isinstance(prompts, str)
+        futures = [self.submit(p, max_new_tokens) for p in ([prompts] if single else prompts)]
+        results = [f.result(timeout=timeout) for f in futures]
+        return results[0] if single else results
+
+    def generation_settings(self):
+        """Decode settings that determine the output, e.g. for result-cache keys."""
+        return generation_settings(
+            self.model, self.max_new_tokens, self.do_sample, self.temperature, self.top_p, self.stopping
+        )
+
+    def stats(self):
+        """Decode-loop counters: slot occupancy and tokens produced."""
+        with self._stats_lock:
+            steps, slots = self.decode_steps, self.decode_slots
+            return {
+                "decode_steps": steps,
+                "avg_running_batch": slots / steps if steps else 0.0,
+                "slot_occupancy": slots / (steps * self.max_batch_size) if steps else 0.0,
+                "tokens_generated": self.tokens_generated,
+                "completed": self.completed,
+                "avg_queue_wait_ms": 1000 * self.queue_wait_total / self.admitted if self.admitted else 0.0,
+                "running": len(self.running),
+                "prefix_cache_hits": self.prefix_cache.hits if self.prefix_cache else 0,
+                "prefix_tokens_reused": self.prefix_cache.reused_tokens if self.prefix_cache else 0,
+                "queue_depth": self.queue.qsize(),
+                "draft_tokens": self.draft_tokens,
+                "draft_acceptance_rate": (
+                    self.draft_tokens_accepted / self.draft_tokens if self.draft_tokens else 0.0
+                ),
+            }
+
+    def _enqueue(self, prompt, max_new_tokens=None, on_text=None):
+        self.start()
+        seq = Sequence(prompt, max_new_tokens or self.max_new_tokens, Future(), on_text)
+        seq.future.cancel_generation = seq.cancel
+        try:
+            self.queue.put_nowait(seq)
+        except queue.Full:
+            raise QueueFullError(f"Request queue is full ({self.queue.maxsize} pending)")
+        return seq
+
+    def _drain(self, seq, deltas, timeout):
+        try:
+            while True:
+                try:
+                    delta = deltas.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No tokens generated within {timeout}s")
+                if delta is None:
+                    break
+                yield delta
+            # Re-raise a decode failure for the consumer
+            seq.future.result()
+        finally:
+            if not seq.future.done():
+                seq.cancel()
+
+    # --- Decode loop ---
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._admit()
+            self._drop_cancelled()
+            if not self.running:
+                continue
+            try:
+                with span("decode_step"):
+                    self._decode_step()
+            except Exception as e:
+                for seq in self.running:
+                    if not seq.future.done():
+                        seq.future.set_exception(e)
+                self.running = []
+                continue
+            self._retire()
+
+    def _admit(self):
+        """Move queued prompts into free slots, prefilling each one's KV cache."""
+        while len(self.running) < self.max_batch_size:
+            try:
+                # Block briefly only when there is nothing else to do
+                seq = self.queue.get(timeout=0.05) if not self.running else self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if not seq.future.set_running_or_notify_cancel():
+                continue
+            waited = time.perf_counter() - seq.enqueued
+            record("queue_wait", waited, seq.timings)
+            with self._stats_lock:
+                self.admitted += 1
+                self.queue_wait_total += waited
+            try:
+                self._prefill(seq)
+            except Exception as e:
+                seq.future.set_exception(e)
+                continue
+            if seq.finished:
+                self._finish(seq)
+            else:
+                self.running.append(seq)
+
+    def _drop_cancelled(self):
+        """Free the slots of running sequences whose consumer went away."""
+        for seq in self.running:
+            if seq.cancelled and not seq.future.done():
+                seq.future.set_exception(CancelledError())
+        self.running = [seq for seq in self.running if not seq.cancelled]
+
+    def _prefill(self, seq):
+        """Run the full prompt through the model and sample the first new token."""
+        # Tokenize on the engine thread; fast tokenizers are not safe to share across threads
+        with span("tokenize", seq.timings):
+            seq.prompt_ids = self.tokenizer(seq.prompt, add_special_tokens=False)["input_ids"]
+        if self.stopping is not None:
+            seq.min_new_tokens, seq.max_new_tokens = self.stopping.limits(len(seq.prompt_ids), seq.max_new_tokens)
+        if self.use_prefix_cache and self.prefix_cache is None:
+            self.prefix_cache = PrefixCache(self.model, self.tokenizer)
+
+        with span("prefill", seq.timings):
+            logits, seq.past = prefill(self.model, seq.prompt_ids, self.prefix_cache)
+            seq.cache_len = len(seq.prompt_ids)
+            seq.target_passes = 1
+            next_token = sample_next_tokens(logits, self.do_sample, self.temperature, self.top_p)
+        seq.first_token_at = time.perf_counter()
+        self._append_token(seq, int(next_token[0]))
+
+    def _decode_step(self):
+        """Feed each running sequence its last token in one batched forward pass."""
+        if self.drafter is not None and len(self.running) <= self.max_speculative_batch:
+            return self._speculative_step()
+        running = self.running
+        lengths = [seq.cache_len for seq in running]
+        max_len = max(lengths)
+
+        input_ids = torch.tensor([[seq.generated[-1]] for seq in running], device=self.device)
+        position_ids = torch.tensor([[length] for length in lengths], device=self.device)
+        attention_mask = torch.zeros(len(running), max_len + 1, dtype=torch.long, device=self.device)
+        for row, length in enumerate(lengths):
+            attention_mask[row, max_len - length:] = 1
+
+        past = left_pad_caches([seq.past for seq in running], lengths)
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=from_legacy_cache(past),
+                use_cache=True,
+            )
+        past = to_legacy_cache(outputs.past_key_values)
+        next_tokens = sample_next_tokens(
+            outputs.logits[:, -1, :], self.do_sample, self.temperature, self.top_p
+        ).tolist()
+
+        for row, seq in enumerate(running):
+            # Strip this row's left padding so the cache only holds real tokens
+            seq.past = slice_cache(past, start=max_len - lengths[row], batch_index=row)
+            seq.cache_len += 1
+            seq.target_passes += 1
+            self._append_token(seq, next_tokens[row])
+
+        with self._stats_lock:
+            self.decode_steps += 1
+            self.decode_slots += len(running)
+
+    def _speculative_step(self):
+        """Check each running sequence's drafted tokens in one batched forward pass.
+
+        A row's input is its last token followed by its drafts. The logits after
+        each of them are the model's distributions for the following position;
+        `verify` accepts a prefix of the drafts and samples the token after it.
+        """
+        from Scriptss.speculative import verify
+
+        running = self.running
+        lengths = [seq.cache_len for seq in running]
+        max_len = max(lengths)
+        settings = {"do_sample": self.do_sample, "temperature": self.temperature, "top_p": self.top_p}
+
+        drafts = []
+        for seq in running:
+            # Accepting k drafts yields k + 1 tokens; never draft past the token budget
+            budget = min(self.num_draft_tokens, seq.max_new_tokens - len(seq.generated) - 1)
+            tokens, probs = [], None
+            if budget > 0:
+                tokens, probs = self.drafter.propose(seq, seq.prompt_ids + seq.generated, budget, settings)
+            drafts.append((tokens, probs))
+
+        width = 1 + max(len(tokens) for tokens, _ in drafts)
+        input_ids = torch.full((len(running), width), self.eos_token_id, device=self.device)
+        attention_mask = torch.zeros(len(running), max_len + width, dtype=torch.long, device=self.device)
+        for row, (seq, (tokens, _)) in enumerate(zip(running, drafts)):
+            input_ids[row, :1 + len(tokens)] = torch.tensor([seq.generated[-1]] + tokens)
+            # Right padding after short drafts is never attended to by the real tokens
+            attention_mask[row, max_len - lengths[row]:] = 1
+        position_ids = torch.tensor(lengths, device=self.device)[:, None] + torch.arange(width, device=self.device)
+
+        past = left_pad_caches([seq.past for seq in running], lengths)
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=from_legacy_cache(past),
+                use_cache=True,
+            )
+        past = to_legacy_cache(outputs.past_key_values)
+        probs = token_probabilities(outputs.logits, self.do_sample, self.temperature, self.top_p)
+
+        drafted = accepted_total = 0
+        for row, (seq, (tokens, draft_probs)) in enumerate(zip(running, drafts)):
+            accepted, next_token = verify(tokens, draft_probs, probs[row, :1 + len(tokens)])
+            # Keep the last token and the accepted drafts; the rejected ones leave the cache
+            seq.past = slice_cache(past, start=max_len - lengths[row], end=max_len + 1 + accepted, batch_index=row)
+            seq.cache_len += 1 + accepted
+            seq.target_passes += 1
+            seq.drafted += len(tokens)
+            seq.accepted += accepted
+            drafted += len(tokens)
+            accepted_total += accepted
+            for token in tokens[:accepted] + [next_token]:
+                self._append_token(seq, token)
+                if seq.finished:
+                    break
+
+        with self._stats_lock:
+            self.decode_steps += 1
+            self.decode_slots += len(running)
+            self.draft_tokens += drafted
+            self.draft_tokens_accepted += accepted_total
+
+    def _append_token(self, seq, token_id):
+        if token_id == self.eos_token_id:
+            seq.finished = True
+            return
+        seq.generated.append(token_id)
+        with self._stats_lock:
+            self.tokens_generated += 1
+        if len(seq.generated) >= seq.max_new_tokens:
+            seq.finished = True
+        elif self.stopping is not None and self.stopping.should_stop(seq.generated, seq.min_new_tokens):
+            seq.finished = True
+        if seq.on_text is not None and not seq.finished:
+            self._emit_text(seq, final=False)
+
+    def _emit_text(self, seq, final):
+        """Send the text decoded since the last call to the sequence's stream."""
+        # Re-decode the whole completion: tokens only map to stable text in context
+        # (leading spaces, multi-byte characters split across tokens)
+        text = self.tokenizer.decode(seq.generated, skip_special_tokens=True)
+        if not final and text.endswith("\ufffd"):
+            return
+        if text.startswith(seq.emitted) and len(text) > len(seq.emitted):
+            seq.on_text(text[len(seq.emitted):])
+            seq.emitted = text
+
+    def _retire(self):
+        """Resolve finished sequences and free their slots."""
+        still_running = []
+        for seq in self.running:
+            if seq.finished:
+                self._finish(seq)
+            else:
+                still_running.append(seq)
+        self.running = still_running
+
+    def _finish(self, seq):
+        seq.past = None
+        seq.draft_state = None
+        if self.drafter is not None:
+            seq.future.speculation = seq.speculation_stats()
+            logger.info("metric " + " ".join(
+                f"speculative_{key}={round(value, 3)}" for key, value in seq.future.speculation.items()
+            ))
+        if seq.on_text is not None:
+            self._emit_text(seq, final=True)
+        # Queue wait plus prefill: what a client waits before the first word
+        seq.future.time_to_first_token = seq.first_token_at - seq.enqueued
+        record("decode", time.perf_counter() - seq.first_token_at, seq.timings)
+        with span("detokenize", seq.timings):
+            text = self.tokenizer.decode(seq.generated, skip_special_tokens=True).strip()
+        seq.future.timings = seq.timings
+        TOKENS_GENERATED.inc(len(seq.generated))
+        with self._stats_lock:
+            self.completed += 1
+        if not seq.future.done():
+            seq.future.set_result(text)
@@ -1,24 +1,35 @@
+import sys
 import torch
-from datasets import load_dataset
 from transformers import (
     AutoModelForCausalLM,
     AutoTokenizer,
     TrainingArguments,
     Trainer,
-    DataCollatorForLanguageModeling
 )
 from peft import LoraConfig, get_peft_model, TaskType
 from pathlib import Path
 import os
 
+# Make the Scriptss package importable when run as `python Scriptss/fine_tune.py`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Scriptss.train_resources import ResourceLogger, bf16_supported, plan_batches
+from Scriptss.training_data import PackedCollator, PackedDataset, tokenized_dataset
+
 def main():
     # Set Hugging Face token for gated model access
     os.environ["HUGGINGFACE_HUB_TOKEN"] = "f_dHMvtQsUlDqCIBaWCSJfpgcsVwnVArbdQw"
     
     # --- 1. Configuration ---
     model_name = "mistralai/Mistral-7B-Instruct-v0.2"
+    # Written by format_data.py; the Arrow file is memory-mapped, the JSONL is a fallback
+    arrow_path = Path("Dataa/formatted_dataset.arrow")
     dataset_path = str(Path("Dataa/formatted_dataset.jsonl"))
     output_dir = "models/slang_translator_v1"
+    # Several short pairs are packed into each sequence of up to max_length tokens
+    max_length = 256
+    # Train only on the slang response, not on the instruction and formal sentence before [/INST]
+    completion_only = True
     
     # Training hyperparameters
     num_train_epochs = 1
@@ -26,18 +37,17 @@ def main():
     batch_size = 1
     gradient_accumulation_steps = 4
 
-    print("Loading dataset...")
-    dataset = load_dataset("json", data_files=dataset_path, split="train")
-    
-    # Take a smaller subset for testing
-    dataset = dataset.select(range(min(100, len(dataset))))
-    print(f"Using {len(dataset)} examples for training")
+    # Memory-budgeted CPU profile (see train_resources.py), e.g. SLANG_TRAIN_RAM_GB=60 on a 64 GB box:
+    # bf16 base weights, gradient checkpointing, Adafactor, batch size picked to fit the budget
+    ram_budget_gb = float(os.environ.get("SLANG_TRAIN_RAM_GB") or 0)
+    budgeted = ram_budget_gb > 0
+    use_autocast = budgeted and bf16_supported()
 
     print("Loading model and tokenizer...")
     # Load model without quantization for Mac compatibility
     model = AutoModelForCausalLM.from_pretrained(
         model_name,
-        torch_dtype=torch.float32,
+        torch_dtype=torch.bfloat16 if budgeted else torch.float32,
         device_map=None,
         trust_remote_code=True
     )
@@ -62,24 +72,36 @@ def main():
 
     # Apply PEFT
     model = get_peft_model(model, peft_config)
+    # The frozen base may be bf16, but the LoRA weights and their updates stay in float32
+    for param in model.parameters():
+        if param.requires_grad:
+            param.data = param.data.float()
 
-    # Tokenize dataset
-    def tokenize_function(examples):
-        return tokenizer(
-            examples["text"],
-            truncation=True,
-            padding=False,
-            max_length=256,
-        )
-    
-    print("Tokenizing dataset...")
-    tokenized_dataset = dataset.map(tokenize_function, batched=True)
+    if budgeted:
+        target_batch = batch_size * gradient_accumulation_steps
+        batch_size, gradient_accumulation_steps = plan_batches(model, ram_budget_gb * 2**30, max_length, target_batch)
+        print(f"RAM budget {ram_budget_gb:g} GB: batch size {batch_size} x {gradient_accumulation_steps} "
+              f"accumulation steps, bf16 autocast {'on' if use_autocast else 'off (no native CPU support)'}")
 
-    # Data collator
-    data_collator = DataCollatorForLanguageModeling(
-        tokenizer=tokenizer,
-        mlm=False,
-    )
+    # Tokenize dataset (cached on disk until the data or the tokenizer change)
+    print("Loading dataset...")
+    data_path = arrow_path if arrow_path.is_file() else dataset_path
+    tokenized, cached = tokenized_dataset(data_path, tokenizer, max_length)
+    print(f"Tokenized dataset {'loaded from cache' if cached else 'built and cached'}")
+
+    # Take a smaller subset for testing
+    tokenized = tokenized.select(range(min(100, len(tokenized))))
+    train_dataset = PackedDataset(tokenized, max_length, completion_only)
+    stats = train_dataset.stats()
+    print(f"Using {stats['examples']} examples for training, packed into {stats['sequences']} sequences "
+          f"({stats['tokens'] / (stats['sequences'] * max_length):.0%} of their {max_length} tokens used)")
+    print(f"Supervised tokens: {stats['supervised_tokens']}/{stats['tokens']} "
+          f"({stats['supervised_tokens'] / stats['tokens']:.1%})")
+    if stats["skipped_examples"]:
+        print(f"Skipped {stats['skipped_examples']} examples whose response was truncated away")
+
+    # Data collator: block-diagonal attention keeps the packed examples independent
+    data_collator = PackedCollator(tokenizer.pad_token_id, mask_dtype=model.dtype)
 
     # Training arguments
     training_arguments = TrainingArguments(
@@ -98,6 +120,11 @@ def main():
         save_total_limit=2,
         report_to=None,
         fp16=False,
+        use_cpu=budgeted,
+        bf16=use_autocast,
+        gradient_checkpointing=budgeted,
+        gradient_checkpointing_kwargs={"use_reentrant": False} if budgeted else None,
+        optim="adafactor" if budgeted else "adamw_torch",
         eval_strategy="no",
     )
 
@@ -106,8 +133,9 @@ def main():
     trainer = Trainer(
         model=model,
         args=training_arguments,
-        train_dataset=tokenized_dataset,
+        train_dataset=train_dataset,
         data_collator=data_collator,
+        callbacks=[ResourceLogger()],
     )
 
     # Train
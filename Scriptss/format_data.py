@@ -1,63 +1,88 @@
+import argparse
 import pandas as pd
 import json
+import sys
+import time
 from pathlib import Path
 
-def create_instruction_prompt(formal_sentence, slang_sentence):
-    """Formats the sentence pair into the Mistral-instruct prompt format."""
-    # Using the standard Mistral instruction format
-    return f"<s>[INST] Translate the following formal English sentence to informal slang: {formal_sentence} [/INST] {slang_sentence} </s>"
+import pyarrow as pa
+
+# Make the Scriptss package importable when run as `python Scriptss/format_data.py`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Using the standard Mistral instruction format
+from Scriptss.prompts import create_instruction_prompts
+
+# Read by fine_tune.py with Dataset.from_file, which memory-maps it instead of parsing
+DEFAULT_ARROW_PATH = "Dataa/formatted_dataset.arrow"
+DEFAULT_JSONL_PATH = "Dataa/formatted_dataset.jsonl"
+ARROW_SCHEMA = pa.schema([("text", pa.string())])
+
+def format_chunk(df, formal_col, informal_col):
+    """Builds the training texts for one DataFrame chunk with column-wise string ops."""
+    formal_text = df[formal_col].astype(str).str.strip()
+    informal_text = df[informal_col].astype(str).str.strip()
+
+    # Skip empty or very short texts
+    keep = (formal_text.str.len() >= 3) & (informal_text.str.len() >= 3)
+    return create_instruction_prompts(formal_text[keep], informal_text[keep])
+
+def format_file(input_path, arrow_path=DEFAULT_ARROW_PATH, jsonl_path=None,
+                formal_col='formal_text', informal_col='informal_text', chunk_size=100_000):
+    """Formats a CSV of sentence pairs chunk by chunk into an Arrow stream file (and optionally JSONL).
+
+    Returns the number of examples written.
+    """
+    count = 0
+    jsonl = open(jsonl_path, 'w', encoding='utf-8') if jsonl_path else None
+    try:
+        with pa.OSFile(str(arrow_path), 'wb') as sink, pa.ipc.new_stream(sink, ARROW_SCHEMA) as writer:
+            for df in pd.read_csv(input_path, chunksize=chunk_size):
+                # Ensure columns exist
+                if formal_col not in df.columns or informal_col not in df.columns:
+                    raise KeyError(f"Expected columns '{formal_col}' and '{informal_col}' not found; "
+                                   f"available columns: {df.columns.tolist()}")
+                texts = format_chunk(df, formal_col, informal_col)
+                writer.write_batch(pa.record_batch([pa.array(texts.tolist(), pa.string())], schema=ARROW_SCHEMA))
+                if jsonl:
+                    jsonl.write(''.join(json.dumps({"text": text}, ensure_ascii=False) + '\n' for text in texts))
+                count += len(texts)
+    finally:
+        if jsonl:
+            jsonl.close()
+    return count
 
 def main():
-    """Reads cleaned data and formats it into a JSONL file for SFTTrainer."""
-    # Define file paths
-    data_dir = Path("Dataa")
-    cleaned_data_path = data_dir / "raw_data_fixed.csv"  # Use the fixed CSV
-    formatted_data_path = data_dir / "formatted_dataset.jsonl"
+    """Reads cleaned data and formats it into an Arrow dataset (and optionally JSONL) for training."""
+    parser = argparse.ArgumentParser(description="Format sentence pairs as Mistral-instruct training texts.")
+    parser.add_argument("--input", default="Dataa/deduped_data.csv",
+                        help="CSV of sentence pairs (default: the cleaned, deduplicated output of dedup.py)")
+    parser.add_argument("--formal-column", default="formal_text_cleaned")
+    parser.add_argument("--informal-column", default="informal_text_cleaned")
+    parser.add_argument("--output", default=DEFAULT_ARROW_PATH, help="Arrow stream file for fine_tune.py")
+    parser.add_argument("--jsonl", nargs="?", const=DEFAULT_JSONL_PATH, default=None,
+                        help=f"also write JSONL (default path: {DEFAULT_JSONL_PATH})")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="rows read and formatted at a time")
+    args = parser.parse_args()
 
     # Check if cleaned data file exists
-    if not cleaned_data_path.is_file():
-        print(f"Error: Fixed data file not found at {cleaned_data_path}")
-        print("Please run the data preprocessing first.")
+    input_path = Path(args.input)
+    if not input_path.is_file():
+        print(f"Error: Data file not found at {input_path}")
+        print("Please run the data preprocessing and deduplication first (python main.py --until dedup).")
         return
 
-    print(f"Reading data from {cleaned_data_path}...")
-    df = pd.read_csv(cleaned_data_path)
-    
-    # Use the original columns from the fixed CSV
-    formal_col = 'formal_text'
-    informal_col = 'informal_text'
-    
-    # Ensure columns exist
-    if formal_col not in df.columns or informal_col not in df.columns:
-        print(f"Error: Expected columns '{formal_col}' and '{informal_col}' not found.")
-        print(f"Available columns: {df.columns.tolist()}")
+    outputs = args.output + (f" and {args.jsonl}" if args.jsonl else "")
+    print(f"Formatting {input_path} and saving to {outputs}...")
+    started = time.perf_counter()
+    try:
+        count = format_file(input_path, args.output, args.jsonl, args.formal_column, args.informal_column,
+                            args.chunk_size)
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
         return
-    
-    # Ensure columns are strings
-    df[formal_col] = df[formal_col].astype(str)
-    df[informal_col] = df[informal_col].astype(str)
-
-    print(f"Formatting data and saving to {formatted_data_path}...")
-    
-    # Create formatted data
-    formatted_data = []
-    for _, row in df.iterrows():
-        formal_text = row[formal_col].strip()
-        informal_text = row[informal_col].strip()
-        
-        # Skip empty or very short texts
-        if len(formal_text) < 3 or len(informal_text) < 3:
-            continue
-            
-        formatted_text = create_instruction_prompt(formal_text, informal_text)
-        formatted_data.append({"text": formatted_text})
-
-    # Save as JSONL
-    with open(formatted_data_path, 'w', encoding='utf-8') as f:
-        for item in formatted_data:
-            f.write(json.dumps(item, ensure_ascii=False) + '\n')
 
-    print(f"Formatted {len(formatted_data)} examples and saved to {formatted_data_path}")
+    print(f"Formatted {count} examples in {time.perf_counter() - started:.2f}s and saved to {outputs}")
     print("Data formatting completed!")
 
 if __name__ == "__main__":
@@ -2,72 +2,141 @@ import torch
 from transformers import (
     AutoModelForCausalLM,
     AutoTokenizer,
-    pipeline
 )
 from pathlib import Path
 import os
+import sys
+
+# Make the Scriptss package importable when run as `python Scriptss/infer.py`
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from Scriptss.engine import GenerationEngine
+from Scriptss.phrasebook import Phrasebook
+from Scriptss.prompts import build_prompt
+from Scriptss.quantize import load_quantized, quantize_model
+from Scriptss.result_cache import TranslationCache
+from Scriptss.snapshot import is_snapshot, load_snapshot
+from Scriptss.speculative import describe, load_drafter
+from Scriptss.stopping import StoppingRules
+from Scriptss.spell import default_corrector
 
 # --- Configuration ---
-BASE_MODEL_NAME = "mistralai/Mistral-7B-Instruct-v0.2"
+# A Hugging Face model ID or local directory (e.g. the benchmarks' tiny model)
+BASE_MODEL_NAME = os.environ.get("SLANG_MODEL", "mistralai/Mistral-7B-Instruct-v0.2")
+
+# Snapshot written by `python Scriptss/snapshot.py export`; memory-mapped when present
+SNAPSHOT_DIR = Path(os.environ.get("SLANG_SNAPSHOT_DIR", PROJECT_ROOT / "models" / "snapshot"))
 
 # Set Hugging Face token for gated model access
 os.environ["HUGGINGFACE_HUB_TOKEN"] = "f_dHMvtQsUlDqCIBaWCSJfpgcsVwnVArbdQw"
 
+# CPU weight quantization: "none", "int8" (dynamic) or "int4" (weight-only)
+QUANTIZE = os.environ.get("SLANG_QUANTIZE", "none")
+
+# --- Generation Settings ---
+# Greedy decoding (SLANG_DO_SAMPLE=0) makes translations deterministic and cacheable
+GENERATION_CONFIG = {
+    # Upper bound; each request's budget follows from its input length (see stopping.py)
+    "max_new_tokens": 50,
+    "do_sample": os.environ.get("SLANG_DO_SAMPLE", "1") == "1",
+    "temperature": 0.7,
+    "top_p": 0.9,
+}
+
+# Speculative decoding: "none", "ngram" (drafts from our informal data) or a small
+# draft model sharing Mistral's tokenizer; the output distribution does not change
+SPECULATIVE = os.environ.get("SLANG_SPECULATIVE", "none")
+DRAFT_TOKENS = int(os.environ.get("SLANG_DRAFT_TOKENS", 4))
+
+# Fix typos in the input before translating it (slang from our data is left alone)
+SPELLCHECK = os.environ.get("SLANG_SPELLCHECK", "0") == "1"
+
+# Repeated sentences are answered from here (see SLANG_CACHE_* in result_cache.py)
+translation_cache = TranslationCache.from_env()
+
+# Sentences (nearly) matching our curated pairs skip the model (see SLANG_PHRASEBOOK* in phrasebook.py)
+phrasebook = Phrasebook.from_env()
+
 # --- Device Setup ---
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 print(f"Using device: {DEVICE}")
 
 def load_model():
-    """Load the Mistral model and tokenizer"""
+    """Load the Mistral model and wrap it in a continuous-batching engine"""
     print("Loading Mistral model...")
-    print("Note: This will download ~13GB of model files on first run.")
+    if not is_snapshot(SNAPSHOT_DIR):
+        print("Note: This will download ~13GB of model files on first run.")
     
     try:
-        # Load tokenizer
-        tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL_NAME, trust_remote_code=True)
+        if is_snapshot(SNAPSHOT_DIR) and DEVICE == "cpu":
+            # Weights are mapped from disk, so pages load on demand and are shared across processes
+            print(f"Loading memory-mapped snapshot from {SNAPSHOT_DIR}...")
+            model, tokenizer = load_snapshot(SNAPSHOT_DIR)
+        elif DEVICE == "cpu" and QUANTIZE != "none":
+            # Quantizing each layer as it is read never holds the whole fp32 model (~28GB for Mistral-7B)
+            print(f"Loading Mistral model with {QUANTIZE} weights...")
+            model, tokenizer = load_quantized(BASE_MODEL_NAME, QUANTIZE)
+        else:
+            # Load tokenizer
+            tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL_NAME, trust_remote_code=True)
+            
+            # Load model
+            model = AutoModelForCausalLM.from_pretrained(
+                BASE_MODEL_NAME,
+                torch_dtype=torch.float16 if DEVICE == "cuda" else torch.float32,
+                trust_remote_code=True,
+            ).to(DEVICE)
+            model.eval()
+        
         tokenizer.pad_token = tokenizer.eos_token
         tokenizer.padding_side = "right"
         
-        # Create text generation pipeline
-        pipe = pipeline(
-            "text-generation",
-            model=BASE_MODEL_NAME,
-            tokenizer=tokenizer,
-            device=-1 if DEVICE == "cpu" else 0,  # Use CPU or GPU
-            torch_dtype=torch.float16 if DEVICE == "cuda" else torch.float32,
-            max_length=512,
-            do_sample=True,
-            temperature=0.7,
-            top_p=0.9,
+        if DEVICE == "cpu" and QUANTIZE != "none" and not hasattr(model, "quantization_mode"):
+            print(f"Quantizing linear layers to {QUANTIZE}...")
+            model = quantize_model(model, QUANTIZE)
+        
+        # The engine owns per-sequence KV caches and drops sequences at EOS
+        engine = GenerationEngine(
+            model,
+            tokenizer,
+            drafter=load_drafter(SPECULATIVE, tokenizer),
+            num_draft_tokens=DRAFT_TOKENS,
+            # Token budget from the input length, stop at the end of the first sentence
+            stopping=StoppingRules.from_env(tokenizer),
+            **GENERATION_CONFIG,
         )
         
         print("Model loaded successfully!")
-        return pipe, tokenizer
+        return engine, tokenizer
         
     except Exception as e:
         print(f"Failed to load Mistral model: {e}")
         return None, None
 
-def translate_text(pipe, tokenizer, formal_text):
-    """Translate formal text to informal using Mistral"""
+def translate_text(engine, tokenizer, formal_text):
+    """Translate formal text to informal: from the phrasebook or the cache when possible, else with Mistral"""
     try:
-        # Create prompt for Mistral
-        prompt = f"<s>[INST] Translate the following formal English sentence to informal slang: {formal_text} [/INST]"
-        
-        # Generate translation
-        result = pipe(
-            prompt, 
-            max_new_tokens=50, 
-            pad_token_id=tokenizer.eos_token_id
-        )
+        if SPELLCHECK:
+            formal_text = default_corrector().correct(formal_text)
+        if phrasebook is not None:
+            informal_text = phrasebook.lookup(formal_text)
+            if informal_text is not None:
+                return informal_text
+        settings = engine.generation_settings()
+        cached = translation_cache.get(formal_text, settings)
+        if cached is not None:
+            return cached
         
-        # Extract response
-        generated_text = result[0]['generated_text']
-        informal_text = generated_text.replace(prompt, "").strip()
+        # Create prompt for Mistral
+        prompt = build_prompt(formal_text)
         
-        # Clean up response
-        if informal_text.endswith("</s>"):
-            informal_text = informal_text[:-4].strip()
+        # Generate translation (the engine returns only the new tokens, without </s>)
+        future = engine.submit(prompt)
+        informal_text = future.result()
+        if hasattr(future, "speculation"):
+            print(f"Speculative decoding: {describe(future.speculation)}")
+        translation_cache.put(formal_text, settings, informal_text)
         
         return informal_text
         
@@ -79,9 +148,9 @@ def main():
     print(f"Using model: {BASE_MODEL_NAME}")
     
     # Load model
-    pipe, tokenizer = load_model()
+    engine, tokenizer = load_model()
     
-    if pipe is None:
+    if engine is None:
         print("Failed to load model. Exiting.")
         return
     
@@ -100,7 +169,7 @@ def main():
                 continue
             
             print("Translating...")
-            informal_text = translate_text(pipe, tokenizer, formal_text)
+            informal_text = translate_text(engine, tokenizer, formal_text)
             
             print(f"Informal: {informal_text}")
             
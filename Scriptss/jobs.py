@@ -0,0 +1,222 @@
+"""
+Asynchronous translation jobs.
+
+`POST /jobs` enqueues work and returns an ID at once; a bounded pool of worker
+threads drains the queue and clients poll for the result. When the queue is
+full, `submit` raises QueueFullError with a Retry-After estimate so the caller
+can answer 429 instead of stacking threads. Jobs whose client stopped polling
+for `abandon_after` seconds are cancelled, jobs still unfinished after
+`timeout` seconds fail, and finished jobs are forgotten after `retention`
+seconds.
+"""
+import math
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from Scriptss.batching import QueueFullError
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class JobQueueFullError(QueueFullError):
+    """Raised when no more jobs can be queued; carries a Retry-After hint in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Job:
+    """One queued translation and its outcome."""
+
+    def __init__(self, text):
+        self.id = uuid.uuid4().hex
+        self.text = text
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.future = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.last_seen = self.created
+
+    def to_dict(self):
+        data = {"job_id": self.id, "status": self.status, "formal": self.text}
+        if self.status == DONE:
+            data["informal"] = self.result
+        if self.error:
+            data["error"] = self.error
+        if self.finished and self.started:
+            data["seconds"] = round(self.finished - self.started, 3)
+        return data
+
+
+class JobQueue:
+    """Bounded queue of jobs drained by `max_workers` threads.
+
+    `handler(text)` must return a Future resolving to the job's result. If the
+    Future has a `cancel_generation()` method (GenerationEngine futures do),
+    cancelling uses it so a job that is already generating stops as well.
+    """
+
+    def __init__(self, handler, max_workers=8, max_pending=64, abandon_after=60, retention=600, timeout=300):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.abandon_after = abandon_after
+        self.retention = retention
+        self.timeout = timeout
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self._threads = []
+
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    def start(self):
+        """Start the worker and reaper threads (no-op if already running)."""
+        with self.lock:
+            if self._threads:
+                return
+            for i in range(self.max_workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            reaper = threading.Thread(target=self._reap, name="job-reaper", daemon=True)
+            reaper.start()
+            self._threads.append(reaper)
+
+    # --- Client API ---
+
+    def submit(self, text):
+        """Queue a job, or raise JobQueueFullError with a Retry-After hint."""
+        self.start()
+        job = Job(text)
+        with self.lock:
+            try:
+                self.pending.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise JobQueueFullError(
+                    f"Job queue is full ({self.pending.maxsize} pending)", self.retry_after()
+                )
+            self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        """Look up a job and record that its client is still polling."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job.last_seen = time.time()
+            return job
+
+    def cancel(self, job_id):
+        """Cancel a job that has not finished yet. Returns the job, or None if unknown."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                self._cancel(job)
+            return job
+
+    def retry_after(self):
+        """Seconds until a queue slot is likely to free up, from the average job time."""
+        average = self.total_seconds / self.completed if self.completed else 1.0
+        return max(1, math.ceil(average * self.pending.qsize() / self.max_workers))
+
+    def stats(self):
+        with self.lock:
+            statuses = {}
+            for job in self.jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            return {
+                "queue_depth": self.pending.qsize(),
+                "max_pending": self.pending.maxsize,
+                "workers": self.max_workers,
+                "jobs_by_status": statuses,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "rejected": self.rejected,
+                "avg_job_seconds": self.total_seconds / self.completed if self.completed else 0.0,
+            }
+
+    # --- Internals ---
+
+    @staticmethod
+    def _stop(future):
+        """Cancel a job's Future, through the engine when it can stop running generations."""
+        getattr(future, "cancel_generation", future.cancel)()
+
+    def _cancel(self, job):
+        """Mark a job cancelled (caller holds self.lock)."""
+        if job.status not in (QUEUED, RUNNING):
+            return
+        if job.future is not None:
+            self._stop(job.future)
+        job.status = CANCELLED
+        job.finished = time.time()
+        self.cancelled += 1
+
+    def _work(self):
+        while True:
+            job = self.pending.get()
+            with self.lock:
+                if job.status != QUEUED:
+                    continue
+                job.status = RUNNING
+                job.started = time.time()
+
+            try:
+                future = self.handler(job.text)
+                with self.lock:
+                    # Cancelled while the handler was queueing it: nothing will ever wait for it
+                    if job.status != RUNNING:
+                        self._stop(future)
+                        continue
+                    job.future = future
+                result = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                with self.lock:
+                    if job.status == RUNNING:
+                        self._stop(job.future)
+                        job.status = FAILED
+                        job.error = f"Timed out after {self.timeout:g}s"
+                        job.finished = time.time()
+                        self.failed += 1
+                continue
+            except Exception as e:
+                with self.lock:
+                    if job.status == RUNNING:
+                        job.status = FAILED
+                        job.error = str(e) or type(e).__name__
+                        job.finished = time.time()
+                        self.failed += 1
+                continue
+
+            with self.lock:
+                if job.status == RUNNING:
+                    job.status = DONE
+                    job.result = result
+                    job.finished = time.time()
+                    self.completed += 1
+                    self.total_seconds += job.finished - job.started
+
+    def _reap(self):
+        """Cancel abandoned jobs and drop finished ones past their retention."""
+        while True:
+            time.sleep(1.0)
+            now = time.time()
+            with self.lock:
+                for job_id, job in list(self.jobs.items()):
+                    if job.status in (QUEUED, RUNNING) and now - job.last_seen > self.abandon_after:
+                        self._cancel(job)
+                    elif job.finished and now - job.finished > self.retention:
+                        del self.jobs[job_id]
@@ -0,0 +1,59 @@
+"""
+Helpers for moving KV caches between transformers versions and batch layouts.
+
+The engine keeps every sequence's cache in the legacy layout: a tuple of
+per-layer (key, value) tensors shaped (batch, heads, seq_len, head_dim).
+"""
+import torch
+
+try:
+    from transformers.cache_utils import DynamicCache
+except ImportError:  # transformers < 4.36 only understands tuple caches
+    DynamicCache = None
+
+
+def to_legacy_cache(past_key_values):
+    """Returns past_key_values as a tuple of per-layer (key, value) tensors."""
+    if isinstance(past_key_values, (tuple, list)):
+        return tuple(past_key_values)
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return past_key_values.to_legacy_cache()
+    if hasattr(past_key_values, "layers"):
+        return tuple((layer.keys, layer.values) for layer in past_key_values.layers)
+    return tuple(zip(past_key_values.key_cache, past_key_values.value_cache))
+
+
+def from_legacy_cache(legacy_cache):
+    """Builds the cache object the installed transformers version expects."""
+    if DynamicCache is None:
+        return legacy_cache
+    cache = DynamicCache()
+    for layer_idx, (key, value) in enumerate(legacy_cache):
+        cache.update(key, value, layer_idx)
+    return cache
+
+
+def slice_cache(legacy_cache, start=0, end=None, batch_index=None):
+    """Slices every layer of a tuple cache along the sequence (and batch) axis."""
+    batch = slice(None) if batch_index is None else slice(batch_index, batch_index + 1)
+    return tuple(
+        (key[batch, :, start:end], value[batch, :, start:end])
+        for key, value in legacy_cache
+    )
+
+
+def left_pad_caches(caches, lengths):
+    """Stacks per-sequence tuple caches into one batch, left-padding shorter ones."""
+    max_len = max(lengths)
+    batched = []
+    for layer in zip(*caches):
+        keys, values = [], []
+        for (key, value), length in zip(layer, lengths):
+            pad = max_len - length
+            if pad:
+                key = torch.cat([key.new_zeros(*key.shape[:2], pad, key.shape[3]), key], dim=2)
+                value = torch.cat([value.new_zeros(*value.shape[:2], pad, value.shape[3]), value], dim=2)
+            keys.append(key)
+            values.append(value)
+        batched.append((torch.cat(keys, dim=0), torch.cat(values, dim=0)))
+    return tuple(batched)
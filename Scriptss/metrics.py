@@ -0,0 +1,195 @@
+"""
+Timing spans, counters and histograms in Prometheus text format.
+
+`span("prefill")` times a block, or used as a decorator a function, into the
+`slang_stage_seconds` histogram under that stage name. Pass a dict as
+`trace` to also collect a request's stages in it, e.g. for one structured
+log line per request. Counters and histograms are declared once at module
+level, the way the stages below are, and `render()` writes all of them plus
+whatever the registered collectors report (cache and scheduler counters
+that already exist elsewhere are read at scrape time, not duplicated).
+
+SLANG_METRICS=0 turns recording off: spans cost one flag check and
+decorators return the function unchanged. Every process, e.g. each gunicorn
+worker, has its own registry, so every sample carries a `worker` label with
+the process ID. Each worker's counters then form their own monotonic series
+however scrapes are spread over workers; sum them with
+`sum without (worker) (rate(...))`.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("SLANG_METRICS", "1") == "1"
+
+# Seconds, from sub-millisecond stages up to a slow CPU generation
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class Counter:
+    """A monotonically increasing count, optionally per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        if not ENABLED:
+            return
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Bucketed observations (e.g. seconds) with their sum and count, optionally per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label key -> [per-bucket counts (last one is +Inf), sum]
+        self.values = {}
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        if ENABLED:
+            self._observe(tuple(str(labels[name]) for name in self.labelnames), value)
+
+    def _observe(self, key, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def samples(self):
+        with self.lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self.values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, cumulative
+
+
+def register_collector(collect):
+    """Adds a callable returning [(name, kind, documentation, [(labels, value), ...]), ...] to every scrape."""
+    _collectors.append(collect)
+
+
+def render():
+    """All metrics of this process in the Prometheus text exposition format, labelled with its worker."""
+    lines = []
+    # Read at scrape time: with gunicorn's preload the module is imported before the workers fork
+    worker = {"worker": os.getpid()}
+
+    def family(name, kind, documentation, samples):
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample_name, labels, value in samples:
+            lines.append(f"{sample_name}{_format_labels({**labels, **worker})} {_format_value(value)}")
+
+    for metric in _metrics:
+        family(metric.name, metric.kind, metric.documentation, metric.samples())
+    for collect in _collectors:
+        for name, kind, documentation, samples in collect():
+            family(name, kind, documentation, ((name, labels, value) for labels, value in samples))
+    return "\n".join(lines) + "\n"
+
+
+# --- Shared metrics ---
+
+STAGE_SECONDS = Histogram("slang_stage_seconds", "Time spent per stage of loading, preprocessing and translating.",
+                          ["stage"])
+TOKENS_GENERATED = Counter("slang_tokens_generated_total", "Tokens generated by the model.")
+
+
+def record(stage, seconds, trace=None):
+    """Observes one stage's duration, and adds it to `trace` (a dict of stage -> seconds) if given."""
+    if not ENABLED:
+        return
+    STAGE_SECONDS._observe((stage,), seconds)
+    if trace is not None:
+        trace[stage] = trace.get(stage, 0.0) + seconds
+
+
+class Span:
+    """Context manager and decorator timing one stage; see `span`."""
+
+    __slots__ = ("stage", "trace", "start")
+
+    def __init__(self, stage, trace=None):
+        self.stage = stage
+        self.trace = trace
+        self.start = 0.0
+
+    def __enter__(self):
+        if ENABLED:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if ENABLED:
+            record(self.stage, time.perf_counter() - self.start, self.trace)
+
+    def __call__(self, func):
+        if not ENABLED:
+            return func
+        stage = self.stage
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(stage, time.perf_counter() - start)
+
+        return timed
+
+
+def span(stage, trace=None):
+    """Times a `with` block or, as `@span(stage)`, every call of a function."""
+    return Span(stage, trace)
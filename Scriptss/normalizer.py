@@ -0,0 +1,154 @@
+"""
+Compiled text normalizer.
+
+`Normalizer` produces exactly what the step-by-step functions in
+preprocess_data.py / CleanNPreprocess.py produce, but builds everything once:
+
+- Contractions (and the slang entries of the CleanNPreprocess map) live in a
+  character trie instead of a regex alternation rebuilt on every call. The
+  trie reproduces the regex's semantics exactly: scanning left to right, the
+  match at a position is the *first key in dict order* that matches there
+  (not the longest), letters compare case-insensitively the way `re.IGNORECASE`
+  does, and the replacement is looked up with `match.lower()`.
+- Texts that cannot contain any key (e.g. no apostrophe at all) skip the
+  contraction scan entirely; emoji handling is skipped for pure-ASCII text.
+- Punctuation is removed with one `str.translate` and elongations with a
+  pattern compiled once.
+
+The original step functions stay as the readable reference; see
+`python -m benchmarks.normalizer` for the differential check and timings.
+"""
+import re
+import string
+
+import emoji
+
+APOSTROPHE = "'"
+END = ""  # trie key marking the end of a contraction (never a folded character)
+ELONGATION_PATTERN = re.compile(r'(.)\1{2,}')
+PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+
+def _ignorecase_variants(chars):
+    """Maps every character that re.IGNORECASE treats as equal to one of `chars` onto it."""
+    fold = {}
+    for char in chars:
+        fold[char] = char
+        fold[char.upper()] = char
+    # A few non-ASCII letters also match ASCII ones (e.g. 'ı', 'ſ', Kelvin 'K');
+    # they are all in the BMP, so only that range is checked
+    candidates = re.compile("[{}]".format(re.escape("".join(chars))), re.IGNORECASE)
+    for code in range(128, 0x10000):
+        char = chr(code)
+        if candidates.fullmatch(char):
+            fold[char] = next(c for c in chars if re.fullmatch(re.escape(c), char, re.IGNORECASE))
+    return fold
+
+
+class Normalizer:
+    """Normalizes text in as few passes as possible.
+
+    The default settings match preprocess_data.preprocess_text. With
+    `fix_im`, `keep_first_char`, `strip_apostrophes`, `remove_punctuation`
+    and `demojize` enabled it matches CleanNPreprocess.preprocess_text
+    without the (TextBlob) spelling correction.
+    """
+
+    def __init__(self, contractions, fix_im=False, keep_first_char=False, strip_apostrophes=False,
+                 remove_punctuation=False, demojize=False):
+        self.contractions = contractions
+        self.fix_im = fix_im
+        self.keep_first_char = keep_first_char
+        self.strip_apostrophes = strip_apostrophes
+        self.remove_punctuation = remove_punctuation
+        self.demojize = demojize
+
+        keys = [key.lower() for key in contractions]
+        self.fold = _ignorecase_variants(sorted({char for key in keys for char in key}))
+
+        # Trie over folded characters; each node stores the dict position of the
+        # first key ending there, since the regex takes the first alternative that matches
+        self.trie = {}
+        for order, key in enumerate(keys):
+            node = self.trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node.setdefault(END, order)
+
+        # Any text without one of these characters cannot contain a key
+        anchors = {APOSTROPHE}
+        anchors.update(key[0] for key in keys if APOSTROPHE not in key)
+        self.anchors = [variant for variant, char in self.fold.items() if char in anchors]
+
+    def expand_contractions(self, text):
+        """Single left-to-right trie scan, equivalent to the regex substitution."""
+        if not any(anchor in text for anchor in self.anchors):
+            return text
+
+        fold, trie, contractions = self.fold, self.trie, self.contractions
+        pieces = []
+        copied = 0
+        position = 0
+        length = len(text)
+        while position < length:
+            node = trie
+            best_order = None
+            best_end = 0
+            cursor = position
+            while cursor < length:
+                node = node.get(fold.get(text[cursor]))
+                if node is None:
+                    break
+                cursor += 1
+                order = node.get(END)
+                if order is not None and (best_order is None or order < best_order):
+                    best_order, best_end = order, cursor
+            if best_order is None:
+                position += 1
+                continue
+
+            match = text[position:best_end]
+            expanded = contractions.get(match.lower())
+            if expanded:
+                if self.keep_first_char:
+                    expanded = match[0] + expanded[1:]
+                pieces.append(text[copied:position])
+                pieces.append(expanded)
+                copied = best_end
+            position = best_end
+
+        if not pieces:
+            return text
+        pieces.append(text[copied:])
+        return "".join(pieces)
+
+    def normalize(self, text):
+        """Normalizes one string; anything that is not a string becomes ''."""
+        if not isinstance(text, str):
+            return ""
+        if self.fix_im:
+            text = text.replace("Im", "I'm")
+        text = self.expand_contractions(text)
+        if self.strip_apostrophes:
+            text = text.replace(APOSTROPHE, "")
+        text = text.lower()
+        if self.remove_punctuation:
+            text = text.translate(PUNCTUATION_TABLE)
+        # Every emoji is non-ASCII, so ASCII text needs no lookup
+        if self.demojize and not text.isascii():
+            text = emoji.demojize(text, delimiters=(" <", "> "))
+        return ELONGATION_PATTERN.sub(r'\1\1', text)
+
+    def normalize_many(self, texts):
+        """Normalizes an iterable of strings, computing each distinct string once."""
+        seen = {}
+        results = []
+        for text in texts:
+            if not isinstance(text, str):
+                results.append("")
+                continue
+            normalized = seen.get(text)
+            if normalized is None:
+                normalized = seen[text] = self.normalize(text)
+            results.append(normalized)
+        return results
@@ -0,0 +1,255 @@
+"""
+Retrieval-first translation from our curated pairs.
+
+Many inputs are, or nearly are, a formal sentence from Dataa/cleaned_data.csv.
+Those are answered from the stored informal side without running the model:
+
+- Exact: the input is normalized the way the data was cleaned
+  (`preprocess_text`), then compared without punctuation, case or extra
+  spaces (`dedup.normalize_key`) against a dict of the formal sentences.
+- Near: otherwise the closest formal sentence by cosine similarity of
+  character 3-gram TF-IDF vectors, from an inverted index in NumPy. It
+  answers only when the similarity reaches `threshold` and the two
+  sentences have the same words up to typos. Character n-grams alone score
+  "i am not very sorry" close to "i am very sorry"; the word check keeps
+  an added "not" (or any other word) from being answered with the wrong
+  translation.
+
+When a formal sentence appears several times, its first row with a
+non-empty informal side is used. The index is rebuilt when the CSV's
+modification time or size changes (a stat at most every `check_interval`
+seconds). Only an actual change starts a rebuild, on a background thread;
+lookups keep using the old index until the new one is ready, so no request
+waits for it.
+
+Configured with SLANG_PHRASEBOOK (the CSV, or "none") and
+SLANG_PHRASEBOOK_THRESHOLD.
+"""
+import csv
+import math
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from Scriptss.dedup import normalize_key
+from Scriptss.preprocess_data import preprocess_text
+from Scriptss.spell import edit_distance
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DATA_PATH = PROJECT_ROOT / "Dataa" / "cleaned_data.csv"
+NGRAM_SIZE = 3
+
+
+def char_ngrams(key, size=NGRAM_SIZE):
+    """Character n-grams of a normalized key, padded with spaces so word edges count."""
+    padded = f" {key} "
+    return [padded[i:i + size] for i in range(max(1, len(padded) - size + 1))]
+
+
+def same_words_up_to_typos(a, b):
+    """Whether two keys have the same number of words and each pair is equal or a small typo apart.
+
+    Words of up to two letters must match exactly, up to five letters one
+    edit apart, longer ones two.
+    """
+    words_a, words_b = a.split(), b.split()
+    if len(words_a) != len(words_b):
+        return False
+    for x, y in zip(words_a, words_b):
+        if x == y:
+            continue
+        shortest = min(len(x), len(y))
+        limit = 0 if shortest <= 2 else 1 if shortest <= 5 else 2
+        if limit == 0 or edit_distance(x, y, limit) > limit:
+            return False
+    return True
+
+
+class PhrasebookIndex:
+    """Immutable exact + TF-IDF index over one version of the data."""
+
+    def __init__(self, formal, informal):
+        self.formal = formal
+        self.informal = informal
+        self.keys = [normalize_key(text) for text in formal]
+        self.exact = {key: i for i, key in enumerate(self.keys)}
+
+        counts = [Counter(char_ngrams(key)) for key in self.keys]
+        self.vocabulary = {}
+        for ngrams in counts:
+            for ngram in ngrams:
+                self.vocabulary.setdefault(ngram, len(self.vocabulary))
+        terms = np.array([self.vocabulary[g] for ngrams in counts for g in ngrams], dtype=np.int64)
+        docs = np.repeat(np.arange(len(counts)), [len(ngrams) for ngrams in counts])
+        tf = np.array([n for ngrams in counts for n in ngrams.values()], dtype=np.float32)
+
+        # Smoothed IDF as in scikit-learn's TfidfVectorizer, then L2-normalized rows
+        df = np.bincount(terms, minlength=len(self.vocabulary))
+        self.idf = (np.log((1 + len(counts)) / (1 + df)) + 1).astype(np.float32)
+        weights = tf * self.idf[terms]
+        norms = np.sqrt(np.bincount(docs, weights=weights ** 2, minlength=len(counts)))
+        weights /= norms[docs]
+
+        # Postings sorted by term: term t's documents are doc_ids[indptr[t]:indptr[t + 1]]
+        order = np.argsort(terms, kind="stable")
+        self.doc_ids = docs[order]
+        self.weights = weights[order].astype(np.float32)
+        self.indptr = np.concatenate([[0], np.cumsum(df)])
+
+    def __len__(self):
+        return len(self.formal)
+
+    def search(self, key):
+        """(row, cosine similarity, exact match) of the closest formal sentence to a normalized key.
+
+        (None, 0.0, False) when no formal sentence shares an n-gram with it.
+        A near match can also score 1.0 (e.g. the same n-grams in another
+        order), so only `exact` says the keys are equal.
+        """
+        i = self.exact.get(key)
+        if i is not None:
+            return i, 1.0, True
+        query = Counter(char_ngrams(key))
+        known = [(self.vocabulary[g], n) for g, n in query.items() if g in self.vocabulary]
+        if not known:
+            return None, 0.0, False
+        terms = np.array([t for t, _ in known])
+        query_weights = np.array([n for _, n in known], dtype=np.float32) * self.idf[terms]
+        # Unknown n-grams still count towards the query's norm
+        unknown = sum(n for g, n in query.items() if g not in self.vocabulary)
+        norm = math.sqrt(float(query_weights @ query_weights) + unknown * float(self.idf.max()) ** 2)
+
+        # Gather every posting of the query's terms at once: run k covers starts[k] .. starts[k] + lengths[k]
+        starts = self.indptr[terms]
+        lengths = self.indptr[terms + 1] - starts
+        postings = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        scale = np.repeat(query_weights / norm, lengths)
+        scores = np.bincount(self.doc_ids[postings], weights=self.weights[postings] * scale, minlength=len(self))
+        best = int(scores.argmax())
+        return best, float(scores[best]), False
+
+
+def read_pairs(path):
+    """Formal and informal texts, one entry per distinct formal sentence."""
+    formal, informal, seen = [], [], set()
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            source = (row.get("formal_text_cleaned") or "").strip()
+            target = (row.get("informal_text_cleaned") or "").strip()
+            key = normalize_key(source)
+            if key and target and key not in seen:
+                seen.add(key)
+                formal.append(source)
+                informal.append(target)
+    return formal, informal
+
+
+class Phrasebook:
+    """Thread-safe lookups against the CSV, reloaded when the file changes."""
+
+    def __init__(self, path=DEFAULT_DATA_PATH, threshold=0.6, check_interval=1.0):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.check_interval = check_interval
+
+        self.index = PhrasebookIndex([], [])
+        self.version = None
+        self.next_check = 0.0
+        self.reloading = False
+        self.lock = threading.Lock()
+        self.reload_lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.lookup_seconds = 0.0
+        self.reload_if_changed()
+
+    @classmethod
+    def from_env(cls):
+        """Builds a phrasebook from SLANG_PHRASEBOOK* environment variables, or None when disabled."""
+        path = os.environ.get("SLANG_PHRASEBOOK", str(DEFAULT_DATA_PATH))
+        if path == "none":
+            return None
+        return cls(path, threshold=float(os.environ.get("SLANG_PHRASEBOOK_THRESHOLD", 0.6)))
+
+    def file_version(self):
+        """(mtime, size) of the CSV, or None if it is missing."""
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload_if_changed(self):
+        """Rebuild the index if the CSV changed; only one thread rebuilds, the others keep the old index."""
+        if not self.reload_lock.acquire(blocking=False):
+            return
+        try:
+            version = self.file_version()
+            if version == self.version:
+                return
+            index = PhrasebookIndex(*read_pairs(self.path)) if version else PhrasebookIndex([], [])
+            with self.lock:
+                self.index, self.version = index, version
+                self.reloads += 1
+        finally:
+            self.reload_lock.release()
+
+    def _check_for_changes(self, now):
+        """Start a background rebuild if the CSV changed since the current index; at most one stat per interval."""
+        with self.lock:
+            if now < self.next_check:
+                return
+            self.next_check = now + self.check_interval
+            if self.reloading or self.file_version() == self.version:
+                return
+            self.reloading = True
+        threading.Thread(target=self._background_reload, name="phrasebook-reload", daemon=True).start()
+
+    def _background_reload(self):
+        try:
+            self.reload_if_changed()
+        finally:
+            with self.lock:
+                self.reloading = False
+
+    def lookup(self, text):
+        """The stored informal text for a formal sentence, or None if nothing is similar enough."""
+        start = time.perf_counter()
+        self._check_for_changes(start)
+        index = self.index
+        key = normalize_key(preprocess_text(text))
+        row, score, exact = index.search(key)
+        hit = exact or (row is not None and score >= self.threshold
+                        and same_words_up_to_typos(key, index.keys[row]))
+        with self.lock:
+            if exact:
+                self.exact_hits += 1
+            elif hit:
+                self.near_hits += 1
+            else:
+                self.misses += 1
+            self.lookup_seconds += time.perf_counter() - start
+        return index.informal[row] if hit else None
+
+    def stats(self):
+        """Hit counters, hit ratio and mean lookup time."""
+        with self.lock:
+            hits = self.exact_hits + self.near_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self.index),
+                "threshold": self.threshold,
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "avg_lookup_us": 1e6 * self.lookup_seconds / lookups if lookups else 0.0,
+                "reloads": self.reloads,
+            }
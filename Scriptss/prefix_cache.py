@@ -0,0 +1,67 @@
+"""
+Shared-prefix KV cache for the fixed instruction prompt.
+
+Every translation prompt starts with `prompts.INSTRUCTION_PREFIX`. The prefix's
+past_key_values are computed once per loaded model; each request then reuses
+them and only prefills its own sentence. Attention is causal, so the cache for
+the first n prefix tokens is just a slice of the full prefix cache, and any
+prompt sharing n leading token IDs with the prefix can start from it.
+"""
+import torch
+
+from Scriptss.kv_cache import from_legacy_cache, slice_cache, to_legacy_cache
+from Scriptss.prompts import INSTRUCTION_PREFIX
+
+
+class PrefixCache:
+    """Precomputed KV state for a fixed prompt prefix on one model."""
+
+    def __init__(self, model, tokenizer, prefix=INSTRUCTION_PREFIX):
+        self.prefix = prefix
+        self.prefix_ids = tokenizer(prefix, add_special_tokens=False)["input_ids"]
+        device = next(model.parameters()).device
+
+        with torch.no_grad():
+            outputs = model(input_ids=torch.tensor([self.prefix_ids], device=device), use_cache=True)
+        self.past = to_legacy_cache(outputs.past_key_values)
+        self.hits = 0
+        self.reused_tokens = 0
+
+    def lookup(self, prompt_ids):
+        """Returns (past_key_values, n) for the longest reusable prefix of prompt_ids.
+
+        At least one prompt token is always left for the caller to prefill, since
+        its logits are needed to sample the first new token.
+        """
+        limit = min(len(self.prefix_ids), len(prompt_ids) - 1)
+        n = 0
+        while n < limit and self.prefix_ids[n] == prompt_ids[n]:
+            n += 1
+        if n == 0:
+            return None, 0
+
+        self.hits += 1
+        self.reused_tokens += n
+        return slice_cache(self.past, end=n), n
+
+
+def prefill(model, prompt_ids, prefix_cache=None):
+    """Runs a prompt through the model, starting from the cached prefix if possible.
+
+    Returns the last position's logits (1, vocab) and the prompt's tuple KV cache.
+    """
+    past, reused = prefix_cache.lookup(prompt_ids) if prefix_cache is not None else (None, 0)
+    device = next(model.parameters()).device
+    input_ids = torch.tensor([prompt_ids[reused:]], device=device)
+
+    with torch.no_grad():
+        if past is None:
+            outputs = model(input_ids=input_ids, use_cache=True)
+        else:
+            outputs = model(
+                input_ids=input_ids,
+                position_ids=torch.arange(reused, len(prompt_ids), device=device).unsqueeze(0),
+                past_key_values=from_legacy_cache(past),
+                use_cache=True,
+            )
+    return outputs.logits[:, -1, :], to_legacy_cache(outputs.past_key_values)
@@ -1,10 +1,22 @@
+import argparse
 import re
 import string
 import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import emoji
 import pandas as pd
-from textblob import TextBlob
+
+# Make the Scriptss package importable when run as `python Scriptss/preprocess_data.py`
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from Scriptss.metrics import span
+from Scriptss.normalizer import Normalizer
+from Scriptss.spell import default_corrector
 
 # --- Preprocessing Functions (from your text_preprocessing_script) ---
 
@@ -45,6 +57,9 @@ contractions_dict = {
     "you'll've": "you will have", "you're": "you are", "you've": "you have"
 }
 
+# Compiled once; produces the same output as the step functions below
+normalizer = Normalizer(contractions_dict)
+
 def expand_contractions(text):
     contractions_pattern = re.compile('({})'.format('|'.join(contractions_dict.keys())), flags=re.IGNORECASE|re.DOTALL)
     def expand_match(contraction):
@@ -67,30 +82,120 @@ def normalize_elongated_words(text):
     return re.sub(r'(.)\1{2,}', r'\1\1', text)
 
 def correct_spelling(text):
-    # Use with caution
-    return str(TextBlob(text).correct())
+    # Protects slang from our data (see spell.py), but still use with caution
+    return default_corrector().correct(text)
 
+@span("preprocess_text")
 def preprocess_text(text):
-    """Applies all preprocessing steps to a single text string."""
-    if not isinstance(text, str):
-        return ""
-    text = expand_contractions(text)
-    text = normalize_case(text)
-    # Punctuation removal and other steps can be context-dependent.
-    # For this task, we'll keep it simple.
-    text = normalize_elongated_words(text)
-    # Spelling correction is disabled by default due to its tendency
-    # to "correct" actual slang. Uncomment if needed.
-    # text = correct_spelling(text)
-    return text
+    """Applies all preprocessing steps to a single text string.
+    
+    Same as expand_contractions -> normalize_case -> normalize_elongated_words,
+    in one compiled pass (see normalizer.py). Punctuation removal and other
+    steps can be context-dependent; for this task, we keep it simple.
+    Spelling correction is disabled due to its tendency to "correct" actual slang.
+    """
+    return normalizer.normalize(text)
 
 # --- Main Script Logic ---
+DEFAULT_CHUNK_SIZE = 10_000
+
+@span("clean_rows")
+def clean_rows(formal_texts, informal_texts):
+    """Cleans each row; rows where either side ends up empty become None."""
+    formal_cleaned = normalizer.normalize_many(formal_texts)
+    informal_cleaned = normalizer.normalize_many(informal_texts)
+    return [
+        (formal, informal) if formal.strip() != '' and informal.strip() != '' else None
+        for formal, informal in zip(formal_cleaned, informal_cleaned)
+    ]
+
+def clean_chunk(formal_texts, informal_texts):
+    """Cleans one chunk of rows, dropping pairs where either side ends up empty."""
+    return [row for row in clean_rows(formal_texts, informal_texts) if row is not None]
+
+class CleanedWriter:
+    """Appends cleaned chunks to a CSV or (by extension) Parquet file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.parquet = self.path.suffix == '.parquet'
+        self.writer = None
+        self.first = True
+
+    def write(self, rows):
+        df = pd.DataFrame(rows, columns=['formal_text_cleaned', 'informal_text_cleaned'], dtype=object)
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+        else:
+            df.to_csv(self.path, index=False, mode='w' if self.first else 'a', header=self.first)
+        self.first = False
+
+    def close(self):
+        if self.first:
+            # No rows at all: still write a valid, empty file
+            self.write([])
+        if self.writer is not None:
+            self.writer.close()
+
+@span("preprocess_file")
+def preprocess_file(input_path, output_path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Streams input_path through the cleaning pipeline into output_path, chunk by chunk.
+
+    Chunks are cleaned on a pool of `workers` processes. At most two chunks per
+    worker are in flight, and results are written in input order, so memory
+    stays bounded by the chunk size however large the input is.
+    Returns (rows read, rows written, first cleaned rows for display).
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = pd.read_csv(input_path, chunksize=chunk_size, usecols=['formal_text', 'informal_text'])
+    writer = CleanedWriter(output_path)
+    rows_read = rows_written = 0
+    sample = []
+
+    def emit(rows):
+        nonlocal rows_written
+        writer.write(rows)
+        rows_written += len(rows)
+        if not sample:
+            sample.extend(rows[:5])
+
+    try:
+        if workers == 1:
+            for chunk in chunks:
+                rows_read += len(chunk)
+                emit(clean_chunk(chunk['formal_text'].tolist(), chunk['informal_text'].tolist()))
+            return rows_read, rows_written, sample
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                rows_read += len(chunk)
+                pending.append(pool.submit(clean_chunk, chunk['formal_text'].tolist(), chunk['informal_text'].tolist()))
+                if len(pending) >= 2 * workers:
+                    emit(pending.popleft().result())
+            while pending:
+                emit(pending.popleft().result())
+        return rows_read, rows_written, sample
+    finally:
+        writer.close()
+
 def main():
     """Reads raw data, preprocesses it, and saves the cleaned data."""
-    # Define file paths
-    data_dir = Path("Dataa")
-    raw_data_path = data_dir / "raw_data_fixed.csv"
-    cleaned_data_path = data_dir / "cleaned_data.csv"
+    parser = argparse.ArgumentParser(description="Clean the raw formal/informal pairs.")
+    parser.add_argument("--input", default="Dataa/raw_data_fixed.csv")
+    parser.add_argument("--output", default="Dataa/cleaned_data.csv", help="CSV, or Parquet if it ends in .parquet")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk")
+    args = parser.parse_args()
+
+    raw_data_path = Path(args.input)
+    cleaned_data_path = Path(args.output)
 
     # Check if raw data file exists
     if not raw_data_path.is_file():
@@ -98,28 +203,16 @@ def main():
         print("Please create the file and add data before running.")
         return
 
-    print(f"Reading raw data from {raw_data_path}...")
-    df = pd.read_csv(raw_data_path)
-
-    print("Preprocessing data...")
-    # Apply the preprocessing pipeline to both columns
-    df['formal_text_cleaned'] = df['formal_text'].apply(preprocess_text)
-    df['informal_text_cleaned'] = df['informal_text'].apply(preprocess_text)
-    
-    # Drop rows where cleaned text is empty
-    df.dropna(subset=['formal_text_cleaned', 'informal_text_cleaned'], inplace=True)
-    df = df[df['formal_text_cleaned'].str.strip() != '']
-    df = df[df['informal_text_cleaned'].str.strip() != '']
-
-
-    print(f"Saving cleaned data to {cleaned_data_path}...")
-    # Select only the cleaned columns to save
-    cleaned_df = df[['formal_text_cleaned', 'informal_text_cleaned']]
-    cleaned_df.to_csv(cleaned_data_path, index=False)
+    print(f"Preprocessing {raw_data_path} into {cleaned_data_path} "
+          f"({args.workers or os.cpu_count()} workers, {args.chunk_size} rows per chunk)...")
+    started = time.perf_counter()
+    rows_read, rows_written, sample = preprocess_file(raw_data_path, cleaned_data_path, args.workers, args.chunk_size)
+    elapsed = time.perf_counter() - started
 
-    print("Preprocessing complete.")
+    print(f"Preprocessing complete: {rows_written}/{rows_read} rows kept in {elapsed:.2f}s "
+          f"({rows_read / elapsed if elapsed else 0:.0f} rows/s).")
     print("\n--- Cleaned Data Sample ---")
-    print(cleaned_df.head())
+    print(pd.DataFrame(sample, columns=['formal_text_cleaned', 'informal_text_cleaned']))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,93 @@
+"""
+Sampling profiler that can be started and stopped in a running server.
+
+While running, a background thread wakes every `interval` seconds and
+records the current Python stack of every other thread. `stop()` returns the
+samples as folded stacks ("outer;inner;leaf count" per line), which
+flamegraph.pl, speedscope and similar tools read directly. Nothing runs
+while the profiler is stopped, so it costs nothing until it is needed.
+
+Time inside native code (a torch forward pass) shows up as the Python line
+that called it, which is enough to tell tokenization, prefill and decode
+apart.
+"""
+import math
+import sys
+import threading
+import time
+from collections import Counter
+
+# Shorter intervals would keep the sampler holding the GIL and stall the threads being profiled
+MIN_INTERVAL = 0.001
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """Start/stop wall-clock stack sampler for all threads of this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopping = threading.Event()
+        self.stacks = Counter()
+        self.samples = 0
+        self.interval = None
+        self.started = None
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def start(self, interval=0.005):
+        """Start sampling every `interval` seconds; returns False if it was already running."""
+        if not math.isfinite(interval) or interval < MIN_INTERVAL:
+            raise ValueError(f"Sampling interval must be at least {1000 * MIN_INTERVAL:g} ms, got {1000 * interval:g} ms")
+        with self.lock:
+            if self.thread is not None:
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self.interval = interval
+            self.started = time.perf_counter()
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self.thread.start()
+            return True
+
+    def stop(self):
+        """Stop sampling and return (folded stacks text, samples taken, seconds sampled)."""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            return "", 0, 0.0
+        self.stopping.set()
+        thread.join()
+        folded = "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+        return folded + "\n" if folded else "", self.samples, time.perf_counter() - self.started
+
+    def status(self):
+        return {
+            "running": self.running,
+            "interval_ms": 1000 * self.interval if self.interval else None,
+            "samples": self.samples,
+        }
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self.stopping.wait(self.interval):
+            names.update((t.ident, t.name) for t in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
@@ -0,0 +1,19 @@
+"""Mistral-instruct prompt templates shared by training, the CLI and the web app."""
+
+# Every prompt starts with this exact text, so its KV cache can be computed once
+INSTRUCTION_PREFIX = "<s>[INST] Translate the following formal English sentence to informal slang: "
+
+
+def build_prompt(formal_sentence):
+    """Formats a formal sentence as an inference prompt (ends right after [/INST])."""
+    return f"{INSTRUCTION_PREFIX}{formal_sentence} [/INST]"
+
+
+def create_instruction_prompt(formal_sentence, slang_sentence):
+    """Formats the sentence pair into the Mistral-instruct prompt format."""
+    return f"{build_prompt(formal_sentence)} {slang_sentence} </s>"
+
+
+def create_instruction_prompts(formal_sentences, slang_sentences):
+    """Column-wise create_instruction_prompt for two pandas string Series."""
+    return INSTRUCTION_PREFIX + formal_sentences + " [/INST] " + slang_sentences + " </s>"
@@ -0,0 +1,222 @@
+"""
+CPU weight quantization for inference.
+
+Two modes, both plain PyTorch on x86 (no GPU libraries):
+
+- "int8": dynamic quantization of every nn.Linear. Weights are stored as
+  per-channel int8 and activations are quantized on the fly, so the matmuls run
+  on int8 kernels (fbgemm/onednn).
+- "int4": weight-only, group-wise symmetric int4 with two weights per byte.
+  Weights are dequantized block by block inside forward; this trades some
+  compute for a ~8x smaller footprint than fp32.
+
+`lm_head` stays in floating point in both modes since it is the most
+quality-sensitive layer. Everything left in floating point runs in fp32.
+
+`quantize_model` converts a model that is already loaded, so the full float
+model has to fit in memory first. `load_quantized` instead reads the
+safetensors checkpoint one tensor at a time into an empty model skeleton and
+quantizes each linear layer as soon as its weights are in, so the peak stays
+close to the quantized size (what lets int4 Mistral-7B run in 8GB).
+"""
+import json
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+QUANTIZATION_MODES = ("none", "int8", "int4")
+SKIP_MODULES = ("lm_head",)
+SAFETENSORS_WEIGHTS = "model.safetensors"
+SAFETENSORS_INDEX = "model.safetensors.index.json"
+
+
+class Int4Linear(nn.Module):
+    """Weight-only int4 linear layer with one fp32 scale per `group_size` inputs."""
+
+    def __init__(self, in_features, out_features, group_size=128, block_rows=1024):
+        super().__init__()
+        self.in_features = in_features
+        self.out_features = out_features
+        self.group_size = group_size
+        self.block_rows = block_rows
+        self.padded_in = -(-in_features // group_size) * group_size
+        self.register_buffer("packed_weight", torch.zeros(out_features, self.padded_in // 2, dtype=torch.uint8))
+        self.register_buffer("scales", torch.ones(out_features, self.padded_in // group_size))
+        self.bias = None
+
+    @classmethod
+    def from_linear(cls, linear, group_size=128):
+        layer = cls(linear.in_features, linear.out_features, group_size)
+        weight = linear.weight.detach().float()
+        if layer.padded_in != layer.in_features:
+            weight = F.pad(weight, (0, layer.padded_in - layer.in_features))
+
+        groups = weight.view(layer.out_features, -1, group_size)
+        scales = (groups.abs().amax(dim=-1, keepdim=True) / 7).clamp(min=1e-8)
+        # Symmetric levels -8..7, stored offset by 8 as unsigned nibbles
+        levels = (groups / scales).round().clamp(-8, 7).to(torch.int16) + 8
+        levels = levels.view(layer.out_features, -1).to(torch.uint8)
+        layer.packed_weight.copy_(levels[:, 0::2] | (levels[:, 1::2] << 4))
+        layer.scales.copy_(scales.squeeze(-1))
+
+        if linear.bias is not None:
+            layer.bias = nn.Parameter(linear.bias.detach().float(), requires_grad=False)
+        return layer
+
+    def dequantize(self, rows=slice(None)):
+        """Float weight for the given output rows."""
+        packed = self.packed_weight[rows]
+        levels = torch.stack([packed & 0x0F, packed >> 4], dim=-1).view(packed.shape[0], -1)
+        weight = (levels.float() - 8).view(packed.shape[0], -1, self.group_size)
+        weight = (weight * self.scales[rows].unsqueeze(-1)).view(packed.shape[0], -1)
+        return weight[:, :self.in_features]
+
+    def forward(self, x):
+        # Dequantizing a block of rows at a time keeps the float copy small enough to stay in cache
+        outputs = [
+            F.linear(x, self.dequantize(slice(start, start + self.block_rows)).to(x.dtype))
+            for start in range(0, self.out_features, self.block_rows)
+        ]
+        out = torch.cat(outputs, dim=-1)
+        return out if self.bias is None else out + self.bias.to(x.dtype)
+
+    def extra_repr(self):
+        return f"in_features={self.in_features}, out_features={self.out_features}, group_size={self.group_size}"
+
+
+def _int8_linear(linear):
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+
+    linear = linear.float()
+    linear.qconfig = torch.ao.quantization.per_channel_dynamic_qconfig
+    return DynamicQuantizedLinear.from_float(linear)
+
+
+def _check_mode(mode):
+    mode = (mode or "none").lower()
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode '{mode}', expected one of {QUANTIZATION_MODES}")
+    return mode
+
+
+def _quantizable(model):
+    """{name: nn.Linear} for every linear layer that gets quantized."""
+    return {
+        name: module for name, module in model.named_modules()
+        if isinstance(module, nn.Linear) and name.rpartition(".")[2] not in SKIP_MODULES
+    }
+
+
+def _replace(model, name, convert):
+    parent_name, _, child_name = name.rpartition(".")
+    parent = model.get_submodule(parent_name) if parent_name else model
+    setattr(parent, child_name, convert(parent.get_submodule(child_name)))
+
+
+def quantize_model(model, mode):
+    """Replaces the model's linear layers in place according to `mode` and returns it."""
+    mode = _check_mode(mode)
+    if mode == "none":
+        return model
+
+    convert = _int8_linear if mode == "int8" else Int4Linear.from_linear
+    # Convert layer by layer so only one float weight is duplicated at a time
+    for name in _quantizable(model):
+        _replace(model, name, convert)
+
+    model.float()
+    model.quantization_mode = mode
+    return model
+
+
+def _checkpoint_files(model_name):
+    """Local paths of the safetensors shards of a model directory or Hugging Face model ID."""
+    if Path(model_name).is_dir():
+        index = Path(model_name) / SAFETENSORS_INDEX
+        if not index.is_file():
+            return [Path(model_name) / SAFETENSORS_WEIGHTS]
+        weight_map = json.loads(index.read_text())["weight_map"]
+        return [Path(model_name) / filename for filename in sorted(set(weight_map.values()))]
+
+    from huggingface_hub import hf_hub_download
+    from huggingface_hub.utils import EntryNotFoundError
+
+    # Only the shards named in the index are fetched, never .bin or consolidated copies
+    try:
+        index = Path(hf_hub_download(model_name, SAFETENSORS_INDEX))
+    except EntryNotFoundError:
+        return [Path(hf_hub_download(model_name, SAFETENSORS_WEIGHTS))]
+    weight_map = json.loads(index.read_text())["weight_map"]
+    return [Path(hf_hub_download(model_name, filename)) for filename in sorted(set(weight_map.values()))]
+
+
+def load_quantized(model_name, mode, torch_dtype=None):
+    """Loads a safetensors checkpoint quantizing each linear layer as it is read. Returns (model, tokenizer).
+
+    Weights go straight from the checkpoint's dtype to fp32 (and, for linear
+    layers, on to int8/int4). Pass `torch_dtype` to round them through that
+    dtype first, e.g. to match a model served in fp16.
+    """
+    from accelerate import init_empty_weights
+    from accelerate.utils import set_module_tensor_to_device
+    from safetensors import safe_open
+    from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer
+
+    mode = _check_mode(mode)
+    if mode == "none":
+        raise ValueError("load_quantized needs a quantization mode; use from_pretrained for 'none'")
+    convert = _int8_linear if mode == "int8" else Int4Linear.from_linear
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    # Parameters are created on the meta device (no memory); buffers stay real. Everything
+    # that is not quantized ends up in fp32, so the skeleton is fp32 from the start
+    with init_empty_weights(include_buffers=False):
+        model = AutoModelForCausalLM.from_config(AutoConfig.from_pretrained(model_name), torch_dtype=torch.float32)
+
+    pending = _quantizable(model)
+    expected = set(model.state_dict().keys())
+    for path in _checkpoint_files(model_name):
+        with safe_open(str(path), framework="pt") as f:
+            for name in f.keys():
+                # Extra entries (e.g. rotary buffers saved by older versions) are ignored like from_pretrained does
+                if name not in expected:
+                    continue
+                tensor = f.get_tensor(name)
+                if tensor.is_floating_point():
+                    tensor = (tensor if torch_dtype is None else tensor.to(torch_dtype)).float()
+                set_module_tensor_to_device(model, name, "cpu", value=tensor)
+                # As soon as a layer has all of its weights, swap it for the quantized one and free the floats
+                module_name = name.rpartition(".")[0]
+                module = pending.get(module_name)
+                if module is not None and all(p.device.type != "meta" for p in module.parameters()):
+                    _replace(model, module_name, convert)
+                    del pending[module_name]
+
+    model.tie_weights()
+    missing = [name for name, param in model.named_parameters() if param.device.type == "meta"]
+    if missing:
+        raise RuntimeError(f"Checkpoint {model_name} is missing weights: {missing[:5]}")
+
+    model.float()
+    model.quantization_mode = mode
+    for param in model.parameters():
+        param.requires_grad_(False)
+    return model.eval(), tokenizer
+
+
+def model_size_bytes(model):
+    """Bytes held by weights and buffers, counting packed int8 weights too."""
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+
+    total = 0
+    for module in model.modules():
+        if isinstance(module, DynamicQuantizedLinear):
+            weight, bias = module._weight_bias()
+            total += weight.numel() * weight.element_size()
+            total += 0 if bias is None else bias.numel() * bias.element_size()
+            continue
+        for tensor in list(module.parameters(recurse=False)) + list(module.buffers(recurse=False)):
+            total += tensor.numel() * tensor.element_size()
+    return total
@@ -0,0 +1,157 @@
+"""
+Translation result cache with normalized keys.
+
+Keys are the formal sentence run through `preprocess_data.preprocess_text`
+(contraction expansion, case folding, elongation collapse) plus the decode
+settings, so "I'm SOOO sorry" and "i am soo sorry" share an entry only when
+they were generated the same way. Entries live in a size-bounded LRU with a
+TTL, optionally backed by a SQLite file that survives restarts.
+
+Sampled outputs (`do_sample=True`) are random draws, so they are only cached
+when `cache_sampled` is set; otherwise the cache is bypassed for them.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from Scriptss.preprocess_data import preprocess_text
+
+
+class TranslationCache:
+    """LRU + TTL cache of translations with an optional SQLite tier."""
+
+    def __init__(self, max_entries=1024, ttl_seconds=24 * 3600, db_path=None,
+                 cache_sampled=False, normalize=preprocess_text):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.cache_sampled = cache_sampled
+        self.normalize = normalize
+
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self._db = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls):
+        """Builds a cache from SLANG_CACHE_* environment variables."""
+        return cls(
+            max_entries=int(os.environ.get("SLANG_CACHE_SIZE", 1024)),
+            ttl_seconds=float(os.environ.get("SLANG_CACHE_TTL", 24 * 3600)),
+            db_path=os.environ.get("SLANG_CACHE_DB") or None,
+            cache_sampled=os.environ.get("SLANG_CACHE_SAMPLED", "0") == "1",
+        )
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def is_cacheable(self, settings):
+        """Only deterministic decodes are cacheable unless cache_sampled is set."""
+        return self.enabled and (self.cache_sampled or not settings.get("do_sample", False))
+
+    def make_key(self, text, settings):
+        """Hashes the normalized text together with the decode settings."""
+        payload = json.dumps([self.normalize(text).strip(), settings], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- Lookup and insert ---
+
+    def get(self, text, settings):
+        """Returns the cached translation, or None on a miss or bypass."""
+        if not self.is_cacheable(settings):
+            with self.lock:
+                self.bypassed += 1
+            return None
+
+        key = self.make_key(text, settings)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created < self.ttl_seconds:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+                self.expirations += 1
+
+            if self.db_path:
+                row = self._connect().execute(
+                    "SELECT value, created FROM translations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] < self.ttl_seconds:
+                    self._insert(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, text, settings, value):
+        """Stores a translation if its decode settings are cacheable."""
+        if not self.is_cacheable(settings):
+            return
+
+        key = self.make_key(text, settings)
+        created = time.time()
+        with self.lock:
+            self._insert(key, value, created)
+            if self.db_path:
+                db = self._connect()
+                db.execute(
+                    "INSERT OR REPLACE INTO translations (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, created),
+                )
+                db.commit()
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "persistent": bool(self.db_path),
+            }
+
+    # --- Internals (callers hold self.lock) ---
+
+    def _insert(self, key, value, created):
+        self.entries[key] = (value, created)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            # Expired rows are dead weight on disk; drop them when the file is opened
+            self._db.execute("DELETE FROM translations WHERE created < ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+        return self._db
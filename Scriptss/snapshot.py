@@ -0,0 +1,167 @@
+"""
+Pre-converted model snapshots for fast cold starts.
+
+`export` merges the base model with an optional LoRA adapter, casts it to the
+runtime dtype once and writes it as safetensors. `load_snapshot` builds the
+model skeleton without allocating weights and points every parameter straight
+at a private (copy-on-write) memory map of those files. Nothing is
+deserialized or copied at startup: pages are faulted in on first use and are
+shared with every other process mapping the same snapshot.
+
+Usage:
+    python Scriptss/snapshot.py export --adapter models/slang_translator_v1/final_checkpoint
+"""
+import argparse
+import json
+import mmap
+import struct
+from pathlib import Path
+
+import torch
+from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer
+
+DEFAULT_BASE_MODEL = "mistralai/Mistral-7B-Instruct-v0.2"
+DEFAULT_SNAPSHOT_DIR = "models/snapshot"
+MANIFEST_NAME = "snapshot.json"
+
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+    "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+    "U8": torch.uint8, "BOOL": torch.bool,
+}
+
+
+def is_snapshot(snapshot_dir):
+    """True if snapshot_dir holds an exported snapshot."""
+    return (Path(snapshot_dir) / MANIFEST_NAME).is_file()
+
+
+# --- Export ---
+
+def export_snapshot(base_model=DEFAULT_BASE_MODEL, adapter_dir=None,
+                    output_dir=DEFAULT_SNAPSHOT_DIR, dtype="float32"):
+    """Merges base model + LoRA adapter and writes a runtime-dtype safetensors snapshot."""
+    torch_dtype = getattr(torch, dtype)
+    print(f"Loading base model {base_model} as {dtype}...")
+    model = AutoModelForCausalLM.from_pretrained(
+        base_model, torch_dtype=torch_dtype, low_cpu_mem_usage=True, trust_remote_code=True
+    )
+    tokenizer = AutoTokenizer.from_pretrained(base_model, trust_remote_code=True)
+
+    if adapter_dir:
+        from peft import PeftModel
+
+        print(f"Merging LoRA adapter from {adapter_dir}...")
+        model = PeftModel.from_pretrained(model, adapter_dir).merge_and_unload()
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Writing snapshot to {output_dir}...")
+    model.save_pretrained(output_dir, safe_serialization=True)
+    tokenizer.save_pretrained(output_dir)
+
+    manifest = {"base_model": base_model, "adapter": adapter_dir, "dtype": dtype}
+    (output_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    print("Snapshot export complete.")
+    return output_dir
+
+
+# --- Memory-mapped loading ---
+
+def mmap_safetensors(path):
+    """Returns {name: tensor} whose storage is a copy-on-write map of the file."""
+    with open(path, "rb") as f:
+        header_len = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_len))
+        # ACCESS_COPY maps the file privately: reads share the page cache, writes stay local
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    data_start = 8 + header_len
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+        numel = (end - start) // torch.empty((), dtype=dtype).element_size()
+        if numel == 0:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        tensor = torch.frombuffer(buffer, dtype=dtype, count=numel, offset=data_start + start)
+        tensors[name] = tensor.view(info["shape"])
+    return tensors
+
+
+def _is_tied(model, name):
+    """Whether `name` is a loaded parameter sharing its storage with another parameter."""
+    params = dict(model.named_parameters(remove_duplicate=False))
+    param = params.get(name)
+    if param is None or param.device.type == "meta":
+        return False
+    return any(other != name and p.data_ptr() == param.data_ptr() for other, p in params.items())
+
+
+def load_snapshot(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """Loads an exported snapshot with memory-mapped weights. Returns (model, tokenizer)."""
+    snapshot_dir = Path(snapshot_dir)
+    manifest = json.loads((snapshot_dir / MANIFEST_NAME).read_text())
+    torch_dtype = getattr(torch, manifest["dtype"])
+    tokenizer = AutoTokenizer.from_pretrained(snapshot_dir)
+    config = AutoConfig.from_pretrained(snapshot_dir)
+
+    try:
+        from accelerate import init_empty_weights
+        from accelerate.utils import set_module_tensor_to_device
+    except ImportError:
+        # Without accelerate we cannot skip weight allocation; fall back to a normal load
+        model = AutoModelForCausalLM.from_pretrained(
+            snapshot_dir, torch_dtype=torch_dtype, low_cpu_mem_usage=True
+        )
+        return model.eval(), tokenizer
+
+    # Parameters are created on the meta device (no memory); buffers stay real
+    with init_empty_weights(include_buffers=False):
+        model = AutoModelForCausalLM.from_config(config, torch_dtype=torch_dtype)
+
+    state_dict = {}
+    for path in sorted(snapshot_dir.glob("*.safetensors")):
+        state_dict.update(mmap_safetensors(path))
+
+    expected = model.state_dict().keys()
+    unexpected = [name for name in state_dict if name not in expected]
+    missing = [name for name in expected if name not in state_dict]
+    # Swap each meta parameter for the mapped tensor itself (no copy; works on torch < 2.1,
+    # which has no load_state_dict(assign=True))
+    for name, tensor in state_dict.items():
+        if name in expected:
+            set_module_tensor_to_device(model, name, "cpu", value=tensor)
+    model.tie_weights()
+    # Tied weights (e.g. lm_head sharing the embedding) may be absent from the files
+    missing = [name for name in missing if not _is_tied(model, name)]
+    if missing or unexpected:
+        raise RuntimeError(
+            f"Snapshot {snapshot_dir} does not match its config "
+            f"(missing: {missing[:5]}, unexpected: {unexpected[:5]})"
+        )
+
+    for param in model.parameters():
+        param.requires_grad_(False)
+    return model.eval(), tokenizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a merged, runtime-dtype safetensors snapshot.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="convert base model (+ LoRA adapter) to a snapshot")
+    export.add_argument("--base-model", default=DEFAULT_BASE_MODEL)
+    export.add_argument("--adapter", default=None, help="LoRA checkpoint from fine_tune.py to merge")
+    export.add_argument("--output", default=DEFAULT_SNAPSHOT_DIR)
+    export.add_argument("--dtype", default="float32", choices=["float32", "bfloat16", "float16"])
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_snapshot(args.base_model, args.adapter, args.output, args.dtype)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Speculative decoding for the generation engine.
+
+A cheap drafter proposes the next few tokens of a sequence and the large
+model scores all of them in one forward pass; since a CPU decode step is
+bound by reading the weights, checking k tokens costs about as much as
+producing one. Drafts are accepted with the speculative sampling rule
+(accept token x with probability min(1, p(x) / q(x)), on rejection sample
+from the normalized max(0, p - q)), so the output has exactly the
+distribution of ordinary sampling with the same temperature and top-p. With
+greedy decoding it is token-for-token identical.
+
+Two drafters:
+  - NgramDrafter: most frequent continuations in the informal side of our
+    data, plus copying from the prompt (slang keeps many of its words).
+    Deterministic, so its q is a point mass.
+  - ModelDrafter: a small causal LM with the same tokenizer, sampling from
+    its own (temperature / top-p) distribution with a per-sequence KV cache.
+
+Selected with SLANG_SPECULATIVE=ngram or SLANG_SPECULATIVE=<draft model>.
+"""
+import csv
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import torch
+
+from Scriptss.engine import token_probabilities
+from Scriptss.kv_cache import from_legacy_cache, slice_cache, to_legacy_cache
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DATA_PATH = PROJECT_ROOT / "Dataa" / "cleaned_data.csv"
+
+
+def verify(draft_tokens, draft_probs, target_probs):
+    """Accepts a prefix of the draft; returns (number accepted, the token that follows it).
+
+    target_probs holds the large model's distribution after the last real token
+    and after each draft token (len(draft_tokens) + 1 rows). draft_probs holds
+    the drafter's distribution for each draft token, or None for a
+    deterministic drafter.
+    """
+    for i, token in enumerate(draft_tokens):
+        p = target_probs[i]
+        if draft_probs is None:
+            accept = p[token]
+            residual = p.clone()
+            residual[token] = 0
+        else:
+            q = draft_probs[i]
+            accept = torch.clamp(p[token] / q[token], max=1.0) if q[token] > 0 else p.new_tensor(1.0)
+            residual = torch.clamp(p - q, min=0)
+        if torch.rand(()) < accept:
+            continue
+        if residual.sum() <= 0:
+            # Only possible through rounding when p and q (nearly) coincide
+            residual = p
+        return i, int(torch.multinomial(residual / residual.sum(), 1))
+    return len(draft_tokens), int(torch.multinomial(target_probs[len(draft_tokens)], 1))
+
+
+def describe(stats):
+    """One line for a request's speculation stats."""
+    return (f"accepted {stats['accepted']}/{stats['drafted']} drafted tokens ({stats['acceptance_rate']:.0%}), "
+            f"{stats['tokens']} tokens in {stats['target_passes']} passes of the model "
+            f"({stats['tokens_per_pass']:.2f}x fewer than one per token)")
+
+
+# --- Drafters ---
+
+class NgramDrafter:
+    """Drafts from n-gram statistics of known responses and from n-grams already in the context."""
+
+    def __init__(self, table, order, eos_token_id):
+        self.table = table
+        self.order = order
+        self.eos_token_id = eos_token_id
+
+    @classmethod
+    def from_data(cls, tokenizer, path=DEFAULT_DATA_PATH, order=4):
+        """Builds the table from the informal side of the cleaned data, tokenized as the model sees it."""
+        from Scriptss.prompts import create_instruction_prompt
+        from Scriptss.training_data import find_subsequence, response_template_ids
+
+        template = response_template_ids(tokenizer)
+        counts = defaultdict(Counter)
+        with open(path, newline="", encoding="utf-8") as f:
+            pairs = [(row["formal_text_cleaned"], row["informal_text_cleaned"]) for row in csv.DictReader(f)]
+        for formal, informal in pairs:
+            ids = tokenizer(create_instruction_prompt(formal, informal), add_special_tokens=False)["input_ids"]
+            start = find_subsequence(ids, template)
+            if start is None:
+                continue
+            # Keep the [/INST] tokens as context, so the first response token has statistics too
+            sequence = ids[start - len(template):]
+            for i in range(len(template), len(sequence)):
+                for n in range(1, order):
+                    counts[tuple(sequence[i - n:i])][sequence[i]] += 1
+        table = {context: c.most_common(1)[0][0] for context, c in counts.items()}
+        return cls(table, order, tokenizer.eos_token_id)
+
+    def _from_table(self, context):
+        for n in range(min(self.order - 1, len(context)), 0, -1):
+            token = self.table.get(tuple(context[-n:]))
+            if token is not None:
+                return token, n
+        return None, 0
+
+    def _from_context(self, context, min_match):
+        """Next token after the latest earlier occurrence of the context's longest possible suffix."""
+        for n in range(min(self.order - 1, len(context) - 1), min_match, -1):
+            suffix = context[-n:]
+            for start in range(len(context) - n - 1, -1, -1):
+                if context[start:start + n] == suffix:
+                    return context[start + n], n
+        return None, 0
+
+    def propose(self, seq, context, max_tokens, settings):
+        context = list(context)
+        tokens = []
+        while len(tokens) < max_tokens:
+            token, matched = self._from_table(context)
+            # Prefer copying when the context matches a longer n-gram than the table does
+            copied, _ = self._from_context(context, max(matched, 1))
+            if copied is not None:
+                token = copied
+            if token is None:
+                break
+            tokens.append(token)
+            context.append(token)
+            if token == self.eos_token_id:
+                break
+        return tokens, None
+
+
+class ModelDrafter:
+    """Drafts by sampling from a small causal LM that shares the target's tokenizer."""
+
+    def __init__(self, model, eos_token_id):
+        self.model = model.eval()
+        self.eos_token_id = eos_token_id
+
+    @classmethod
+    def from_pretrained(cls, name, tokenizer):
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        draft_tokenizer = AutoTokenizer.from_pretrained(name)
+        if draft_tokenizer.get_vocab() != tokenizer.get_vocab():
+            raise ValueError(f"Draft model {name} does not use the same tokenizer as the main model")
+        model = AutoModelForCausalLM.from_pretrained(name, torch_dtype=torch.float32)
+        return cls(model, tokenizer.eos_token_id)
+
+    def propose(self, seq, context, max_tokens, settings):
+        # seq.draft_state: (tokens in the draft cache, the cache); keep what still matches the context
+        cached, past = seq.draft_state or ([], None)
+        keep = 0
+        while keep < min(len(cached), len(context) - 1) and cached[keep] == context[keep]:
+            keep += 1
+        past = slice_cache(past, end=keep) if past is not None and keep else None
+
+        feed = list(context[keep:])
+        tokens, probs = [], []
+        with torch.no_grad():
+            while len(tokens) < max_tokens:
+                outputs = self.model(
+                    input_ids=torch.tensor([feed]),
+                    past_key_values=from_legacy_cache(past) if past is not None else None,
+                    use_cache=True,
+                )
+                past = to_legacy_cache(outputs.past_key_values)
+                q = token_probabilities(outputs.logits[0, -1], **settings)
+                token = int(torch.multinomial(q, 1)) if settings["do_sample"] else int(q.argmax())
+                tokens.append(token)
+                probs.append(q)
+                feed = [token]
+                if token == self.eos_token_id:
+                    break
+        # The last draft token was never fed, so it is not in the cache
+        seq.draft_state = (list(context) + tokens[:-1], past) if tokens else (list(context[:keep]), past)
+        return tokens, torch.stack(probs) if probs else None
+
+
+def load_drafter(spec, tokenizer):
+    """The drafter for SLANG_SPECULATIVE: None for "none", an n-gram drafter for "ngram", else a draft model."""
+    if not spec or spec == "none":
+        return None
+    if spec == "ngram":
+        return NgramDrafter.from_data(tokenizer)
+    return ModelDrafter.from_pretrained(spec, tokenizer)
@@ -0,0 +1,261 @@
+"""
+Fast, slang-aware spelling correction.
+
+A symmetric-delete (SymSpell) index: every dictionary word is stored under
+all strings reachable from its prefix by deleting up to `max_edit_distance`
+characters. A misspelled token only needs its own deletes looked up to find
+every candidate within that distance, instead of generating all edits the
+way TextBlob does. Candidates are ranked like TextBlob's: smallest edit
+distance (with transpositions), then highest corpus frequency.
+
+Slang is protected: the built-in `SLANG_WORDS` ("lol", "brb", "gonna") and
+every word on the informal side of our data are returned unchanged even when
+they are not dictionary words. `DEFAULT_MAPPINGS` rewrite spellings with one
+obvious standard form ("luv" -> "love", "thats" -> "that's"); explicit
+mappings override them. Corrections never land on a one- or two-letter
+fragment of the word list ("ll", "th") unless it is a real word. Per-token
+results are memoized.
+
+The index is built once and pickled:
+    python Scriptss/spell.py build --map cya=bye
+"""
+import argparse
+import csv
+import os
+import pickle
+import re
+import sys
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+# Make the Scriptss package importable when run as `python Scriptss/spell.py`
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+DEFAULT_INDEX_PATH = PROJECT_ROOT / "models" / "spelling.pkl"
+DEFAULT_DATA_PATH = PROJECT_ROOT / "Dataa" / "cleaned_data.csv"
+INDEX_VERSION = 2
+
+# Same split as TextBlob.correct: words, single punctuation marks, single whitespace
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]|\s")
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+# Chat slang and abbreviations that look like typos of dictionary words ("brb" -> "erb")
+SLANG_WORDS = frozenset("""
+    af aight asap bae bday bestie bf bff brb bro bruh btw cuz cya da dm dms dunno fam fomo fr fyi gf gg
+    gimme goat gonna gotta gtg hbu hmu idc idk ig ikr ily imo imho irl jk kinda lemme lit lmao lmfao lmk
+    lol nah ngl nvm np obv omg omw pic pics rofl rn sis smh sorta sup sus tbf tbh til tmi ttyl ty tysm
+    ugh ur wanna wassup wbu wtf wyd xoxo ya yall yep yolo
+""".split())
+
+# Spellings with one obvious standard form; `--map` and the `mappings` argument override these
+DEFAULT_MAPPINGS = {
+    "luv": "love", "u": "you", "ppl": "people", "pls": "please", "plz": "please",
+    "thx": "thanks", "thanx": "thanks", "tho": "though", "thru": "through", "gud": "good",
+    "wat": "what", "wud": "would", "cud": "could", "shud": "should", "b4": "before", "gr8": "great",
+    "l8r": "later", "2day": "today", "2nite": "tonight", "tmrw": "tomorrow",
+    "im": "I'm", "ive": "I've", "thats": "that's", "dont": "don't", "doesnt": "doesn't",
+    "didnt": "didn't", "isnt": "isn't", "arent": "aren't", "wasnt": "wasn't", "werent": "weren't",
+    "havent": "haven't", "hasnt": "hasn't", "couldnt": "couldn't", "wouldnt": "wouldn't",
+    "shouldnt": "shouldn't", "youre": "you're", "theyre": "they're", "whats": "what's", "theres": "there's",
+}
+
+# The only words of one or two letters a correction may produce; the rest of the
+# word list's short entries are fragments such as "ll" (from "I'll") or "th"
+SHORT_WORDS = frozenset("a i ah am an as at be by do go ha he hi if in is it me my no of oh ok on or so to up us we".split())
+
+
+def textblob_word_counts():
+    """Word frequencies shipped with TextBlob (Norvig's big.txt counts)."""
+    import textblob
+
+    counts = {}
+    path = Path(textblob.__file__).parent / "en" / "en-spelling.txt"
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith(";;;") or not line.strip():
+                continue
+            word, count = line.split()
+            counts[word] = int(count)
+    return counts
+
+
+def data_vocabulary(path=DEFAULT_DATA_PATH, column="informal_text_cleaned"):
+    """Every word used in one column of our CSV data."""
+    vocabulary = set()
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            vocabulary.update(re.findall(r"\w+", (row.get(column) or "").lower()))
+    return vocabulary
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (edits + adjacent swaps), or limit + 1 if above limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def deletes(word, max_distance):
+    """All strings reachable from `word` by deleting up to max_distance characters."""
+    result = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        result |= frontier
+    return result
+
+
+class SpellCorrector:
+    """Symmetric-delete spelling corrector with a protected vocabulary."""
+
+    def __init__(self, word_counts, protected=(), mappings=None, max_edit_distance=2,
+                 prefix_length=7, memo_size=100_000):
+        self.word_counts = dict(word_counts)
+        self.protected = frozenset(protected)
+        self.mappings = dict(mappings or {})
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.memo_size = memo_size
+
+        # Indexing only a prefix keeps the index small; candidates are verified in full
+        self.index = {}
+        for word in self.word_counts:
+            for key in deletes(word[:prefix_length], max_edit_distance):
+                self.index.setdefault(key, []).append(word)
+        self._init_memo()
+
+    def _init_memo(self):
+        self.correct_word = lru_cache(maxsize=self.memo_size)(self._correct_word)
+
+    @classmethod
+    def build(cls, data_path=DEFAULT_DATA_PATH, mappings=None, **kwargs):
+        """TextBlob's frequency list, protecting built-in slang and the informal vocabulary of our data."""
+        return cls(textblob_word_counts(), SLANG_WORDS | data_vocabulary(data_path),
+                   {**DEFAULT_MAPPINGS, **(mappings or {})}, **kwargs)
+
+    # --- Serialization ---
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        with open(path, "rb") as f:
+            corrector = pickle.load(f)
+        if not isinstance(corrector, cls) or corrector.version != INDEX_VERSION:
+            raise ValueError(f"{path} is not a spelling index of version {INDEX_VERSION}; rebuild it")
+        return corrector
+
+    def __getstate__(self):
+        state = {key: value for key, value in self.__dict__.items() if key != "correct_word"}
+        state["version"] = INDEX_VERSION
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_memo()
+
+    # --- Correction ---
+
+    def lookup(self, word):
+        """Best dictionary word within max_edit_distance of a lowercase word, or None."""
+        limit = self.max_edit_distance
+        candidates = set()
+        for key in deletes(word[:self.prefix_length], limit):
+            candidates.update(self.index.get(key, ()))
+
+        best, best_key = None, None
+        for candidate in candidates:
+            if len(candidate) <= 2 and candidate not in SHORT_WORDS:
+                continue
+            distance = edit_distance(word, candidate, limit)
+            if distance > limit:
+                continue
+            key = (distance, -self.word_counts[candidate], candidate)
+            if best_key is None or key < best_key:
+                best, best_key = candidate, key
+        return best
+
+    def _correct_word(self, token):
+        lower = token.lower()
+        if lower in self.mappings:
+            replacement = self.mappings[lower]
+        elif (len(lower) < 2 or lower in self.protected or lower in self.word_counts
+              or not WORD_PATTERN.fullmatch(lower)):
+            # Slang, known words, numbers and non-ASCII tokens stay as they are
+            return token
+        else:
+            replacement = self.lookup(lower) or lower
+
+        if token.isupper() and len(token) > 1:
+            return replacement.upper()
+        if token[0].isupper():
+            return replacement[0].upper() + replacement[1:]
+        return replacement
+
+    def correct(self, text):
+        """Corrects every word in text, leaving punctuation and whitespace untouched."""
+        return "".join(self.correct_word(token) if token[0].isalnum() else token
+                       for token in TOKEN_PATTERN.findall(text))
+
+
+# --- Shared instance ---
+
+_default_corrector = None
+_default_corrector_lock = threading.Lock()
+
+
+def default_corrector():
+    """Loads the pickled index (SLANG_SPELL_INDEX), building it in memory if there is none."""
+    global _default_corrector
+    # Concurrent first requests wait for one build or unpickle instead of each running their own
+    if _default_corrector is None:
+        with _default_corrector_lock:
+            if _default_corrector is None:
+                path = Path(os.environ.get("SLANG_SPELL_INDEX", DEFAULT_INDEX_PATH))
+                _default_corrector = SpellCorrector.load(path) if path.is_file() else SpellCorrector.build()
+    return _default_corrector
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the pickled spelling index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="index TextBlob's word list and protect our slang")
+    build.add_argument("--data", default=str(DEFAULT_DATA_PATH), help="CSV whose informal side is protected")
+    build.add_argument("--output", default=str(DEFAULT_INDEX_PATH))
+    build.add_argument("--max-edit-distance", type=int, default=2)
+    build.add_argument("--map", action="append", default=[], metavar="SLANG=WORD",
+                       help="rewrite a token deliberately, on top of DEFAULT_MAPPINGS, e.g. --map cya=bye (repeatable)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        mappings = dict(item.split("=", 1) for item in args.map)
+        corrector = SpellCorrector.build(args.data, mappings, max_edit_distance=args.max_edit_distance)
+        path = corrector.save(args.output)
+        print(f"Indexed {len(corrector.word_counts)} words ({len(corrector.index)} delete keys), "
+              f"{len(corrector.protected)} protected; saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+When to stop generating a translation.
+
+Every request used to get the same 50-token budget, and nothing but </s>
+ended it, so a model that rambles on after the slang sentence keeps paying
+for decode steps. Two rules replace that:
+
+- Length budget: the informal side of our data is about as long as the
+  formal side. `LengthBudget` learns, in tokens of the model's tokenizer,
+  budget(n) = ceil(intercept + slope * n) for an input of n tokens, with
+  slope the 95th percentile of the informal/formal length ratio and
+  intercept the 99th percentile of what is left over, so at least 99% of
+  the training pairs fit. It also learns a minimum length (the 1st
+  percentile ratio) before a sentence stop may end the output.
+- Sentence stop: every informal sentence in the data is a single sentence,
+  so generation ends at the first token that finishes one (., !, ? or a
+  newline) once the minimum length is reached. A "." right after a digit
+  does not count ("3.5").
+
+The generation engine applies both per sequence. For `model.generate`
+(micro-batching path), `criteria()` wraps them as a StoppingCriteria that
+ends the batch once every row is done, then `truncate()` cuts each row at
+its own stop; per-row stopping criteria need transformers >= 4.39.
+Configured with SLANG_ADAPTIVE_LENGTH and SLANG_SENTENCE_STOP.
+"""
+import csv
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+from transformers import StoppingCriteria
+
+from Scriptss.prompts import build_prompt
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DATA_PATH = PROJECT_ROOT / "Dataa" / "cleaned_data.csv"
+SENTENCE_END = (".", "!", "?")
+
+
+class LengthBudget:
+    """Maps an input's length in tokens to (min, max) new tokens for its translation."""
+
+    def __init__(self, intercept, slope, min_ratio, prompt_overhead=0):
+        self.intercept = intercept
+        self.slope = slope
+        self.min_ratio = min_ratio
+        # Prompt tokens that are not the formal sentence (instruction prefix and [/INST])
+        self.prompt_overhead = prompt_overhead
+
+    @classmethod
+    def fit(cls, formal_lengths, informal_lengths, prompt_overhead=0):
+        formal = np.maximum(np.asarray(formal_lengths, dtype=np.float64), 1)
+        informal = np.asarray(informal_lengths, dtype=np.float64)
+        ratios = informal / formal
+        # Very short inputs have erratic ratios; the intercept absorbs them
+        typical = ratios[formal >= 4] if (formal >= 4).any() else ratios
+        slope = float(np.percentile(typical, 95))
+        intercept = max(1.0, float(np.percentile(informal - slope * formal, 99)))
+        return cls(intercept, slope, float(np.percentile(ratios, 1)), prompt_overhead)
+
+    @classmethod
+    def from_data(cls, tokenizer, path=DEFAULT_DATA_PATH):
+        """Fits the budget on the token lengths of the cleaned formal/informal pairs."""
+        with open(path, newline="", encoding="utf-8") as f:
+            pairs = [(row["formal_text_cleaned"], row["informal_text_cleaned"]) for row in csv.DictReader(f)
+                     if row["formal_text_cleaned"] and row["informal_text_cleaned"]]
+        formal = tokenizer([p[0] for p in pairs], add_special_tokens=False)["input_ids"]
+        informal = tokenizer([p[1] for p in pairs], add_special_tokens=False)["input_ids"]
+        overhead = len(tokenizer(build_prompt(""), add_special_tokens=False)["input_ids"])
+        return cls.fit([len(ids) for ids in formal], [len(ids) for ids in informal], overhead)
+
+    def limits(self, input_length, max_new_tokens):
+        """(min, max) new tokens for an input of input_length tokens, capped at max_new_tokens."""
+        budget = min(max_new_tokens, math.ceil(self.intercept + self.slope * input_length))
+        return min(budget, max(1, math.floor(self.min_ratio * input_length))), max(1, budget)
+
+    def describe(self):
+        return {"intercept": round(self.intercept, 3), "slope": round(self.slope, 3), "min_ratio": round(self.min_ratio, 3)}
+
+
+class SentenceStop:
+    """Recognizes, from token IDs alone, a token that ends a sentence."""
+
+    def __init__(self, tokenizer):
+        texts = tokenizer.batch_decode([[i] for i in range(len(tokenizer))])
+        special = set(tokenizer.all_special_ids)
+        self.boundary_ids = {
+            i for i, text in enumerate(texts)
+            if i not in special and ("\n" in text or text.rstrip().endswith(SENTENCE_END))
+        }
+        # "3." followed by "5" is a number, not the end of a sentence
+        self.period_ids = {i for i in self.boundary_ids if texts[i].strip() == "."}
+        self.digit_ids = {i for i, text in enumerate(texts) if text[-1:].isdigit()}
+
+    def is_boundary(self, generated):
+        token = generated[-1]
+        if token not in self.boundary_ids:
+            return False
+        return not (token in self.period_ids and len(generated) > 1 and generated[-2] in self.digit_ids)
+
+
+class StoppingRules:
+    """Length budget and sentence stop together; either may be None (off)."""
+
+    def __init__(self, length_budget=None, sentence_stop=None):
+        self.length_budget = length_budget
+        self.sentence_stop = sentence_stop
+
+    @classmethod
+    def from_env(cls, tokenizer, path=DEFAULT_DATA_PATH):
+        """Rules from SLANG_ADAPTIVE_LENGTH and SLANG_SENTENCE_STOP (both on by default)."""
+        adaptive = os.environ.get("SLANG_ADAPTIVE_LENGTH", "1") == "1" and Path(path).is_file()
+        return cls(
+            LengthBudget.from_data(tokenizer, path) if adaptive else None,
+            SentenceStop(tokenizer) if os.environ.get("SLANG_SENTENCE_STOP", "1") == "1" else None,
+        )
+
+    def limits(self, prompt_length, max_new_tokens):
+        """(min, max) new tokens for a prompt of prompt_length tokens."""
+        if self.length_budget is None:
+            return 0, max_new_tokens
+        input_length = max(1, prompt_length - self.length_budget.prompt_overhead)
+        return self.length_budget.limits(input_length, max_new_tokens)
+
+    def should_stop(self, generated, min_new_tokens):
+        """Whether the completion so far (token IDs, without the prompt) is done."""
+        return (self.sentence_stop is not None and len(generated) >= max(min_new_tokens, 1)
+                and self.sentence_stop.is_boundary(generated))
+
+    def stop_length(self, generated, min_new_tokens, max_new_tokens):
+        """How many tokens of `generated` to keep: up to its first stop, or all of them."""
+        for length in range(1, len(generated) + 1):
+            if length >= max_new_tokens or self.should_stop(generated[:length], min_new_tokens):
+                return length
+        return len(generated)
+
+    def describe(self):
+        """What affects the output, e.g. for result-cache keys."""
+        return {
+            "length_budget": self.length_budget.describe() if self.length_budget else None,
+            "sentence_stop": self.sentence_stop is not None,
+        }
+
+    def criteria(self, attention_mask, max_new_tokens, eos_token_id=None):
+        """A StoppingCriteria for `model.generate` on a left-padded batch, and the batch's max_new_tokens.
+
+        Rows keep generating until the whole batch is done; pass the new
+        tokens through the criteria's `truncate()` afterwards.
+        """
+        limits = [self.limits(int(length), max_new_tokens) for length in attention_mask.sum(dim=1)]
+        return _BatchCriteria(self, attention_mask.shape[1], limits, eos_token_id), max(high for _, high in limits)
+
+
+class _BatchCriteria(StoppingCriteria):
+    """Per-row budgets and sentence stops for transformers' generate loop.
+
+    Returns one bool for the whole batch: before 4.39, transformers calls
+    `any()` on each criterion's result, which fails on a per-row tensor.
+    """
+
+    def __init__(self, rules, prompt_width, limits, eos_token_id=None):
+        self.rules = rules
+        self.prompt_width = prompt_width
+        self.limits = limits
+        # Rows that emitted </s> are done; generate pads them with it from then on
+        self.eos_token_id = eos_token_id
+        self.done = [False] * len(limits)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        # Called after every step, so checking each row's newest token finds its first stop
+        for row, ids in enumerate(input_ids[:, self.prompt_width:].tolist()):
+            low, high = self.limits[row]
+            if not self.done[row]:
+                self.done[row] = (ids[-1] == self.eos_token_id or len(ids) >= high
+                                  or self.rules.should_stop(ids, low))
+        return all(self.done)
+
+    def truncate(self, generated):
+        """Each row's new token IDs (lists) cut at </s>, then at the row's own budget or sentence stop."""
+        rows = []
+        for ids, (low, high) in zip(generated, self.limits):
+            ids = list(ids)
+            if self.eos_token_id in ids:
+                ids = ids[:ids.index(self.eos_token_id)]
+            rows.append(ids[:self.rules.stop_length(ids, low, high)])
+        return rows
@@ -0,0 +1,103 @@
+"""
+Memory-budgeted CPU training for fine_tune.py.
+
+With SLANG_TRAIN_RAM_GB set, fine_tune.py trains under that RAM budget:
+frozen base weights are loaded in bfloat16 while the LoRA weights stay
+float32, activations are recomputed in the backward pass (gradient
+checkpointing), matmuls run under bf16 autocast when the CPU has native bf16
+support, and Adafactor keeps factored optimizer state. The per-device batch
+size is the largest the budget fits, up to the target batch, and gradient
+accumulation makes up the rest.
+
+ResourceLogger prints step time and RSS after every optimizer step, in any mode.
+"""
+import math
+import resource
+import sys
+import time
+
+import torch
+from transformers import TrainerCallback
+
+# Allocator slack, the tokenizer, the dataset and Python itself
+OVERHEAD_BYTES = 2 * 2**30
+# The activation estimate below leaves out temporaries; leave room for them
+ACTIVATION_SAFETY = 1.5
+
+
+def bf16_supported():
+    """Whether the CPU has native bf16 matmuls (AVX512-BF16 / AMX), so autocast speeds things up."""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def rss_bytes():
+    """Current resident set size (Linux), else the peak so far."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def model_bytes(model):
+    """Weights plus, for trainable ones, their gradients and (at most) as much optimizer state."""
+    total = 0
+    for p in model.parameters():
+        size = p.numel() * p.element_size()
+        total += size * 3 if p.requires_grad else size
+    return total
+
+
+def activation_bytes(config, max_length, dtype, checkpointing):
+    """Rough peak activation memory for one training sequence of max_length tokens."""
+    act = torch.finfo(dtype).bits // 8
+    hidden, layers = config.hidden_size, config.num_hidden_layers
+    # One layer's saved tensors: attention inputs/outputs, scores, and the MLP's wide intermediates
+    per_layer = max_length * (10 * hidden + 3 * config.intermediate_size) * act
+    per_layer += config.num_attention_heads * max_length * max_length * 4
+    if checkpointing:
+        # Only each layer's input is kept; one layer at a time is recomputed
+        layer_total = layers * max_length * hidden * act + per_layer
+    else:
+        layer_total = layers * per_layer
+    # Logits and their gradient in float32 dominate the head
+    logits = 2 * max_length * config.vocab_size * 4
+    return layer_total + logits
+
+
+def plan_batches(model, budget_bytes, max_length, target_batch, checkpointing=True, dtype=torch.bfloat16):
+    """(per-device batch size, gradient accumulation steps) that fit budget_bytes, about target_batch per step."""
+    fixed = model_bytes(model) + OVERHEAD_BYTES
+    per_sequence = ACTIVATION_SAFETY * activation_bytes(model.config, max_length, dtype, checkpointing)
+    fits = int((budget_bytes - fixed) // per_sequence)
+    if fits < 1:
+        raise MemoryError(
+            f"RAM budget of {budget_bytes / 2**30:.1f} GB is too small: the model alone needs about "
+            f"{fixed / 2**30:.1f} GB and each sequence {per_sequence / 2**30:.2f} GB more"
+        )
+    batch_size = min(fits, target_batch)
+    return batch_size, math.ceil(target_batch / batch_size)
+
+
+class ResourceLogger(TrainerCallback):
+    """Prints wall time, current RSS and peak RSS for every optimizer step."""
+
+    def __init__(self):
+        self.started = None
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        self.started = time.perf_counter()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        seconds = time.perf_counter() - self.started
+        print(f"step {state.global_step}/{state.max_steps}: {seconds:.2f}s, "
+              f"RSS {rss_bytes() / 2**20:.0f} MB (peak {peak_rss_bytes() / 2**20:.0f} MB)")
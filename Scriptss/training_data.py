@@ -0,0 +1,237 @@
+"""
+Tokenized, packed training data for fine_tune.py.
+
+The tokenized dataset is cached on disk (Dataa/tokenized/<key>) under a key
+made of the dataset file's content hash, the tokenizer's fingerprint and
+max_length, so a run only tokenizes again when one of these changes.
+
+Instead of one padded example per row, several short examples are packed
+into each sequence of up to max_length tokens (best-fit decreasing on their
+lengths), so almost no compute goes to padding. PackedCollator keeps the
+examples independent: position ids restart at every example, the 4D
+attention mask is block-diagonal causal, and no example is trained to
+predict the first token of the next one.
+
+Only the response is trained on: every token up to and including [/INST]
+(the instruction prefix and the formal sentence) is masked out of the loss.
+The boundary is found once per example at tokenization time, by searching the
+token IDs for the tokenized [/INST].
+"""
+import hashlib
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import torch
+
+# Make the Scriptss package importable when run as `python Scriptss/fine_tune.py`
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+DEFAULT_CACHE_DIR = PROJECT_ROOT / "Dataa" / "tokenized"
+# Bump when the cached columns or the tokenization itself change
+CACHE_VERSION = 2
+
+
+# --- Response boundary ---
+
+def response_template_ids(tokenizer):
+    """Token IDs of " [/INST]" as they appear inside a tokenized prompt.
+
+    Tokenized on its own, the marker can split differently than in context,
+    so it is taken as the difference between a prompt with and without it.
+    """
+    from Scriptss.prompts import INSTRUCTION_PREFIX, build_prompt
+
+    with_marker = tokenizer(build_prompt("hello"), add_special_tokens=False)["input_ids"]
+    without_marker = tokenizer(INSTRUCTION_PREFIX + "hello", add_special_tokens=False)["input_ids"]
+    common = 0
+    while common < len(without_marker) and with_marker[common] == without_marker[common]:
+        common += 1
+    return with_marker[common:]
+
+
+def find_subsequence(ids, pattern):
+    """Index just past the first occurrence of pattern in ids (one left-to-right pass), or None."""
+    first, size = pattern[0], len(pattern)
+    for i in range(len(ids) - size + 1):
+        if ids[i] == first and ids[i:i + size] == pattern:
+            return i + size
+    return None
+
+
+# --- Tokenization cache ---
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_text_dataset(path):
+    """The formatted dataset: the memory-mapped Arrow file, or JSONL."""
+    from datasets import Dataset, load_dataset
+
+    if Path(path).suffix == ".arrow":
+        return Dataset.from_file(str(path))
+    return load_dataset("json", data_files=str(path), split="train")
+
+
+def cache_key(data_path, tokenizer, max_length):
+    from datasets.fingerprint import Hasher
+
+    parts = {
+        "version": CACHE_VERSION,
+        "data": file_hash(data_path),
+        "tokenizer": Hasher.hash(tokenizer),
+        "max_length": max_length,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def tokenized_dataset(data_path, tokenizer, max_length=256, cache_dir=DEFAULT_CACHE_DIR):
+    """Returns (dataset, whether it came from the cache).
+
+    Columns: `input_ids`, `length` and `prompt_length`, the number of leading
+    tokens up to and including [/INST]. It is `length` (nothing supervised)
+    when the marker is missing, e.g. when truncation cut it off.
+    """
+    from datasets import load_from_disk
+
+    path = Path(cache_dir) / cache_key(data_path, tokenizer, max_length)
+    if path.is_dir():
+        return load_from_disk(str(path)), True
+
+    template = response_template_ids(tokenizer)
+
+    def tokenize(examples):
+        input_ids = tokenizer(examples["text"], truncation=True, padding=False, max_length=max_length)["input_ids"]
+        prompt_lengths = [find_subsequence(ids, template) for ids in input_ids]
+        return {
+            "input_ids": input_ids,
+            "length": [len(ids) for ids in input_ids],
+            "prompt_length": [len(ids) if n is None else n for ids, n in zip(input_ids, prompt_lengths)],
+        }
+
+    dataset = load_text_dataset(data_path)
+    tokenized = dataset.map(tokenize, batched=True, remove_columns=dataset.column_names)
+
+    # Write next to the final location and rename, so an interrupted run leaves no half-written cache
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tokenized.save_to_disk(str(tmp))
+    tmp.rename(path)
+    return load_from_disk(str(path)), False
+
+
+# --- Packing ---
+
+def pack_lengths(lengths, max_length):
+    """Groups example indices into bins whose lengths sum to at most max_length (best-fit decreasing)."""
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    bins = []
+    # Open bins by free space; lengths are bounded by max_length, so finding the best fit is a short scan
+    by_space = [[] for _ in range(max_length + 1)]
+    for i in order:
+        length = min(lengths[i], max_length)
+        space = next((s for s in range(length, max_length + 1) if by_space[s]), None)
+        if space is None:
+            bins.append([i])
+            b = len(bins) - 1
+            space = max_length
+        else:
+            b = by_space[space].pop()
+            bins[b].append(i)
+        by_space[space - length].append(b)
+    return bins
+
+
+class PackedDataset(torch.utils.data.Dataset):
+    """Each item is a packed sequence: {"segments": [input_ids of each example], "prompt_lengths": [...]}.
+
+    With completion_only=False every token is supervised (prompt lengths of 1,
+    since an example's first token is never a target). Otherwise examples with
+    no response tokens left are skipped, as they would add compute but no loss.
+    """
+
+    def __init__(self, tokenized, max_length=256, completion_only=True):
+        self.input_ids = tokenized["input_ids"]
+        lengths = tokenized["length"]
+        self.prompt_lengths = tokenized["prompt_length"] if completion_only else [1] * len(lengths)
+        usable = [i for i, length in enumerate(lengths) if self.prompt_lengths[i] < length]
+        self.skipped = len(lengths) - len(usable)
+        self.bins = [[usable[j] for j in b] for b in pack_lengths([lengths[i] for i in usable], max_length)]
+
+    def __len__(self):
+        return len(self.bins)
+
+    def __getitem__(self, index):
+        return {
+            "segments": [self.input_ids[i] for i in self.bins[index]],
+            "prompt_lengths": [self.prompt_lengths[i] for i in self.bins[index]],
+        }
+
+    def stats(self):
+        examples = [i for b in self.bins for i in b]
+        tokens = sum(len(self.input_ids[i]) for i in examples)
+        supervised = sum(len(self.input_ids[i]) - self.prompt_lengths[i] for i in examples)
+        return {
+            "examples": len(examples),
+            "sequences": len(self.bins),
+            "tokens": tokens,
+            "supervised_tokens": supervised,
+            "skipped_examples": self.skipped,
+        }
+
+
+class PackedCollator:
+    """Pads packed sequences into a batch with block-diagonal causal attention.
+
+    Returns input_ids, labels (-100 over each example's prompt), position_ids
+    (restarting at each example) and a (batch, 1, length, length) additive
+    attention mask in `mask_dtype`.
+    """
+
+    def __init__(self, pad_token_id, mask_dtype=torch.float32):
+        self.pad_token_id = pad_token_id
+        self.mask_dtype = mask_dtype
+
+    def __call__(self, features):
+        width = max(sum(len(s) for s in f["segments"]) for f in features)
+        batch = len(features)
+        input_ids = torch.full((batch, width), self.pad_token_id, dtype=torch.long)
+        labels = torch.full((batch, width), -100, dtype=torch.long)
+        position_ids = torch.zeros((batch, width), dtype=torch.long)
+        # 0 marks padding; examples in a row are numbered from 1
+        segment_ids = torch.zeros((batch, width), dtype=torch.long)
+
+        for row, feature in enumerate(features):
+            offset = 0
+            prompt_lengths = feature.get("prompt_lengths") or [1] * len(feature["segments"])
+            for number, (segment, prompt_length) in enumerate(zip(feature["segments"], prompt_lengths), 1):
+                end = offset + len(segment)
+                ids = torch.tensor(segment, dtype=torch.long)
+                input_ids[row, offset:end] = ids
+                # Only the response is a target; the first token never is, since in a packed
+                # row it would be predicted from the previous example's last token
+                labels[row, offset + max(prompt_length, 1):end] = ids[max(prompt_length, 1):]
+                position_ids[row, offset:end] = torch.arange(len(segment))
+                segment_ids[row, offset:end] = number
+                offset = end
+
+        same_segment = (segment_ids[:, :, None] == segment_ids[:, None, :]) & (segment_ids[:, :, None] > 0)
+        causal = torch.ones((width, width), dtype=torch.bool).tril()
+        # Padding rows attend to themselves only, which keeps the softmax finite
+        allowed = (same_segment & causal) | torch.eye(width, dtype=torch.bool)
+        attention_mask = torch.zeros((batch, 1, width, width), dtype=self.mask_dtype)
+        attention_mask.masked_fill_(~allowed[:, None], torch.finfo(self.mask_dtype).min)
+
+        return {
+            "input_ids": input_ids,
+            "labels": labels,
+            "position_ids": position_ids,
+            "attention_mask": attention_mask,
+        }
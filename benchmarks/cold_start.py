@@ -0,0 +1,103 @@
+"""
+Model cold-start time: Hugging Face checkpoint vs. memory-mapped snapshot.
+
+Each load runs in a fresh Python process so nothing is reused between runs.
+The OS page cache is shared, though: run with `--drop-caches` as root (or
+reboot between runs) for a true cold-disk comparison.
+
+Usage (from the repo root, after `python Scriptss/snapshot.py export`):
+    python -m benchmarks.cold_start --model mistralai/Mistral-7B-Instruct-v0.2 --snapshot models/snapshot
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (Linux /proc, else peak RSS)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode, source, dtype):
+    """Load the model once and print timings as a JSON line."""
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    from Scriptss.snapshot import load_snapshot
+
+    start = time.perf_counter()
+    if mode == "hub":
+        model = AutoModelForCausalLM.from_pretrained(source, torch_dtype=getattr(torch, dtype))
+    else:
+        model, _ = load_snapshot(source)
+    load_seconds = time.perf_counter() - start
+    rss_after_load = rss_mb()
+
+    # First forward pass pays for the page faults the mmap path deferred
+    start = time.perf_counter()
+    with torch.no_grad():
+        model(input_ids=torch.tensor([[1, 2, 3, 4]]))
+    first_forward = time.perf_counter() - start
+
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "first_forward_seconds": first_forward,
+        "rss_after_load_mb": rss_after_load,
+        "rss_after_forward_mb": rss_mb(),
+    }))
+
+
+def run_child(mode, source, dtype, drop_caches):
+    if drop_caches:
+        subprocess.run(["sh", "-c", "sync && echo 3 > /proc/sys/vm/drop_caches"], check=True)
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.cold_start", "--child", mode, "--source", source, "--dtype", dtype],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="mistralai/Mistral-7B-Instruct-v0.2")
+    parser.add_argument("--snapshot", default="models/snapshot")
+    parser.add_argument("--dtype", default="float32", help="dtype for the checkpoint load")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--drop-caches", action="store_true")
+    parser.add_argument("--child", choices=["hub", "snapshot"], help=argparse.SUPPRESS)
+    parser.add_argument("--source", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.source, args.dtype)
+        return
+
+    results = {}
+    for mode, source in (("hub", args.model), ("snapshot", args.snapshot)):
+        runs = [run_child(mode, source, args.dtype, args.drop_caches) for _ in range(args.runs)]
+        results[mode] = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+
+    print(f"{'path':<10} {'load s':>8} {'1st fwd s':>10} {'RSS load MB':>12} {'RSS fwd MB':>11}")
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['load_seconds']:8.2f} {r['first_forward_seconds']:10.2f} "
+              f"{r['rss_after_load_mb']:12.0f} {r['rss_after_forward_mb']:11.0f}")
+    hub, snap = results["hub"], results["snapshot"]
+    total_hub = hub["load_seconds"] + hub["first_forward_seconds"]
+    total_snap = snap["load_seconds"] + snap["first_forward_seconds"]
+    print(f"\nLoad + first forward speedup: {total_hub / total_snap:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Near-duplicate detection: scaling with rows, and how many planted
+duplicates are found.
+
+Builds synthetic corpora of distinct formal sentences (random word sequences
+over the vocabulary of Dataa/cleaned_data.csv), then plants near duplicates
+of some of them: a changed letter, dropped punctuation, changed case or
+doubled spaces. Reports rows/sec at each size (roughly constant if the cost
+is linear), the share of planted duplicates collapsed into their original
+(recall) and the number of distinct sentences wrongly merged.
+
+Usage (from the repo root):
+    python -m benchmarks.dedup --rows 100000 200000 400000
+"""
+import argparse
+import random
+import re
+import time
+
+import pandas as pd
+
+from Scriptss.dedup import dedup_frame
+
+
+def perturb(text, rng):
+    kind = rng.randrange(4)
+    if kind == 0:
+        i = rng.randrange(len(text))
+        return text[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + text[i + 1:]
+    if kind == 1:
+        return text.rstrip(".?!") + rng.choice([".", "!", "?", ""])
+    if kind == 2:
+        return text.capitalize()
+    return text.replace(" ", "  ", 1)
+
+
+def make_corpus(vocabulary, rows, duplicate_share, rng):
+    """Returns (DataFrame, number of distinct originals)."""
+    originals = max(1, int(rows * (1 - duplicate_share)))
+    formal = [" ".join(rng.choices(vocabulary, k=rng.randint(6, 14))) + "." for _ in range(originals)]
+    source = list(range(originals))
+    for _ in range(rows - originals):
+        original = rng.randrange(originals)
+        formal.append(perturb(formal[original], rng))
+        source.append(original)
+    informal = [f"slang {i}" for i in source]
+    return pd.DataFrame({"formal_text_cleaned": formal, "informal_text_cleaned": informal, "source": source}), originals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="Dataa/cleaned_data.csv")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 200_000, 400_000])
+    parser.add_argument("--duplicate-share", type=float, default=0.2, help="fraction of rows that are planted duplicates")
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.data, keep_default_na=False)
+    vocabulary = sorted({w for text in data["formal_text_cleaned"] for w in re.findall(r"[a-z]+", text)})
+    rng = random.Random(0)
+
+    print(f"{'rows':>9} {'seconds':>8} {'rows/s':>9} {'recall':>7} {'false merges':>13}")
+    for rows in args.rows:
+        df, originals = make_corpus(vocabulary, rows, args.duplicate_share, rng)
+        start = time.perf_counter()
+        deduped, _ = dedup_frame(df)
+        elapsed = time.perf_counter() - start
+
+        # Every original survives exactly once if recall is perfect and nothing distinct was merged
+        kept_sources = deduped["source"].nunique()
+        false_merges = originals - kept_sources
+        planted = rows - originals
+        recall = (rows - len(deduped) - false_merges) / planted if planted else 1.0
+        print(f"{rows:9d} {elapsed:8.2f} {rows / elapsed:9.0f} {recall:7.1%} {false_merges:13d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Dataset formatting: row-by-row iterrows + json.dumps vs. the vectorized
+Arrow writer, and JSONL parsing vs. memory-mapping at training time.
+
+A synthetic CSV is built by repeating Dataa/raw_data_fixed.csv. Both
+formatters run over it, their texts are checked for equality, and the time
+to load the result the way fine_tune.py does is measured for each format.
+
+Usage (from the repo root):
+    python -m benchmarks.format_data --rows 200000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from Scriptss.format_data import format_file
+from Scriptss.prompts import create_instruction_prompt
+
+
+def iterrows_format(input_path, jsonl_path):
+    """The previous format_data.main loop."""
+    df = pd.read_csv(input_path)
+    df['formal_text'] = df['formal_text'].astype(str)
+    df['informal_text'] = df['informal_text'].astype(str)
+    formatted_data = []
+    for _, row in df.iterrows():
+        formal_text = row['formal_text'].strip()
+        informal_text = row['informal_text'].strip()
+        if len(formal_text) < 3 or len(informal_text) < 3:
+            continue
+        formatted_data.append({"text": create_instruction_prompt(formal_text, informal_text)})
+    with open(jsonl_path, 'w', encoding='utf-8') as f:
+        for item in formatted_data:
+            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+    return len(formatted_data)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="Dataa/raw_data_fixed.csv")
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    from datasets import Dataset, load_dataset
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = pd.read_csv(args.source)
+        corpus = os.path.join(tmp, "corpus.csv")
+        copies = -(-args.rows // len(source))
+        pd.concat([source] * copies, ignore_index=True).head(args.rows).to_csv(corpus, index=False)
+        _, read_seconds = timed(lambda: pd.read_csv(corpus))
+
+        old_jsonl, new_jsonl, arrow = (os.path.join(tmp, name) for name in ("old.jsonl", "new.jsonl", "new.arrow"))
+        old_count, old_seconds = timed(lambda: iterrows_format(corpus, old_jsonl))
+        new_count, new_seconds = timed(lambda: format_file(corpus, arrow))
+        _, both_seconds = timed(lambda: format_file(corpus, arrow, new_jsonl))
+
+        cache_dir = os.path.join(tmp, "hf_cache")
+        json_dataset, json_load = timed(lambda: load_dataset("json", data_files=old_jsonl, split="train",
+                                                             cache_dir=cache_dir))
+        arrow_dataset, arrow_load = timed(lambda: Dataset.from_file(arrow))
+
+        identical = old_count == new_count and json_dataset["text"] == arrow_dataset["text"]
+        same_jsonl = open(old_jsonl, "rb").read() == open(new_jsonl, "rb").read()
+
+    print(f"{args.rows} rows -> {new_count} examples (pandas read_csv alone: {read_seconds:.2f}s)\n")
+    print(f"{'step':<34} {'seconds':>8}")
+    print(f"{'iterrows + json.dumps (old)':<34} {old_seconds:8.2f}")
+    print(f"{'vectorized -> Arrow':<34} {new_seconds:8.2f}   {old_seconds / new_seconds:.1f}x faster")
+    print(f"{'vectorized -> Arrow + JSONL':<34} {both_seconds:8.2f}")
+    print(f"{'load_dataset(json) (old)':<34} {json_load:8.2f}")
+    print(f"{'Dataset.from_file(arrow)':<34} {arrow_load:8.2f}   {json_load / arrow_load:.0f}x faster")
+    print(f"\nSame examples: {identical}; JSONL byte-identical: {same_jsonl}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+"""
+End-to-end inference: latency percentiles and throughput at growing concurrency.
+
+Replays formal sentences from Dataa/cleaned_data.csv (or, with --synthetic, a
+seeded mix of short, medium and long sentences made from its words) against
+`infer.translate_text` in this process and against the web app's /translate
+endpoint over HTTP, with 1, 4, 8, ... requests in flight. For every level it
+reports p50/p95/p99 latency, time to first token, tokens/sec (of the
+translations, re-tokenized), requests/sec and peak RSS, and writes all of it
+with the commit and library versions to a JSON file; --baseline prints the
+change against an earlier file.
+
+By default it needs no download: `--model tiny` builds a randomly initialized
+two-layer Mistral with a BPE tokenizer trained on our CSV into models/tiny
+(once, in seconds). Its translations are gibberish that runs to the length
+budget, which is all the timings need. Decoding is greedy, and the phrasebook
+and result cache are off unless --fast-paths, so every request runs the model.
+
+The HTTP mode starts `python web_app/app.py` on a free port and waits for
+/ready, unless --url points at a running server (then peak RSS is unknown).
+With --stream it uses /translate/stream and times the first token event in
+the client; /translate reports the server's own time to first token.
+
+Usage (from the repo root):
+    python -m benchmarks.inference --concurrency 1 4 8 --requests 32 --output bench.json
+    python -m benchmarks.inference --output new.json --baseline bench.json
+    python -m benchmarks.inference --model mistralai/Mistral-7B-Instruct-v0.2 --modes http --url http://localhost:5001
+"""
+import argparse
+import csv
+import importlib
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from Scriptss.prompts import build_prompt
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+TINY_MODEL_DIR = PROJECT_ROOT / "models" / "tiny"
+
+# Word counts of the synthetic mix: (share, fewest, most)
+SYNTHETIC_MIX = [(0.5, 4, 8), (0.35, 12, 24), (0.15, 40, 60)]
+
+
+# --- Workload ---
+
+def read_formal(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row["formal_text_cleaned"] for row in csv.DictReader(f) if row["formal_text_cleaned"]]
+
+
+def build_workload(path, count, synthetic, seed):
+    """`count` formal sentences, the same for the same arguments."""
+    rng = random.Random(seed)
+    formal = read_formal(path)
+    if not synthetic:
+        # Cycle through a shuffled copy so counts above the data size still work
+        order = rng.sample(formal, len(formal))
+        return [order[i % len(order)] for i in range(count)]
+    words = sorted({word for text in formal for word in text.split()})
+    sentences = []
+    for _ in range(count):
+        _, fewest, most = rng.choices(SYNTHETIC_MIX, weights=[m[0] for m in SYNTHETIC_MIX])[0]
+        sentence = " ".join(rng.choices(words, k=rng.randint(fewest, most)))
+        sentences.append(sentence[:1].upper() + sentence[1:] + ".")
+    return sentences
+
+
+def build_tiny_model(path, data):
+    """A randomly initialized two-layer Mistral and a BPE tokenizer trained on our pairs, built once."""
+    if (path / "config.json").is_file():
+        return
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import MistralConfig, MistralForCausalLM, PreTrainedTokenizerFast
+
+    print(f"Building a tiny random model in {path}...")
+    with open(data, newline="", encoding="utf-8") as f:
+        texts = [text for row in csv.DictReader(f)
+                 for text in (row["formal_text_cleaned"], row["informal_text_cleaned"]) if text]
+    texts.append(build_prompt(""))
+    bpe = Tokenizer(models.BPE(unk_token="<unk>"))
+    bpe.pre_tokenizer = pre_tokenizers.Metaspace()
+    bpe.decoder = decoders.Metaspace()
+    bpe.train_from_iterator(texts, trainers.BpeTrainer(vocab_size=800, special_tokens=["<unk>", "<s>", "</s>"]))
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=bpe, bos_token="<s>", eos_token="</s>", unk_token="<unk>")
+
+    config = MistralConfig(
+        vocab_size=len(tokenizer), hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=512,
+        bos_token_id=tokenizer.bos_token_id, eos_token_id=tokenizer.eos_token_id, sliding_window=None,
+    )
+    torch.manual_seed(0)
+    tokenizer.save_pretrained(path)
+    MistralForCausalLM(config).save_pretrained(path)
+
+
+def model_environment(model, sample, fast_paths):
+    """SLANG_* settings shared by the in-process and the HTTP run."""
+    env = {
+        "SLANG_MODEL": model,
+        # A snapshot directory passed as --model is memory-mapped; anything else loads SLANG_MODEL
+        "SLANG_SNAPSHOT_DIR": model,
+        "SLANG_DO_SAMPLE": "1" if sample else "0",
+    }
+    if Path(model).is_dir():
+        # Local weights: fail fast instead of falling back to a download
+        env["HF_HUB_OFFLINE"] = "1"
+    if not fast_paths:
+        env.update(SLANG_PHRASEBOOK="none", SLANG_CACHE_SIZE="0")
+    return env
+
+
+# --- Measurement ---
+
+def percentiles(values):
+    if not values:
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 1), "p95": round(float(p95), 1), "p99": round(float(p99), 1),
+            "mean": round(float(np.mean(values)), 1)}
+
+
+def run_level(call, sentences, concurrency, count_tokens):
+    """Sends every sentence through `call` with `concurrency` requests in flight.
+
+    `call(sentence)` returns (text, time to first token in seconds or None) and
+    raises on failure.
+    """
+    def timed(sentence):
+        start = time.perf_counter()
+        try:
+            text, first_token = call(sentence)
+        except Exception as e:
+            return {"error": str(e)}
+        return {"latency": time.perf_counter() - start, "first_token": first_token, "text": text}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, sentences))
+    seconds = time.perf_counter() - start
+
+    done = [r for r in results if "error" not in r]
+    errors = [r["error"] for r in results if "error" in r]
+    tokens = sum(count_tokens(r["text"]) for r in done)
+    first_tokens = [1000 * r["first_token"] for r in done if r["first_token"] is not None]
+    return {
+        "concurrency": concurrency,
+        "requests": len(sentences),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": round(seconds, 3),
+        "latency_ms": percentiles([1000 * r["latency"] for r in done]),
+        "time_to_first_token_ms": percentiles(first_tokens),
+        "tokens": tokens,
+        "tokens_per_second": round(tokens / seconds, 1),
+        "requests_per_second": round(len(done) / seconds, 2),
+    }
+
+
+def peak_rss_mb(pid=None):
+    """Peak resident set size of a process (Linux /proc), or of this one via getrusage."""
+    if pid is not None:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes
+    return round(kb / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# --- In-process: infer.translate_text ---
+
+class RecordingEngine:
+    """Passes calls through to the engine, keeping each thread's last submitted Future."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.local = threading.local()
+
+    def submit(self, prompt, max_new_tokens=None):
+        self.local.future = self.engine.submit(prompt, max_new_tokens)
+        return self.local.future
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+
+def run_inprocess(env, workload, levels, warmup):
+    os.environ.update(env)
+    infer = importlib.import_module("Scriptss.infer")
+    engine, tokenizer = infer.load_model()
+    if engine is None:
+        raise RuntimeError(f"Could not load {env['SLANG_MODEL']}")
+    engine = RecordingEngine(engine)
+
+    def call(sentence):
+        engine.local.future = None
+        text = infer.translate_text(engine, tokenizer, sentence)
+        # translate_text reports failures as text
+        if text.startswith("Translation failed"):
+            raise RuntimeError(text)
+        future = engine.local.future
+        return text, getattr(future, "time_to_first_token", None)
+
+    def count_tokens(text):
+        return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    for sentence in warmup:
+        call(sentence)
+    results = []
+    for concurrency in levels:
+        result = run_level(call, workload, concurrency, count_tokens)
+        result["peak_rss_mb"] = peak_rss_mb()
+        results.append(result)
+        print_level("inprocess", result)
+    engine.stop()
+    return results, count_tokens
+
+
+# --- HTTP: the web app's /translate ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(env, timeout):
+    """Starts web_app/app.py and waits until /ready; returns (process, url, log path)."""
+    port = free_port()
+    log = tempfile.NamedTemporaryFile(prefix="slang-bench-", suffix=".log", delete=False)
+    process = subprocess.Popen(
+        [sys.executable, str(PROJECT_ROOT / "web_app" / "app.py")],
+        env={**os.environ, **env, "PORT": str(port), "SLANG_EAGER_LOAD": "1"},
+        stdout=log, stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            with urllib.request.urlopen(f"{url}/ready", timeout=5) as response:
+                if json.load(response)["ready"]:
+                    return process, url, log.name
+        except urllib.error.HTTPError as e:
+            if json.load(e).get("status") == "failed":
+                break
+        except OSError:
+            pass
+        time.sleep(0.5)
+    process.kill()
+    raise RuntimeError(f"Web app did not become ready; see {log.name}")
+
+
+def post(url, text, timeout):
+    request = urllib.request.Request(url, data=json.dumps({"text": text}).encode(),
+                                     headers={"Content-Type": "application/json"})
+    return urllib.request.urlopen(request, timeout=timeout)
+
+
+def translate_call(url, timeout):
+    def call(sentence):
+        with post(f"{url}/translate", sentence, timeout) as response:
+            body = json.load(response)
+        first_token = body.get("time_to_first_token_ms")
+        return body["informal"], first_token / 1000 if first_token is not None else None
+    return call
+
+
+def stream_call(url, timeout):
+    def call(sentence):
+        start = time.perf_counter()
+        first_token = None
+        event = None
+        with post(f"{url}/translate/stream", sentence, timeout) as response:
+            for line in response:
+                line = line.decode().rstrip("\n")
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                    if event == "token" and first_token is None:
+                        first_token = time.perf_counter() - start
+                elif line.startswith("data: ") and event == "done":
+                    return json.loads(line[len("data: "):])["informal"], first_token
+                elif line.startswith("data: ") and event == "error":
+                    raise RuntimeError(json.loads(line[len("data: "):])["error"])
+        raise RuntimeError("Stream ended without a done event")
+    return call
+
+
+def run_http(env, workload, levels, warmup, args, count_tokens):
+    process = log = None
+    url = args.url
+    if url is None:
+        process, url, log = start_server(env, args.startup_timeout)
+    try:
+        call = (stream_call if args.stream else translate_call)(url.rstrip("/"), args.timeout)
+        for sentence in warmup:
+            call(sentence)
+        results = []
+        for concurrency in levels:
+            result = run_level(call, workload, concurrency, count_tokens)
+            result["peak_rss_mb"] = peak_rss_mb(process.pid) if process else None
+            results.append(result)
+            print_level("http", result)
+        return results
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+            os.unlink(log)
+
+
+# --- Reporting ---
+
+def print_level(mode, r):
+    latency = r["latency_ms"] or {}
+    first = r["time_to_first_token_ms"] or {}
+    print(f"{mode:<10} {r['concurrency']:>4} {latency.get('p50', 0):9.1f} {latency.get('p95', 0):9.1f} "
+          f"{latency.get('p99', 0):9.1f} {first.get('p50', 0):9.1f} {r['tokens_per_second']:8.1f} "
+          f"{r['requests_per_second']:7.2f} {r['peak_rss_mb'] or 0:9.0f} {r['errors']:4d}")
+    if r["first_error"]:
+        print(f"  first error: {r['first_error']}")
+
+
+def environment_info(args):
+    import torch
+    import transformers
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=PROJECT_ROOT, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                    text=True, cwd=PROJECT_ROOT).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "transformers": transformers.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+        "args": vars(args),
+    }
+
+
+def compare(results, baseline_path):
+    """Prints p50/p95 latency and tokens/sec against the same mode and concurrency in a baseline file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nChange vs. {baseline_path} (commit {(baseline['environment'].get('commit') or '?')[:10]})")
+    print(f"{'mode':<10} {'conc':>4} {'p50':>9} {'p95':>9} {'tok/s':>9}")
+
+    def change(new, old):
+        return f"{100 * (new - old) / old:+8.1f}%" if old else f"{'n/a':>9}"
+
+    for mode, levels in results.items():
+        old_levels = {r["concurrency"]: r for r in baseline["results"].get(mode, [])}
+        for r in levels:
+            old = old_levels.get(r["concurrency"])
+            if old is None or not r["latency_ms"] or not old["latency_ms"]:
+                continue
+            print(f"{mode:<10} {r['concurrency']:>4} {change(r['latency_ms']['p50'], old['latency_ms']['p50'])} "
+                  f"{change(r['latency_ms']['p95'], old['latency_ms']['p95'])} "
+                  f"{change(r['tokens_per_second'], old['tokens_per_second'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="tiny", help='"tiny", a local directory or a Hugging Face model ID')
+    parser.add_argument("--data", default="Dataa/cleaned_data.csv")
+    parser.add_argument("--synthetic", action="store_true", help="random short/medium/long sentences")
+    parser.add_argument("--requests", type=int, default=32, help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--modes", nargs="+", choices=["inprocess", "http"], default=["inprocess", "http"])
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sample", action="store_true", help="sample instead of greedy decoding")
+    parser.add_argument("--fast-paths", action="store_true", help="keep the phrasebook and result cache on")
+    parser.add_argument("--url", help="benchmark a running web app instead of starting one")
+    parser.add_argument("--stream", action="store_true", help="use /translate/stream")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds per HTTP request")
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    args = parser.parse_args()
+
+    model = args.model
+    if model == "tiny":
+        build_tiny_model(TINY_MODEL_DIR, args.data)
+        model = str(TINY_MODEL_DIR)
+    env = model_environment(model, args.sample, args.fast_paths)
+    workload = build_workload(args.data, args.requests, args.synthetic, args.seed)
+    warmup = build_workload(args.data, args.warmup, args.synthetic, args.seed + 1)
+    print(f"{len(workload)} {'synthetic' if args.synthetic else 'dataset'} sentences per level, model {model}\n")
+
+    print(f"{'mode':<10} {'conc':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'TTFT ms':>9} "
+          f"{'tok/s':>8} {'req/s':>7} {'peak MB':>9} {'err':>4}")
+    results = {}
+    count_tokens = None
+    if "inprocess" in args.modes:
+        results["inprocess"], count_tokens = run_inprocess(env, workload, args.concurrency, warmup)
+    if "http" in args.modes:
+        if count_tokens is None:
+            from transformers import AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(model)
+            count_tokens = lambda text: len(tokenizer(text, add_special_tokens=False)["input_ids"])
+        results["http"] = run_http(env, workload, args.concurrency, warmup, args, count_tokens)
+
+    report = {"environment": environment_info(args), "model": model, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Differential check and microbenchmark for the compiled normalizer.
+
+Every formal and informal sentence in Dataa/raw_data_fixed.csv, plus
+generated edge cases (mixed case, overlapping contractions, the non-ASCII
+letters re.IGNORECASE folds onto ASCII, emoji, elongations), is normalized by
+the original step functions and by `Normalizer`. Any output that differs is
+printed and the script exits non-zero. Then both are timed.
+
+Usage (from the repo root):
+    python -m benchmarks.normalizer --repeat 5
+"""
+import argparse
+import csv
+import random
+import sys
+import time
+
+from Scriptss import CleanNPreprocess as clean
+from Scriptss import preprocess_data as pre
+
+EXTRA_FRAGMENTS = [
+    "can't've", "CAN'T", "y'all'd've", "Y'ALL're", "I'm", "i'm", "I'M", "Im", "im", "IM", "'cause",
+    "how'd'y", "sha'n't", "o'clock", "ma'am", "gonna", "GONNA", "luv", "awesum", "won't've",
+    "İ'm", "ıt's", "ſhe's", "Keep", "don’t", "heyyyyy", "sooooo", "!!!",
+    "❤️", "\U0001F602", "café", "\n", "  ", "it's", "that'd've", "we'll", "...",
+]
+
+
+def reference_preprocess(text):
+    """preprocess_data.preprocess_text as the separate steps it used to run."""
+    if not isinstance(text, str):
+        return ""
+    text = pre.expand_contractions(text)
+    text = pre.normalize_case(text)
+    return pre.normalize_elongated_words(text)
+
+
+def reference_clean(text):
+    """CleanNPreprocess.preprocess_text up to (not including) spelling correction."""
+    text = clean.expand_contractions(text)
+    text = clean.normalize_case(text)
+    text = clean.remove_punctuation(text)
+    text = clean.handle_emojis(text)
+    return clean.normalize_elongated_words(text)
+
+
+def load_texts(path):
+    texts = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            texts.extend(row)
+    return texts
+
+
+def generated_cases(corpus, count, seed=0):
+    """Random mixes of corpus words and edge-case fragments with random casing."""
+    rng = random.Random(seed)
+    words = [word for text in corpus for word in text.split()] or ["hello"]
+    cases = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 12)):
+            part = rng.choice(EXTRA_FRAGMENTS) if rng.random() < 0.4 else rng.choice(words)
+            if rng.random() < 0.2:
+                part = "".join(c.upper() if rng.random() < 0.5 else c for c in part)
+            parts.append(part)
+        cases.append(rng.choice(["", " "]).join(parts))
+    return cases
+
+
+def check(name, reference, candidate, texts):
+    mismatches = [(t, reference(t), candidate(t)) for t in texts if reference(t) != candidate(t)]
+    print(f"{name}: {len(texts) - len(mismatches)}/{len(texts)} identical")
+    for text, expected, got in mismatches[:5]:
+        print(f"  input:    {text!r}\n  expected: {expected!r}\n  got:      {got!r}")
+    return not mismatches
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="Dataa/raw_data_fixed.csv")
+    parser.add_argument("--generated", type=int, default=20000, help="number of generated edge cases")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_texts(args.data)
+    texts = corpus + generated_cases(corpus, args.generated)
+
+    ok = check("preprocess_data", reference_preprocess, pre.normalizer.normalize, texts)
+    ok &= check("CleanNPreprocess", reference_clean, clean.normalizer.normalize, texts)
+    ok &= pre.normalizer.normalize_many(texts) == [reference_preprocess(t) for t in texts]
+    if not ok:
+        print("Normalizer output differs from the reference functions.")
+        sys.exit(1)
+
+    print(f"\nTiming {len(corpus)} corpus strings (best of {args.repeat}):")
+    print(f"{'pipeline':<18} {'reference ms':>13} {'normalize ms':>13} {'normalize_many ms':>18} {'speedup':>8}")
+    for name, reference, normalizer in (
+        ("preprocess_data", reference_preprocess, pre.normalizer),
+        ("CleanNPreprocess", reference_clean, clean.normalizer),
+    ):
+        ref = timed(lambda: [reference(t) for t in corpus], args.repeat)
+        single = timed(lambda: [normalizer.normalize(t) for t in corpus], args.repeat)
+        many = timed(lambda: normalizer.normalize_many(corpus), args.repeat)
+        print(f"{name:<18} {1000 * ref:13.2f} {1000 * single:13.2f} {1000 * many:18.2f} {ref / single:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
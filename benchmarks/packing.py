@@ -0,0 +1,97 @@
+"""
+Tokenization cache and sequence packing for fine-tuning.
+
+Times tokenizing the formatted dataset against loading it from the cache,
+then compares how much of each training batch is padding when examples are
+batched one per row (shuffled, padded to the longest) versus packed into
+max_length sequences. Finally it times forward + backward passes over the
+same examples both ways and reports trained tokens per second.
+
+Usage (from the repo root):
+    python -m benchmarks.packing --model mistralai/Mistral-7B-Instruct-v0.2 --examples 64
+"""
+import argparse
+import random
+import tempfile
+import time
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer, DataCollatorForLanguageModeling
+
+from Scriptss.training_data import PackedCollator, PackedDataset, tokenized_dataset
+
+
+def padding_share(batches):
+    """Fraction of positions in the padded batches that hold no token."""
+    real = sum(len(ids) for batch in batches for ids in batch)
+    padded = sum(len(batch) * max(len(ids) for ids in batch) for batch in batches)
+    return 1 - real / padded
+
+
+def time_training(model, batches):
+    """Seconds for one forward + backward pass over every batch."""
+    start = time.perf_counter()
+    for batch in batches:
+        model(**batch).loss.backward()
+    model.zero_grad(set_to_none=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="mistralai/Mistral-7B-Instruct-v0.2")
+    parser.add_argument("--data", default="Dataa/formatted_dataset.jsonl")
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--examples", type=int, default=64, help="examples to train on in the timing run")
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    tokenizer.pad_token = tokenizer.eos_token
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        tokenized, _ = tokenized_dataset(args.data, tokenizer, args.max_length, cache_dir)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        tokenized, cached = tokenized_dataset(args.data, tokenizer, args.max_length, cache_dir)
+        warm = time.perf_counter() - start
+        input_ids = tokenized["input_ids"]
+    print(f"Tokenize {len(input_ids)} examples: {cold:.2f}s; load from cache: {warm:.3f}s (hit: {cached})\n")
+
+    packed = PackedDataset(tokenized, args.max_length)
+    stats = packed.stats()
+    print(f"Supervised (response) tokens: {stats['supervised_tokens']}/{stats['tokens']} "
+          f"({stats['supervised_tokens'] / stats['tokens']:.1%}); the rest is prompt, masked out of the loss\n")
+    sequences = [[ids for segment in packed[i]["segments"] for ids in segment] for i in range(len(packed))]
+    order = list(range(len(input_ids)))
+    random.Random(0).shuffle(order)
+    print(f"{'batch size':>10} {'padding, one example/row':>26} {'padding, packed':>16}")
+    for size in args.batch_sizes:
+        rows = [[input_ids[i] for i in order[s:s + size]] for s in range(0, len(order), size)]
+        packs = [sequences[s:s + size] for s in range(0, len(sequences), size)]
+        print(f"{size:10d} {padding_share(rows):26.1%} {padding_share(packs):16.1%}")
+
+    model = AutoModelForCausalLM.from_pretrained(args.model, torch_dtype=torch.float32)
+    model.train()
+    subset = tokenized.select(order[:args.examples])
+    size = max(args.batch_sizes)
+    plain_collator = DataCollatorForLanguageModeling(tokenizer=tokenizer, mlm=False)
+    plain = [plain_collator([{"input_ids": ids} for ids in subset["input_ids"][s:s + size]])
+             for s in range(0, len(subset), size)]
+    subset_packed = PackedDataset(subset, args.max_length)
+    packed_collator = PackedCollator(tokenizer.pad_token_id, model.dtype)
+    packs = [packed_collator([subset_packed[i] for i in range(s, min(s + size, len(subset_packed)))])
+             for s in range(0, len(subset_packed), size)]
+
+    tokens = sum(subset["length"])
+    plain_seconds = time_training(model, plain)
+    packed_seconds = time_training(model, packs)
+    print(f"\nForward + backward over {len(subset)} examples ({tokens} tokens), batch size {size}:")
+    print(f"  one example per row: {len(plain):4d} batches {plain_seconds:8.2f}s {tokens / plain_seconds:9.0f} tokens/s")
+    print(f"  packed:              {len(packs):4d} batches {packed_seconds:8.2f}s {tokens / packed_seconds:9.0f} tokens/s "
+          f"({plain_seconds / packed_seconds:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Phrasebook fast path: lookup latency, hit ratio and wrong answers.
+
+Queries the phrasebook with formal sentences from Dataa/cleaned_data.csv as
+they are, with changed case and punctuation, with one typo, and with an extra
+word (e.g. "not") that must not be answered from the phrasebook. Reports the
+hit ratio and mean lookup time per variant and how long a (re)load takes.
+
+Usage (from the repo root):
+    python -m benchmarks.phrasebook --samples 500
+"""
+import argparse
+import random
+import time
+
+from Scriptss.dedup import normalize_key
+from Scriptss.phrasebook import Phrasebook, read_pairs
+from Scriptss.preprocess_data import preprocess_text
+
+
+def typo(text, rng):
+    """Swaps two adjacent letters inside one word of six or more letters, if there is one."""
+    words = text.split()
+    long_words = [i for i, word in enumerate(words) if len(word) >= 6 and word.isalpha()]
+    if not long_words:
+        return None
+    i = rng.choice(long_words)
+    j = rng.randrange(1, len(words[i]) - 2)
+    word = words[i]
+    words[i] = word[:j] + word[j + 1] + word[j] + word[j + 2:]
+    return " ".join(words)
+
+
+def extra_word(text, rng):
+    words = text.split()
+    words.insert(rng.randrange(1, len(words) + 1), rng.choice(["not", "never", "really", "also"]))
+    return " ".join(words)
+
+
+def run(phrasebook, queries):
+    """(hits, seconds per lookup)"""
+    start = time.perf_counter()
+    hits = sum(phrasebook.lookup(q) is not None for q in queries)
+    return hits, (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="Dataa/cleaned_data.csv")
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    phrasebook = Phrasebook(args.data, threshold=args.threshold)
+    load_seconds = time.perf_counter() - start
+    print(f"Indexed {len(phrasebook.index)} formal sentences in {1000 * load_seconds:.1f} ms\n")
+
+    rng = random.Random(0)
+    formal, _ = read_pairs(args.data)
+    sample = rng.sample(formal, min(args.samples, len(formal)))
+    known = {normalize_key(preprocess_text(text)) for text in formal}
+    variants = {
+        "as stored": sample,
+        "case + punctuation": [text.upper().rstrip(".?!") + "!!" for text in sample],
+        "one typo": [t for t in (typo(text, rng) for text in sample) if t is not None],
+        # Should miss: a different sentence, unless it happens to be in the data itself
+        "extra word": [t for t in (extra_word(text, rng) for text in sample)
+                       if normalize_key(preprocess_text(t)) not in known],
+    }
+
+    print(f"{'queries':<20} {'count':>6} {'hit ratio':>10} {'us/lookup':>10}")
+    for name, queries in variants.items():
+        hits, seconds = run(phrasebook, queries)
+        print(f"{name:<20} {len(queries):6d} {hits / len(queries):10.1%} {1e6 * seconds:10.1f}")
+    print(f"\nOverall: {phrasebook.stats()}")
+
+
+if __name__ == "__main__":
+    main()
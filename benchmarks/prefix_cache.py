@@ -0,0 +1,86 @@
+"""
+Time-to-first-token with and without the shared instruction-prefix KV cache.
+
+Replays formal sentences from Dataa/cleaned_data.csv and times the prefill
+(prompt forward pass + first token) for both paths.
+
+Usage (from the repo root):
+    python -m benchmarks.prefix_cache --model mistralai/Mistral-7B-Instruct-v0.2 --samples 50
+"""
+import argparse
+import csv
+import statistics
+import time
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from Scriptss.prefix_cache import PrefixCache, prefill
+from Scriptss.prompts import build_prompt
+
+
+def load_sentences(path, limit):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return [row["formal_text_cleaned"] for _, row in zip(range(limit), reader)]
+
+
+def time_prefill(model, prompt_ids, prefix_cache=None):
+    start = time.perf_counter()
+    logits, _ = prefill(model, prompt_ids, prefix_cache)
+    logits.argmax(dim=-1)
+    return time.perf_counter() - start
+
+
+def summarize(label, timings, prefilled_tokens):
+    print(
+        f"{label:<14} mean {1000 * statistics.mean(timings):8.1f} ms   "
+        f"p50 {1000 * statistics.median(timings):8.1f} ms   "
+        f"tokens prefilled {prefilled_tokens}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="mistralai/Mistral-7B-Instruct-v0.2")
+    parser.add_argument("--data", default="Dataa/cleaned_data.csv")
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    print(f"Loading {args.model}...")
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForCausalLM.from_pretrained(args.model, torch_dtype=torch.float32)
+    model.eval()
+
+    prompts = [
+        tokenizer(build_prompt(s), add_special_tokens=False)["input_ids"]
+        for s in load_sentences(args.data, args.samples)
+    ]
+
+    start = time.perf_counter()
+    prefix_cache = PrefixCache(model, tokenizer)
+    build_time = time.perf_counter() - start
+
+    # Warm up both paths so allocator setup is not billed to either
+    time_prefill(model, prompts[0])
+    time_prefill(model, prompts[0], prefix_cache)
+
+    cold = [time_prefill(model, ids) for ids in prompts]
+    reused_before = prefix_cache.reused_tokens
+    cached = [time_prefill(model, ids, prefix_cache) for ids in prompts]
+    reused = prefix_cache.reused_tokens - reused_before
+    total_tokens = sum(len(ids) for ids in prompts)
+
+    print(f"\n{len(prompts)} prompts, prefix is {len(prefix_cache.prefix_ids)} tokens "
+          f"(built once in {1000 * build_time:.1f} ms)\n")
+    summarize("full prefill", cold, total_tokens)
+    summarize("prefix cache", cached, total_tokens - reused)
+    print(f"\nTTFT speedup: {statistics.mean(cold) / statistics.mean(cached):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
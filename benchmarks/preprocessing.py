@@ -0,0 +1,93 @@
+"""
+Scaling of the chunked, multi-process preprocessing runner.
+
+Builds a synthetic corpus by repeating Dataa/raw_data_fixed.csv (each copy
+made unique, so per-chunk deduplication cannot hide the work), then cleans it
+with 1, 2, 4, ... worker processes, each run in a fresh Python process. It
+reports rows/sec, speedup over one worker and peak RSS, and checks that every
+run wrote exactly the same output.
+
+Usage (from the repo root):
+    python -m benchmarks.preprocessing --rows 500000 --chunk-size 10000
+"""
+import argparse
+import csv
+import filecmp
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def make_corpus(source, path, rows):
+    with open(source, newline="", encoding="utf-8") as f:
+        pairs = [(row["formal_text"], row["informal_text"]) for row in csv.DictReader(f)]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["formal_text", "informal_text"])
+        for i in range(rows):
+            formal, informal = pairs[i % len(pairs)]
+            copy = i // len(pairs)
+            writer.writerow([f"{formal} {copy}", f"{informal} {copy}"])
+
+
+def child(input_path, output_path, workers, chunk_size):
+    from Scriptss.preprocess_data import preprocess_file
+
+    start = time.perf_counter()
+    rows_read, rows_written, _ = preprocess_file(input_path, output_path, workers, chunk_size)
+    elapsed = time.perf_counter() - start
+    peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print(json.dumps({"workers": workers, "seconds": elapsed, "rows": rows_read,
+                      "rows_written": rows_written, "peak_rss_mb": peak_kb / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="Dataa/raw_data_fixed.csv")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, nargs="+", help="worker counts to try (default: 1, 2, 4, ... cores)")
+    parser.add_argument("--child", nargs=3, metavar=("INPUT", "OUTPUT", "WORKERS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        input_path, output_path, workers = args.child
+        child(input_path, output_path, int(workers), args.chunk_size)
+        return
+
+    cores = os.cpu_count() or 1
+    counts = args.workers or sorted({2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores} | {cores})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, "corpus.csv")
+        make_corpus(args.source, corpus, args.rows)
+        print(f"Corpus: {args.rows} rows, {os.path.getsize(corpus) / 2**20:.1f} MB; {cores} cores\n")
+
+        results, outputs = [], []
+        for workers in counts:
+            output = os.path.join(tmp, f"cleaned_{workers}.csv")
+            stdout = subprocess.run(
+                [sys.executable, "-m", "benchmarks.preprocessing", "--child", corpus, output, str(workers),
+                 "--chunk-size", str(args.chunk_size)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results.append(json.loads(stdout.strip().splitlines()[-1]))
+            outputs.append(output)
+
+        identical = all(filecmp.cmp(outputs[0], other, shallow=False) for other in outputs[1:])
+
+    base = results[0]["seconds"]
+    print(f"{'workers':>7} {'seconds':>8} {'rows/s':>9} {'speedup':>8} {'peak RSS MB':>12}")
+    for r in results:
+        print(f"{r['workers']:7d} {r['seconds']:8.2f} {r['rows'] / r['seconds']:9.0f} "
+              f"{base / r['seconds']:7.2f}x {r['peak_rss_mb']:12.0f}")
+    print(f"\nOutputs identical across worker counts: {identical}")
+
+
+if __name__ == "__main__":
+    main()
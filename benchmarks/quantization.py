@@ -0,0 +1,132 @@
+"""
+Quality, memory and speed report for the CPU quantization modes.
+
+For every mode (fp32 baseline, int8, int4) a fresh process loads the model,
+quantizes it and measures:
+  - footprint: bytes held by weights/buffers, and process RSS
+  - quality: mean NLL of the reference slang given the formal sentence,
+    teacher-forced over pairs from Dataa/cleaned_data.csv, plus how often
+    greedy outputs exactly match the fp32 baseline
+  - speed: greedy decode tokens/sec through the generation engine
+
+Usage (from the repo root):
+    python -m benchmarks.quantization --model models/snapshot --samples 30
+"""
+import argparse
+import csv
+import json
+import subprocess
+import sys
+import time
+
+from benchmarks.cold_start import rss_mb
+
+
+def load_pairs(path, limit):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return [(row["formal_text_cleaned"], row["informal_text_cleaned"]) for _, row in zip(range(limit), reader)]
+
+
+def load_fp32(source):
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    from Scriptss.snapshot import is_snapshot, load_snapshot
+
+    if is_snapshot(source):
+        return load_snapshot(source)
+    model = AutoModelForCausalLM.from_pretrained(source, torch_dtype=torch.float32, low_cpu_mem_usage=True)
+    return model.eval(), AutoTokenizer.from_pretrained(source)
+
+
+def reference_nll(model, tokenizer, pairs):
+    """Mean per-token NLL of the informal side given the formal prompt."""
+    import torch
+
+    from Scriptss.prompts import build_prompt, create_instruction_prompt
+
+    total, count = 0.0, 0
+    for formal, informal in pairs:
+        prompt_len = len(tokenizer(build_prompt(formal), add_special_tokens=False)["input_ids"])
+        ids = tokenizer(create_instruction_prompt(formal, informal), add_special_tokens=False, return_tensors="pt")["input_ids"]
+        labels = ids.clone()
+        labels[:, :prompt_len] = -100
+        with torch.no_grad():
+            loss = model(input_ids=ids, labels=labels).loss
+        n = int((labels[:, 1:] != -100).sum())
+        total += float(loss) * n
+        count += n
+    return total / count
+
+
+def child(mode, source, data, samples, max_new_tokens):
+    from Scriptss.engine import GenerationEngine
+    from Scriptss.prompts import build_prompt
+    from Scriptss.quantize import model_size_bytes, quantize_model
+
+    pairs = load_pairs(data, samples)
+    model, tokenizer = load_fp32(source)
+    quantize_model(model, mode)
+
+    nll = reference_nll(model, tokenizer, pairs)
+
+    engine = GenerationEngine(model, tokenizer, max_batch_size=1, max_new_tokens=max_new_tokens, do_sample=False)
+    engine.generate(build_prompt(pairs[0][0]))  # warm-up
+    tokens_before = engine.tokens_generated
+    start = time.perf_counter()
+    outputs = [engine.generate(build_prompt(formal)) for formal, _ in pairs]
+    elapsed = time.perf_counter() - start
+    engine.stop()
+
+    print(json.dumps({
+        "mode": mode,
+        "weights_mb": model_size_bytes(model) / 2**20,
+        "rss_mb": rss_mb(),
+        "reference_nll": nll,
+        "tokens_per_sec": (engine.tokens_generated - tokens_before) / elapsed,
+        "outputs": outputs,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="mistralai/Mistral-7B-Instruct-v0.2", help="hub name or snapshot dir")
+    parser.add_argument("--data", default="Dataa/cleaned_data.csv")
+    parser.add_argument("--samples", type=int, default=30)
+    parser.add_argument("--max-new-tokens", type=int, default=20)
+    parser.add_argument("--modes", nargs="+", default=["none", "int8", "int4"])
+    parser.add_argument("--output", help="write the report as JSON here")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.model, args.data, args.samples, args.max_new_tokens)
+        return
+
+    results = []
+    for mode in args.modes:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.quantization", "--child", mode, "--model", args.model,
+             "--data", args.data, "--samples", str(args.samples), "--max-new-tokens", str(args.max_new_tokens)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    baseline = results[0]
+    print(f"{'mode':<6} {'weights MB':>11} {'RSS MB':>8} {'ref NLL':>8} {'dNLL':>7} "
+          f"{'match fp32':>11} {'tok/s':>7} {'speedup':>8}")
+    for r in results:
+        matches = sum(a == b for a, b in zip(r["outputs"], baseline["outputs"])) / len(r["outputs"])
+        r["match_baseline"] = matches
+        print(f"{r['mode']:<6} {r['weights_mb']:11.1f} {r['rss_mb']:8.0f} {r['reference_nll']:8.3f} "
+              f"{r['reference_nll'] - baseline['reference_nll']:+7.3f} {100 * matches:10.0f}% "
+              f"{r['tokens_per_sec']:7.1f} {r['tokens_per_sec'] / baseline['tokens_per_sec']:7.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
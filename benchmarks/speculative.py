@@ -0,0 +1,149 @@
+"""
+Speculative decoding: acceptance rate and speedup per request.
+
+Translates formal sentences from Dataa/cleaned_data.csv one at a time, with
+plain decoding and with speculative decoding (the n-gram drafter or a draft
+model), and prints each request's acceptance rate, tokens per forward pass
+of the model and wall-clock speedup. Greedy outputs must be identical both
+ways.
+
+With --samples N it also samples N completions of --sample-tokens tokens
+from one fixed prompt, twice with plain decoding and once speculatively, and
+builds a histogram of the token at each position. The total variation
+distance between plain and speculative histograms must stay within
+--tv-margin of the distance between the two plain runs (the sampling noise
+floor) at every position, else the script exits non-zero. Short completions
+keep the histograms dense enough that a wrong acceptance rule shows up.
+
+Usage (from the repo root):
+    python -m benchmarks.speculative --model mistralai/Mistral-7B-Instruct-v0.2 --drafter ngram --prompts 20
+"""
+import argparse
+import csv
+import statistics
+import sys
+import time
+from collections import Counter
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from Scriptss.engine import GenerationEngine
+from Scriptss.prompts import build_prompt
+from Scriptss.speculative import load_drafter
+
+
+def load_sentences(path, limit):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return [row["formal_text_cleaned"] for _, row in zip(range(limit), reader)]
+
+
+def timed_requests(engine, prompts):
+    """(completion, seconds, future) for each prompt, one request at a time."""
+    results = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        future = engine.submit(prompt)
+        text = future.result()
+        results.append((text, time.perf_counter() - start, future))
+    return results
+
+
+def position_counts(engine, prompt, samples, seed, positions):
+    """One Counter per position of the sampled completions' tokens."""
+    torch.manual_seed(seed)
+    counts = [Counter() for _ in range(positions)]
+    for text in engine.generate([prompt] * samples):
+        tokens = engine.tokenizer.tokenize(text)
+        for i in range(positions):
+            # Completions that stopped early count as "<end>" from there on
+            counts[i][tokens[i] if i < len(tokens) else "<end>"] += 1
+    return counts
+
+
+def total_variation(a, b):
+    n_a, n_b = sum(a.values()), sum(b.values())
+    return 0.5 * sum(abs(a[k] / n_a - b[k] / n_b) for k in set(a) | set(b))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="mistralai/Mistral-7B-Instruct-v0.2")
+    parser.add_argument("--drafter", default="ngram", help='"ngram" or a draft model sharing the tokenizer')
+    parser.add_argument("--data", default="Dataa/cleaned_data.csv")
+    parser.add_argument("--prompts", type=int, default=20)
+    parser.add_argument("--max-new-tokens", type=int, default=50)
+    parser.add_argument("--num-draft-tokens", type=int, default=4)
+    parser.add_argument("--samples", type=int, default=0, help="sampled completions per side for the distribution check")
+    parser.add_argument("--sample-tokens", type=int, default=2, help="length of the sampled completions")
+    parser.add_argument("--tv-margin", type=float, default=0.05,
+                        help="allowed excess of plain-vs-speculative over plain-vs-plain total variation")
+    args = parser.parse_args()
+
+    print(f"Loading {args.model}...")
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForCausalLM.from_pretrained(args.model, torch_dtype=torch.float32)
+    model.eval()
+    drafter = load_drafter(args.drafter, tokenizer)
+
+    sentences = load_sentences(args.data, args.prompts)
+    prompts = [build_prompt(s) for s in sentences]
+    config = {"max_batch_size": 1, "max_new_tokens": args.max_new_tokens, "do_sample": False}
+    plain = GenerationEngine(model, tokenizer, **config)
+    speculative = GenerationEngine(model, tokenizer, drafter=drafter, num_draft_tokens=args.num_draft_tokens, **config)
+
+    # Warm up both paths so allocator setup is not billed to either
+    timed_requests(plain, prompts[:1])
+    timed_requests(speculative, prompts[:1])
+
+    baseline = timed_requests(plain, prompts)
+    drafted = timed_requests(speculative, prompts)
+
+    print(f"\nGreedy, {len(prompts)} requests, drafter {args.drafter}, up to {args.num_draft_tokens} draft tokens\n")
+    print(f"{'request':<40} {'tokens':>6} {'accepted':>9} {'tok/pass':>8} {'plain ms':>9} {'spec ms':>8} {'speedup':>7}")
+    mismatches = 0
+    speedups = []
+    for sentence, (text, seconds, _), (spec_text, spec_seconds, future) in zip(sentences, baseline, drafted):
+        stats = future.speculation
+        mismatches += text != spec_text
+        speedups.append(seconds / spec_seconds)
+        print(f"{sentence[:40]:<40} {stats['tokens']:6d} {stats['acceptance_rate']:9.0%} {stats['tokens_per_pass']:8.2f} "
+              f"{1000 * seconds:9.1f} {1000 * spec_seconds:8.1f} {seconds / spec_seconds:6.2f}x")
+
+    plain_total = sum(seconds for _, seconds, _ in baseline)
+    spec_total = sum(seconds for _, seconds, _ in drafted)
+    engine_stats = speculative.stats()
+    print(f"\nAcceptance rate {engine_stats['draft_acceptance_rate']:.1%} of {engine_stats['draft_tokens']} drafted tokens")
+    print(f"Total {plain_total:.2f}s plain vs {spec_total:.2f}s speculative ({plain_total / spec_total:.2f}x); "
+          f"median per-request speedup {statistics.median(speedups):.2f}x")
+    print(f"Identical greedy outputs: {len(prompts) - mismatches}/{len(prompts)}")
+
+    if args.samples:
+        positions = args.sample_tokens
+        # A batch no larger than max_speculative_batch, so every step actually speculates
+        config.update(do_sample=True, max_new_tokens=positions, max_batch_size=4, max_queue_size=args.samples)
+        plain = GenerationEngine(model, tokenizer, **config)
+        speculative = GenerationEngine(model, tokenizer, drafter=drafter, num_draft_tokens=args.num_draft_tokens, **config)
+        first = position_counts(plain, prompts[0], args.samples, 1, positions)
+        second = position_counts(plain, prompts[0], args.samples, 2, positions)
+        spec = position_counts(speculative, prompts[0], args.samples, 3, positions)
+
+        print(f"\nSampled {args.samples} completions of {positions} tokens each way, total variation per position:")
+        print(f"{'position':>8} {'distinct':>8} {'plain/spec':>10} {'plain/plain':>11}")
+        failed = []
+        for i in range(positions):
+            spec_tv = total_variation(first[i], spec[i])
+            noise_tv = total_variation(first[i], second[i])
+            print(f"{i + 1:8d} {len(first[i] | spec[i]):8d} {spec_tv:10.3f} {noise_tv:11.3f}")
+            if spec_tv > noise_tv + args.tv_margin:
+                failed.append(i + 1)
+        if failed:
+            print(f"Speculative sampling distribution differs from plain decoding at positions {failed} "
+                  f"(more than {args.tv_margin} above the plain-vs-plain noise floor)")
+            sys.exit(1)
+        print(f"Within {args.tv_margin} of the noise floor at every position")
+
+
+if __name__ == "__main__":
+    main()
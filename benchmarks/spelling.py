@@ -0,0 +1,88 @@
+"""
+Spelling correction: symmetric-delete index vs. TextBlob.correct.
+
+Over sentences from Dataa/cleaned_data.csv it reports, for both correctors:
+  - sentences/sec (ours both with an empty and a warm per-token memo)
+  - agreement with TextBlob on the formal side
+  - how much of the informal side (our slang) each one leaves untouched
+plus index build, save and load times.
+
+Usage (from the repo root):
+    python -m benchmarks.spelling --samples 500
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from textblob import TextBlob
+
+from Scriptss.spell import SpellCorrector
+
+
+def load_columns(path, limit):
+    formal, informal = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for _, row in zip(range(limit), csv.DictReader(f)):
+            formal.append(row["formal_text_cleaned"])
+            informal.append(row["informal_text_cleaned"])
+    return formal, informal
+
+
+def timed(fn, texts):
+    start = time.perf_counter()
+    outputs = [fn(text) for text in texts]
+    return outputs, time.perf_counter() - start
+
+
+def unchanged_words(originals, outputs):
+    same = total = 0
+    for original, output in zip(originals, outputs):
+        words, corrected = original.split(), output.split()
+        total += len(words)
+        same += sum(a == b for a, b in zip(words, corrected)) if len(words) == len(corrected) else 0
+    return same / total if total else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="Dataa/cleaned_data.csv")
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args()
+
+    formal, informal = load_columns(args.data, args.samples)
+
+    start = time.perf_counter()
+    corrector = SpellCorrector.build(args.data)
+    build_seconds = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        path = corrector.save(os.path.join(tmp, "spelling.pkl"))
+        size_mb = os.path.getsize(path) / 2**20
+        start = time.perf_counter()
+        corrector = SpellCorrector.load(path)
+        load_seconds = time.perf_counter() - start
+    print(f"Index: {len(corrector.index)} keys, {size_mb:.1f} MB pickled, "
+          f"built in {build_seconds:.2f}s, loaded in {load_seconds:.2f}s\n")
+
+    texts = formal + informal
+    blob_out, blob_seconds = timed(lambda t: str(TextBlob(t).correct()), texts)
+    cold_out, cold_seconds = timed(corrector.correct, texts)
+    _, warm_seconds = timed(corrector.correct, texts)
+
+    n = len(formal)
+    agreement = sum(a == b for a, b in zip(blob_out[:n], cold_out[:n])) / n
+    print(f"{'corrector':<16} {'sentences/s':>12} {'ms/sentence':>12} {'slang kept':>11}")
+    for name, seconds, outputs in (
+        ("TextBlob", blob_seconds, blob_out),
+        ("SymSpell cold", cold_seconds, cold_out),
+        ("SymSpell warm", warm_seconds, cold_out),
+    ):
+        kept = unchanged_words(informal, outputs[n:])
+        print(f"{name:<16} {len(texts) / seconds:12.1f} {1000 * seconds / len(texts):12.3f} {100 * kept:10.1f}%")
+    print(f"\nSpeedup (cold): {blob_seconds / cold_seconds:.0f}x, (warm): {blob_seconds / warm_seconds:.0f}x")
+    print(f"Formal sentences corrected identically to TextBlob: {100 * agreement:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
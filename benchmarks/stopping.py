@@ -0,0 +1,85 @@
+"""
+Adaptive length budget and sentence-boundary stopping.
+
+Fits the length budget on Dataa/cleaned_data.csv and reports how many of the
+pairs' informal sides fit their budget. Then translates formal sentences
+greedily with the fixed 50-token budget and with the stopping rules, and
+compares decode steps, generated tokens, wall time, how many outputs are
+identical, and how many hit the learned budget before </s> or a sentence end.
+
+Usage (from the repo root):
+    python -m benchmarks.stopping --model mistralai/Mistral-7B-Instruct-v0.2 --samples 64
+"""
+import argparse
+import csv
+import time
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from Scriptss.engine import GenerationEngine
+from Scriptss.prompts import build_prompt
+from Scriptss.stopping import LengthBudget, SentenceStop, StoppingRules
+
+
+def load_pairs(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["formal_text_cleaned"], row["informal_text_cleaned"]) for row in csv.DictReader(f)
+                if row["formal_text_cleaned"] and row["informal_text_cleaned"]]
+
+
+def run(engine, prompts):
+    start = time.perf_counter()
+    outputs = engine.generate(prompts)
+    seconds = time.perf_counter() - start
+    stats = engine.stats()
+    engine.stop()
+    return outputs, seconds, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="mistralai/Mistral-7B-Instruct-v0.2")
+    parser.add_argument("--data", default="Dataa/cleaned_data.csv")
+    parser.add_argument("--samples", type=int, default=64)
+    parser.add_argument("--max-new-tokens", type=int, default=50)
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    pairs = load_pairs(args.data)
+    budget = LengthBudget.from_data(tokenizer, args.data)
+    formal = tokenizer([p[0] for p in pairs], add_special_tokens=False)["input_ids"]
+    informal = tokenizer([p[1] for p in pairs], add_special_tokens=False)["input_ids"]
+    fits = sum(len(i) <= budget.limits(len(f), args.max_new_tokens)[1] for f, i in zip(formal, informal))
+    print(f"Budget: ceil({budget.intercept:.2f} + {budget.slope:.2f} * input tokens), "
+          f"minimum {budget.min_ratio:.2f} * input tokens before a sentence stop")
+    print(f"{fits}/{len(pairs)} informal sentences ({fits / len(pairs):.1%}) fit their budget; "
+          f"e.g. {[(n, budget.limits(n, args.max_new_tokens)[1]) for n in (5, 10, 20)]} (input, budget)\n")
+
+    print(f"Loading {args.model}...")
+    model = AutoModelForCausalLM.from_pretrained(args.model, torch_dtype=torch.float32)
+    model.eval()
+    prompts = [build_prompt(p[0]) for p in pairs[:args.samples]]
+    rules = StoppingRules(budget, SentenceStop(tokenizer))
+    config = {"max_new_tokens": args.max_new_tokens, "do_sample": False}
+
+    fixed, fixed_seconds, fixed_stats = run(GenerationEngine(model, tokenizer, **config), prompts)
+    stopped, stopped_seconds, stopped_stats = run(GenerationEngine(model, tokenizer, stopping=rules, **config), prompts)
+
+    # Outputs that used their whole learned budget were cut off rather than finished
+    limits = [rules.limits(len(tokenizer(p, add_special_tokens=False)["input_ids"]), args.max_new_tokens)[1]
+              for p in prompts]
+    truncated = sum(len(tokenizer(text, add_special_tokens=False)["input_ids"]) >= limit
+                    for text, limit in zip(stopped, limits))
+
+    print(f"\n{len(prompts)} greedy translations")
+    print(f"{'':<22} {'decode steps':>12} {'tokens':>8} {'seconds':>8}")
+    print(f"{'fixed budget':<22} {fixed_stats['decode_steps']:12d} {fixed_stats['tokens_generated']:8d} {fixed_seconds:8.2f}")
+    print(f"{'budget + sentence stop':<22} {stopped_stats['decode_steps']:12d} {stopped_stats['tokens_generated']:8d} "
+          f"{stopped_seconds:8.2f} ({fixed_seconds / stopped_seconds:.2f}x)")
+    print(f"Identical outputs: {sum(a == b for a, b in zip(fixed, stopped))}/{len(prompts)}; "
+          f"cut off at the learned budget: {truncated}")
+
+
+if __name__ == "__main__":
+    main()
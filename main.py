@@ -1,35 +1,260 @@
 # main.py
+"""
+Incremental pipeline: preprocess -> dedup -> format -> fine-tune -> infer.
+
+Each stage declares the files it reads (data and the code that processes it),
+the files it writes and its config. The stage's fingerprint is the content
+hash of all of these; when it matches the last successful run and the outputs
+still exist, the stage is skipped. State is kept in .pipeline/state.json.
+
+Preprocessing is incremental per row as well: cleaned rows are cached in
+.pipeline/rows.sqlite under the hash of the raw row, so appending or editing
+rows of the raw CSV only cleans those rows. Formatting is vectorized and
+near I/O-bound, so it simply re-reads the cleaned file.
+
+Usage:
+    python main.py                      # run every stage that is out of date
+    python main.py --until format       # stop after a stage
+    python main.py --force preprocess   # re-run a stage even if it is up to date
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+PIPELINE_DIR = PROJECT_ROOT / ".pipeline"
+STATE_PATH = PIPELINE_DIR / "state.json"
+ROW_CACHE_PATH = PIPELINE_DIR / "rows.sqlite"
+
+RAW_DATA = PROJECT_ROOT / "Dataa" / "raw_data_fixed.csv"
+CLEANED_DATA = PROJECT_ROOT / "Dataa" / "cleaned_data.csv"
+DEDUPED_DATA = PROJECT_ROOT / "Dataa" / "deduped_data.csv"
+DEDUP_REPORT = PROJECT_ROOT / "Dataa" / "dedup_report.json"
+FORMATTED_ARROW = PROJECT_ROOT / "Dataa" / "formatted_dataset.arrow"
+FORMATTED_JSONL = PROJECT_ROOT / "Dataa" / "formatted_dataset.jsonl"
+ADAPTER_DIR = PROJECT_ROOT / "models" / "slang_translator_v1" / "final_checkpoint"
+SCRIPTS_DIR = PROJECT_ROOT / "Scriptss"
+
+# Code whose output the row cache holds; changing it invalidates every cached row
+CLEANING_CODE = [SCRIPTS_DIR / "preprocess_data.py", SCRIPTS_DIR / "normalizer.py"]
+
+CHUNK_SIZE = 10_000
+
+
+# --- Hashing ---
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def row_key(formal, informal):
+    """Content hash of one raw row (missing values hash differently from empty strings)."""
+    return hashlib.blake2b(json.dumps([formal, informal]).encode("utf-8"), digest_size=16).hexdigest()
+
+
+# --- Stages ---
+
+class Stage:
+    """A pipeline step: `run()` turns `inputs` into `outputs` according to `config`."""
+
+    def __init__(self, name, run, inputs=(), outputs=(), config=None):
+        self.name = name
+        self.run = run
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.config = config or {}
+
+    def fingerprint(self):
+        digest = hashlib.sha256(json.dumps(self.config, sort_keys=True).encode("utf-8"))
+        for path in self.inputs:
+            digest.update(str(path.relative_to(PROJECT_ROOT)).encode("utf-8"))
+            digest.update(file_hash(path).encode("utf-8"))
+        return digest.hexdigest()
+
+
+class RowCache:
+    """SQLite map from raw-row hash to its cleaned pair, scoped to one code/config version."""
+
+    def __init__(self, path, version):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        stored = self.conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if stored is None or stored[0] != version:
+            # The cleaning code or its config changed, so no cached row is valid any more
+            self.conn.execute("DELETE FROM rows")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+        self.conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        unique = list(set(keys))
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            query = f"SELECT key, value FROM rows WHERE key IN ({','.join('?' * len(batch))})"
+            for key, value in self.conn.execute(query, batch):
+                found[key] = json.loads(value)
+        return found
+
+    def put_many(self, items):
+        self.conn.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?)",
+                              [(key, json.dumps(value)) for key, value in items.items()])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def run_preprocess(stage):
+    """Cleans the raw CSV, reusing cached results for rows seen before."""
+    import pandas as pd
+
+    from Scriptss.preprocess_data import CleanedWriter, clean_rows
+
+    version = hashlib.sha256("".join(file_hash(p) for p in CLEANING_CODE).encode("utf-8")).hexdigest()
+    cache = RowCache(ROW_CACHE_PATH, version)
+    writer = CleanedWriter(CLEANED_DATA)
+    total = cleaned = 0
+    try:
+        for chunk in pd.read_csv(RAW_DATA, chunksize=CHUNK_SIZE, usecols=["formal_text", "informal_text"]):
+            formal = chunk["formal_text"].tolist()
+            informal = chunk["informal_text"].tolist()
+            keys = [row_key(f, i) for f, i in zip(formal, informal)]
+            results = cache.get_many(keys)
+
+            missing = [j for j, key in enumerate(keys) if key not in results]
+            if missing:
+                rows = clean_rows([formal[j] for j in missing], [informal[j] for j in missing])
+                fresh = {keys[j]: row for j, row in zip(missing, rows)}
+                cache.put_many(fresh)
+                results.update(fresh)
+                cleaned += len(missing)
+
+            writer.write([results[key] for key in keys if results[key] is not None])
+            total += len(keys)
+    finally:
+        writer.close()
+        cache.close()
+    print(f"Preprocessed {total} rows ({cleaned} cleaned, {total - cleaned} from cache).")
+
+
+def run_dedup(stage):
+    from Scriptss.dedup import dedup_file, print_report
+
+    print_report(dedup_file(CLEANED_DATA, DEDUPED_DATA, DEDUP_REPORT, **stage.config))
+
+
+def run_format(stage):
+    from Scriptss.format_data import format_file
+
+    count = format_file(DEDUPED_DATA, FORMATTED_ARROW, FORMATTED_JSONL,
+                        formal_col="formal_text_cleaned", informal_col="informal_text_cleaned")
+    print(f"Formatted {count} examples.")
+
+
+def run_fine_tune(stage):
+    from Scriptss.fine_tune import main as fine_tune
+
+    fine_tune()
+
+
+def run_infer(stage):
+    from Scriptss.infer import load_model, translate_text
+
+    engine, tokenizer = load_model()
+    if engine is None:
+        raise RuntimeError("Failed to load model")
+    formal_sentence = stage.config["sentence"]
+    slang_translation = translate_text(engine, tokenizer, formal_sentence)
+    engine.stop()
 
-# Import the specific functions you need from your scripts
-from Scriptss.preprocess_data import preprocess_text
-from Scriptss.format_data import format_for_sft # Assuming you have such a function
-from Scriptss.fine_tune import run_training # Assuming you refactor fine_tune.py into a function
-from Scriptss.infer import translate_to_slang
-
-def run_full_pipeline():
-    """
-    Orchestrates the entire process from preprocessing to inference.
-    """
-    print("--- Step 1: Preprocessing Data ---")
-    # This is a simplified example. You'd read a file, process it, and save it.
-    # preprocess_data() # You would call your main preprocessing function here.
-    print("Data preprocessing complete.")
-
-    print("\n--- Step 2: Formatting Data ---")
-    # format_data() # You would call your main formatting function here.
-    print("Data formatting complete.")
-
-    print("\n--- Step 3: Fine-Tuning Model ---")
-    # run_training() # This would launch the fine-tuning process.
-    print("Model fine-tuning complete.")
-
-    print("\n--- Step 4: Running Inference for a Test ---")
-    formal_sentence = "I am very excited about this new project."
-    slang_translation = translate_to_slang(formal_sentence)
-    
     print(f"\nFormal Input: '{formal_sentence}'")
     print(f"Slang Output: '{slang_translation}'")
 
 
+def build_stages():
+    return [
+        Stage("preprocess", run_preprocess, inputs=[RAW_DATA, *CLEANING_CODE], outputs=[CLEANED_DATA]),
+        Stage("dedup", run_dedup, inputs=[CLEANED_DATA, SCRIPTS_DIR / "dedup.py"],
+              outputs=[DEDUPED_DATA, DEDUP_REPORT], config={"threshold": 0.85, "num_perm": 128, "bands": 16}),
+        Stage("format", run_format,
+              inputs=[DEDUPED_DATA, SCRIPTS_DIR / "format_data.py", SCRIPTS_DIR / "prompts.py"],
+              outputs=[FORMATTED_ARROW, FORMATTED_JSONL]),
+        Stage("fine_tune", run_fine_tune,
+              inputs=[FORMATTED_ARROW, SCRIPTS_DIR / "fine_tune.py", SCRIPTS_DIR / "training_data.py",
+                      SCRIPTS_DIR / "train_resources.py", SCRIPTS_DIR / "prompts.py"],
+              outputs=[ADAPTER_DIR],
+              # The RAM budget picks batch size, accumulation and checkpointing, so it changes the adapter
+              config={"train_ram_gb": os.environ.get("SLANG_TRAIN_RAM_GB") or None}),
+        # No outputs: the smoke-test translation runs every time it is reached
+        Stage("infer", run_infer, config={"sentence": "I am very excited about this new project."}),
+    ]
+
+
+# --- Runner ---
+
+def load_state():
+    return json.loads(STATE_PATH.read_text()) if STATE_PATH.is_file() else {}
+
+
+def save_state(state):
+    PIPELINE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    tmp.replace(STATE_PATH)
+
+
+def run_pipeline(stages, until=None, force=()):
+    """Runs the stages in order, skipping those whose fingerprint is unchanged."""
+    state = load_state()
+    for number, stage in enumerate(stages, 1):
+        print(f"--- Step {number}: {stage.name} ---")
+        missing = [p for p in stage.inputs if not p.exists()]
+        if missing:
+            raise FileNotFoundError(f"Stage '{stage.name}' is missing inputs: {', '.join(map(str, missing))}")
+
+        fingerprint = stage.fingerprint()
+        up_to_date = (
+            stage.outputs
+            and stage.name not in force
+            and state.get(stage.name, {}).get("fingerprint") == fingerprint
+            and all(p.exists() for p in stage.outputs)
+        )
+        if up_to_date:
+            print("Up to date, skipping.")
+        else:
+            started = time.perf_counter()
+            stage.run(stage)
+            not_written = [p for p in stage.outputs if not p.exists()]
+            if not_written:
+                raise RuntimeError(f"Stage '{stage.name}' did not write: {', '.join(map(str, not_written))}")
+            state[stage.name] = {"fingerprint": fingerprint, "seconds": round(time.perf_counter() - started, 3),
+                                 "finished": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            save_state(state)
+            print(f"{stage.name} complete in {state[stage.name]['seconds']}s.")
+
+        if stage.name == until:
+            break
+
+
+def main():
+    stages = build_stages()
+    names = [stage.name for stage in stages]
+    parser = argparse.ArgumentParser(description="Run the data and training pipeline incrementally.")
+    parser.add_argument("--until", choices=names, help="stop after this stage")
+    parser.add_argument("--force", nargs="+", choices=names, default=[], help="re-run these stages regardless")
+    args = parser.parse_args()
+    run_pipeline(stages, args.until, set(args.force))
+
+
 if __name__ == "__main__":
-    run_full_pipeline()
\ No newline at end of file
+    main()
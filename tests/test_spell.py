@@ -0,0 +1,72 @@
+"""
+Slang handling of the spelling corrector (Scriptss/spell.py).
+
+Run from the repo root:
+    python -m pytest tests
+"""
+import threading
+
+import pytest
+
+from Scriptss import spell
+from Scriptss.spell import SpellCorrector
+
+
+@pytest.fixture(scope="module")
+def corrector():
+    pytest.importorskip("textblob")
+    return SpellCorrector.build()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("i luv u", "i love you"),
+    ("lol thats gr8", "lol that's great"),
+    ("brb", "brb"),
+    ("omg idk tbh", "omg idk tbh"),
+    ("LOL", "LOL"),
+    ("Im so tired", "I'm so tired"),
+])
+def test_slang_is_kept_or_mapped(corrector, text, expected):
+    assert corrector.correct(text) == expected
+
+
+def test_typos_are_still_corrected(corrector):
+    assert corrector.correct("I like speling") == "I like spelling"
+
+
+def test_explicit_mapping_overrides_default():
+    pytest.importorskip("textblob")
+    corrector = SpellCorrector.build(mappings={"luv": "luv"})
+    assert corrector.correct("i luv u") == "i luv you"
+
+
+def test_never_corrects_to_a_fragment():
+    # TextBlob's word list has fragments such as "ll" (from "I'll") and "th" (from "5th")
+    corrector = SpellCorrector({"ll": 500, "th": 500, "lot": 1})
+    assert corrector.correct("lol") == "lot"
+    assert corrector.correct("tbh") == "tbh"
+
+
+def test_short_words_are_still_targets():
+    corrector = SpellCorrector({"is": 100})
+    assert corrector.correct("iss") == "is"
+
+
+def test_default_corrector_builds_once(monkeypatch, tmp_path):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return SpellCorrector({"word": 1})
+
+    monkeypatch.setattr(spell, "_default_corrector", None)
+    monkeypatch.setattr(SpellCorrector, "build", staticmethod(build))
+    monkeypatch.setenv("SLANG_SPELL_INDEX", str(tmp_path / "missing.pkl"))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(spell.default_corrector())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert all(result is results[0] for result in results)
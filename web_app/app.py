@@ -1,8 +1,34 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context, url_for
 import torch
-from transformers import pipeline
+from transformers import StoppingCriteriaList, pipeline
+from pathlib import Path
+import json
+import math
 import os
+import sys
+import threading
+import time
 import logging
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+# Make the shared Scriptss package importable when run as `python web_app/app.py`
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from Scriptss.batching import MicroBatcher, QueueFullError
+from Scriptss.engine import GenerationEngine, generation_settings
+from Scriptss.jobs import JobQueue, JobQueueFullError
+from Scriptss.metrics import (CONTENT_TYPE, TOKENS_GENERATED, Counter, Histogram, record, register_collector,
+                              render, span)
+from Scriptss.phrasebook import Phrasebook
+from Scriptss.profiler import MIN_INTERVAL, SamplingProfiler
+from Scriptss.prompts import build_prompt
+from Scriptss.quantize import load_quantized, quantize_model
+from Scriptss.result_cache import TranslationCache
+from Scriptss.snapshot import is_snapshot, load_snapshot
+from Scriptss.speculative import load_drafter
+from Scriptss.stopping import StoppingRules
+from Scriptss.spell import default_corrector
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -13,44 +39,435 @@ app = Flask(__name__)
 # Set Hugging Face token
 os.environ["HUGGINGFACE_HUB_TOKEN"] = "f_dHMvtQsUlDqCIBaWCSJfpgcsVwnVArbdQw"
 
+# Snapshot written by `python Scriptss/snapshot.py export`; memory-mapped when present
+SNAPSHOT_DIR = Path(os.environ.get('SLANG_SNAPSHOT_DIR', PROJECT_ROOT / 'models' / 'snapshot'))
+
+# A Hugging Face model ID or local directory (e.g. the benchmarks' tiny model)
+BASE_MODEL_NAME = os.environ.get('SLANG_MODEL', 'mistralai/Mistral-7B-Instruct-v0.2')
+
+# CPU weight quantization: "none", "int8" (dynamic) or "int4" (weight-only)
+QUANTIZE = os.environ.get('SLANG_QUANTIZE', 'none')
+
 # Global variable to store the model
 model_pipeline = None
+# Per-request token budget and sentence-boundary stop (SLANG_ADAPTIVE_LENGTH / SLANG_SENTENCE_STOP), built with the model
+stopping_rules = None
+model_lock = threading.Lock()
+
+# Startup configuration: load the model in the background when the server starts
+EAGER_LOAD = os.environ.get('SLANG_EAGER_LOAD', '1') == '1'
+WARMUP_REQUESTS = int(os.environ.get('SLANG_WARMUP_REQUESTS', 3))
+WARMUP_SENTENCES = [
+    "I would like to request your assistance",
+    "Please wait a moment",
+    "Thank you for your help",
+    "Could you please clarify this point",
+]
+
+# Progress reported by /ready; in lazy mode the model loads on the first request instead
+startup_state = {'status': 'not_started' if EAGER_LOAD else 'lazy', 'load_seconds': None, 'warmup_seconds': None,
+                 'startup_seconds': None, 'error': None}
+
+# Scheduling configuration: "continuous" (iteration-level engine) or "micro" (request batching)
+SCHEDULER = os.environ.get('SLANG_SCHEDULER', 'continuous')
+BATCH_MAX_SIZE = int(os.environ.get('SLANG_BATCH_MAX_SIZE', 8))
+BATCH_MAX_WAIT_MS = float(os.environ.get('SLANG_BATCH_MAX_WAIT_MS', 20))
+BATCH_QUEUE_SIZE = int(os.environ.get('SLANG_BATCH_QUEUE_SIZE', 64))
+REQUEST_TIMEOUT = float(os.environ.get('SLANG_REQUEST_TIMEOUT', 300))
+
+# Decode settings; SLANG_DO_SAMPLE=0 switches to greedy, deterministic (cacheable) output
+GENERATION_CONFIG = {
+    # Upper bound; each request's budget follows from its input length (see stopping.py)
+    'max_new_tokens': 50,
+    'do_sample': os.environ.get('SLANG_DO_SAMPLE', '1') == '1',
+    'temperature': 0.7,
+    'top_p': 0.9,
+}
+
+# Speculative decoding, continuous scheduler only: "none", "ngram" (drafts from our informal data)
+# or a small draft model sharing Mistral's tokenizer; the output distribution does not change
+SPECULATIVE = os.environ.get('SLANG_SPECULATIVE', 'none')
+DRAFT_TOKENS = int(os.environ.get('SLANG_DRAFT_TOKENS', 4))
+
+# Fix typos in incoming text before translating it (slang from our data is left alone)
+SPELLCHECK = os.environ.get('SLANG_SPELLCHECK', '0') == '1'
+
+# Repeated sentences are answered from here (see SLANG_CACHE_* in result_cache.py)
+translation_cache = TranslationCache.from_env()
+
+# Sentences (nearly) matching our curated pairs skip the model (see SLANG_PHRASEBOOK* in phrasebook.py)
+phrasebook = Phrasebook.from_env()
+
+# Async job API: worker threads feeding the scheduler, bounded queue, abandoned-job timeout
+JOB_WORKERS = int(os.environ.get('SLANG_JOB_WORKERS', BATCH_MAX_SIZE))
+JOB_QUEUE_SIZE = int(os.environ.get('SLANG_JOB_QUEUE_SIZE', 64))
+JOB_ABANDON_SECONDS = float(os.environ.get('SLANG_JOB_ABANDON_SECONDS', 60))
+JOB_RETENTION_SECONDS = float(os.environ.get('SLANG_JOB_RETENTION_SECONDS', 600))
+
+job_queue = None
+job_queue_lock = threading.Lock()
+
+# Scheduler that runs concurrent /translate requests together
+scheduler = None
+scheduler_lock = threading.Lock()
+
+# Instrumentation: /metrics in Prometheus format (SLANG_METRICS=0 stops recording),
+# one log line of stage timings per request with SLANG_TRACE=1
+TRACE = os.environ.get('SLANG_TRACE', '0') == '1'
+REQUESTS = Counter('slang_requests_total', 'Translation requests by endpoint, answer source and status.',
+                   ['endpoint', 'source', 'status'])
+REQUEST_SECONDS = Histogram('slang_request_seconds', 'Translation request latency.', ['endpoint', 'source'])
+
+# Sampling profiler started and stopped over HTTP; the endpoints answer 404 unless SLANG_PROFILER=1
+PROFILER = os.environ.get('SLANG_PROFILER', '0') == '1'
+profiler = SamplingProfiler()
 
 def load_model():
-    """Load the Mistral model for translation"""
-    global model_pipeline
+    """Load the Mistral model for translation (once, even with concurrent callers)"""
+    global model_pipeline, stopping_rules
     
+    with model_lock:
+        if model_pipeline is not None:
+            return
+        
+        started = time.perf_counter()
+        if is_snapshot(SNAPSHOT_DIR):
+            # Weights are mapped from disk, so pages load on demand and are shared across workers.
+            # A snapshot that fails to load is a deployment error: let it raise rather than
+            # quietly serving the fallback model instead
+            logger.info(f"Loading memory-mapped snapshot from {SNAPSHOT_DIR}...")
+            model, tokenizer = load_snapshot(SNAPSHOT_DIR)
+            model_pipeline = pipeline("text-generation", model=model, tokenizer=tokenizer)
+            logger.info("Model loaded successfully!")
+        else:
+            try:
+                if QUANTIZE != 'none':
+                    # Quantizing each layer as it is read never holds the whole float model,
+                    # which is what keeps int4 Mistral-7B inside the container's memory limit
+                    logger.info(f"Loading Mistral model with {QUANTIZE} weights...")
+                    model, tokenizer = load_quantized(BASE_MODEL_NAME, QUANTIZE)
+                    model_pipeline = pipeline("text-generation", model=model, tokenizer=tokenizer)
+                else:
+                    logger.info("Loading Mistral model...")
+                    model_pipeline = pipeline(
+                        "text-generation",
+                        model=BASE_MODEL_NAME,
+                        device=-1,  # Use CPU
+                        torch_dtype=torch.float16,
+                        max_length=512,
+                        do_sample=True,
+                        temperature=0.7,
+                        top_p=0.9,
+                    )
+                logger.info("Model loaded successfully!")
+            except Exception as e:
+                logger.error(f"Failed to load Mistral model: {e}")
+                # Fallback to smaller model
+                try:
+                    logger.info("Loading fallback model...")
+                    model_pipeline = pipeline(
+                        "text-generation",
+                        model="microsoft/DialoGPT-medium",
+                        device=-1,
+                        max_length=256,
+                        do_sample=True,
+                        temperature=0.7,
+                    )
+                    logger.info("Fallback model loaded!")
+                except Exception as e2:
+                    logger.error(f"Failed to load fallback model: {e2}")
+                    model_pipeline = None
+        
+        # Snapshots and the fallback model are quantized after loading; snapshot pages are
+        # mapped from disk, so only the quantized copy counts against memory
+        if model_pipeline is not None and QUANTIZE != 'none' and not hasattr(model_pipeline.model, 'quantization_mode'):
+            logger.info(f"Quantizing linear layers to {QUANTIZE}...")
+            model_pipeline.model = quantize_model(model_pipeline.model, QUANTIZE)
+        
+        if model_pipeline is not None:
+            # Batched generation pads on the left so new tokens line up at the end
+            tokenizer = model_pipeline.tokenizer
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            tokenizer.padding_side = "left"
+            stopping_rules = StoppingRules.from_env(tokenizer)
+        
+        record('model_load', time.perf_counter() - started)
+        startup_state['load_seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(f"metric model_load_seconds={startup_state['load_seconds']}")
+
+def warm_up():
+    """Run a few generations so allocator and kernel setup is paid before real traffic"""
+    started = time.perf_counter()
+    futures = [get_scheduler().submit(build_prompt(text)) for text in WARMUP_SENTENCES[:WARMUP_REQUESTS]]
+    for future in futures:
+        future.result(timeout=REQUEST_TIMEOUT)
+    record('warmup', time.perf_counter() - started)
+    startup_state['warmup_seconds'] = round(time.perf_counter() - started, 3)
+    logger.info(f"metric warmup_seconds={startup_state['warmup_seconds']} requests={len(futures)}")
+
+def startup():
+    """Load and warm up the model, recording progress for /ready"""
+    started = time.perf_counter()
+    try:
+        startup_state['status'] = 'loading'
+        load_model()
+        load_spellchecker()
+        if model_pipeline is None:
+            raise RuntimeError("No model could be loaded")
+        
+        startup_state['status'] = 'warming_up'
+        warm_up()
+        
+        startup_state['status'] = 'ready'
+    except Exception as e:
+        logger.error(f"Startup failed: {e}")
+        startup_state['status'] = 'failed'
+        startup_state['error'] = str(e)
+    startup_state['startup_seconds'] = round(time.perf_counter() - started, 3)
+    logger.info(f"metric startup_seconds={startup_state['startup_seconds']} status={startup_state['status']}")
+
+def load_spellchecker():
+    """Load the spelling index up front so the first request does not pay for it"""
+    if SPELLCHECK:
+        started = time.perf_counter()
+        default_corrector()
+        logger.info(f"metric spellcheck_load_seconds={round(time.perf_counter() - started, 3)}")
+
+def correct_input(formal_text, trace=None):
+    """Spell-correct incoming text when SLANG_SPELLCHECK is on"""
+    if not SPELLCHECK:
+        return formal_text
+    with span('spellcheck', trace):
+        return default_corrector().correct(formal_text)
+
+def lookup_phrasebook(formal_text, trace=None):
+    """The phrasebook's translation, or None (also when SLANG_PHRASEBOOK=none)"""
+    if phrasebook is None:
+        return None
+    with span('phrasebook', trace):
+        return phrasebook.lookup(formal_text)
+
+def lookup_cache(formal_text, trace=None):
+    """(generation settings, cached translation or None)"""
+    with span('cache_lookup', trace):
+        settings = generation_settings(model_pipeline.model, stopping=stopping_rules, **GENERATION_CONFIG)
+        return settings, translation_cache.get(formal_text, settings)
+
+def observe_request(endpoint, source, status, started, trace):
+    """Count a finished request, record its latency and, with SLANG_TRACE=1, log its stages"""
+    seconds = time.perf_counter() - started
+    REQUESTS.inc(endpoint=endpoint, source=source or 'none', status=status)
+    REQUEST_SECONDS.observe(seconds, endpoint=endpoint, source=source or 'none')
+    if TRACE:
+        stages = ' '.join(f"{stage}_ms={round(1000 * value, 2)}" for stage, value in trace.items())
+        logger.info(f"trace endpoint={endpoint} source={source} status={status} "
+                    f"total_ms={round(1000 * seconds, 2)} {stages}")
+
+def preload():
+    """Load the model in the gunicorn master so forked workers share its weights"""
+    startup_state['status'] = 'loading'
+    load_model()
+    load_spellchecker()
+    # Workers flip this to ready after their own warm-up
+    startup_state['status'] = 'not_started'
+
+def configure_worker(num_workers):
+    """Per-worker setup after fork: size the intra-op thread pool to this worker's share of cores"""
+    threads = int(os.environ.get('SLANG_TORCH_THREADS', 0)) or max(1, (os.cpu_count() or 1) // num_workers)
+    torch.set_num_threads(threads)
+    # Forked workers inherit the master's RNG state; reseed so they do not sample identically
+    torch.manual_seed(int.from_bytes(os.urandom(8), 'little'))
+    logger.info(f"Worker {os.getpid()}: {threads} intra-op threads")
+
+def process_memory():
+    """RSS and proportional (PSS) memory of this process; PSS splits shared pages between sharers"""
+    memory = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                field, _, value = line.partition(':')
+                if field in ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'):
+                    memory[field.lower() + '_mb'] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+def start_background_startup():
+    """Load the model in a background thread so the server can answer /health meanwhile"""
+    thread = threading.Thread(target=startup, name="model-startup", daemon=True)
+    thread.start()
+    return thread
+
+def generate_batch(prompts):
+    """Run one padded, batched generate call and return each prompt's translation"""
+    tokenizer = model_pipeline.tokenizer
+    with span('tokenize'):
+        inputs = tokenizer(prompts, return_tensors="pt", padding=True, add_special_tokens=False)
+        inputs = inputs.to(model_pipeline.model.device)
+
+    # Generation ends once every row reached its length budget, sentence end or </s>;
+    # rows that finished earlier are cut back to their own stop below
+    criteria, max_new_tokens = stopping_rules.criteria(
+        inputs["attention_mask"], GENERATION_CONFIG['max_new_tokens'], tokenizer.eos_token_id
+    )
+
+    with torch.no_grad(), span('generate'):
+        output_ids = model_pipeline.model.generate(
+            **inputs,
+            **{**GENERATION_CONFIG, 'max_new_tokens': max_new_tokens},
+            stopping_criteria=StoppingCriteriaList([criteria]),
+            pad_token_id=tokenizer.eos_token_id,
+        )
+
+    # Only decode the newly generated tokens, so there is no prompt echo to strip
+    new_tokens = criteria.truncate(output_ids[:, inputs["input_ids"].shape[1]:].tolist())
+    TOKENS_GENERATED.inc(sum(len(ids) for ids in new_tokens))
+    with span('detokenize'):
+        return [
+            tokenizer.decode(ids, skip_special_tokens=True).strip()
+            for ids in new_tokens
+        ]
+
+def get_scheduler():
+    """Create and start the request scheduler on first use"""
+    global scheduler
+
+    with scheduler_lock:
+        if scheduler is None:
+            scheduler = create_scheduler()
+        scheduler.start()
+    return scheduler
+
+def create_scheduler():
+    """Build the scheduler selected by SLANG_SCHEDULER"""
+    if SCHEDULER == 'micro':
+        return MicroBatcher(
+            generate_batch,
+            max_batch_size=BATCH_MAX_SIZE,
+            max_wait_ms=BATCH_MAX_WAIT_MS,
+            max_queue_size=BATCH_QUEUE_SIZE,
+        )
+    return GenerationEngine.from_pipeline(
+        model_pipeline,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_queue_size=BATCH_QUEUE_SIZE,
+        drafter=load_drafter(SPECULATIVE, model_pipeline.tokenizer),
+        num_draft_tokens=DRAFT_TOKENS,
+        stopping=stopping_rules,
+        **GENERATION_CONFIG,
+    )
+
+class ModelUnavailableError(RuntimeError):
+    """Neither the model nor the fallback model could be loaded"""
+
+def resolved(informal_text):
+    """A future that already holds its result"""
+    future = Future()
+    future.set_result(informal_text)
+    return future
+
+def submit_translation(formal_text, trace=None):
+    """Start a translation; returns (future, source)
+    
+    `source` is "phrasebook" or "cache" for answers that resolve immediately (the
+    phrasebook needs no model at all), else "model": the request is queued on the
+    scheduler, which runs it together with concurrent requests, and its result is
+    cached once it completes. Stage timings are added to the `trace` dict.
+    """
+    formal_text = correct_input(formal_text, trace)
+    informal_text = lookup_phrasebook(formal_text, trace)
+    if informal_text is not None:
+        return resolved(informal_text), 'phrasebook'
+    
+    if model_pipeline is None:
+        load_model()
     if model_pipeline is None:
+        raise ModelUnavailableError("Model not available")
+    
+    settings, informal_text = lookup_cache(formal_text, trace)
+    if informal_text is not None:
+        return resolved(informal_text), 'cache'
+    
+    return submit_to_model(formal_text, settings), 'model'
+
+def submit_to_model(formal_text, settings):
+    """Queue an already corrected, uncached text on the scheduler and cache its result"""
+    # Create prompt for Mistral
+    future = get_scheduler().submit(build_prompt(formal_text))
+    
+    def store(done):
+        if not done.cancelled() and done.exception() is None:
+            translation_cache.put(formal_text, settings, done.result())
+    
+    future.add_done_callback(store)
+    return future
+
+def stream_translation(formal_text, trace=None):
+    """Start a translation and return an iterator over its text as it is decoded
+    
+    Phrasebook and cache hits and the micro-batching scheduler (which only
+    produces whole outputs) yield the complete translation as a single piece.
+    Returns (pieces, source) like submit_translation.
+    """
+    corrected = correct_input(formal_text, trace)
+    informal_text = lookup_phrasebook(corrected, trace)
+    if informal_text is not None:
+        return iter([informal_text]), 'phrasebook'
+    
+    if model_pipeline is None:
+        load_model()
+    if model_pipeline is None:
+        raise ModelUnavailableError("Model not available")
+    
+    settings, informal_text = lookup_cache(corrected, trace)
+    if informal_text is not None:
+        return iter([informal_text]), 'cache'
+    
+    scheduler = get_scheduler()
+    if not isinstance(scheduler, GenerationEngine):
+        # Spellcheck, phrasebook and cache were already checked above
+        future = submit_to_model(corrected, settings)
+        
+        def whole():
+            yield future.result(timeout=REQUEST_TIMEOUT)
+        
+        return whole(), 'model'
+    
+    pieces = scheduler.stream(build_prompt(corrected), timeout=REQUEST_TIMEOUT)
+    
+    def collect():
+        parts = []
         try:
-            logger.info("Loading Mistral model...")
-            model_pipeline = pipeline(
-                "text-generation",
-                model="mistralai/Mistral-7B-Instruct-v0.2",
-                device=-1,  # Use CPU
-                torch_dtype=torch.float16,
-                max_length=512,
-                do_sample=True,
-                temperature=0.7,
-                top_p=0.9,
+            for piece in pieces:
+                parts.append(piece)
+                yield piece
+        finally:
+            # Closing early (client went away) cancels the sequence in the engine
+            pieces.close()
+        translation_cache.put(corrected, settings, ''.join(parts).strip())
+    
+    return collect(), 'model'
+
+def sse_event(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def get_job_queue():
+    """Create the async job queue on first use (after fork, so its threads live in the worker)"""
+    global job_queue
+    
+    with job_queue_lock:
+        if job_queue is None:
+            job_queue = JobQueue(
+                lambda text: submit_translation(text)[0],
+                max_workers=JOB_WORKERS,
+                max_pending=JOB_QUEUE_SIZE,
+                abandon_after=JOB_ABANDON_SECONDS,
+                retention=JOB_RETENTION_SECONDS,
+                timeout=REQUEST_TIMEOUT,
             )
-            logger.info("Model loaded successfully!")
-        except Exception as e:
-            logger.error(f"Failed to load Mistral model: {e}")
-            # Fallback to smaller model
-            try:
-                logger.info("Loading fallback model...")
-                model_pipeline = pipeline(
-                    "text-generation",
-                    model="microsoft/DialoGPT-medium",
-                    device=-1,
-                    max_length=256,
-                    do_sample=True,
-                    temperature=0.7,
-                )
-                logger.info("Fallback model loaded!")
-            except Exception as e2:
-                logger.error(f"Failed to load fallback model: {e2}")
-                model_pipeline = None
+    return job_queue
 
 @app.route('/')
 def index():
@@ -60,58 +477,262 @@ def index():
 @app.route('/translate', methods=['POST'])
 def translate():
     """Translate formal text to informal"""
+    started = time.perf_counter()
+    trace = {}
+    source, status = None, 'error'
     try:
-        data = request.get_json()
-        formal_text = data.get('text', '').strip()
+        with span('parse', trace):
+            data = request.get_json()
+            formal_text = data.get('text', '').strip()
         
         if not formal_text:
+            status = 'invalid'
             return jsonify({'error': 'Please enter some text'}), 400
         
-        if model_pipeline is None:
-            load_model()
-        
-        if model_pipeline is None:
-            return jsonify({'error': 'Model not available'}), 500
-        
-        # Create prompt for Mistral
-        prompt = f"<s>[INST] Translate the following formal English sentence to informal slang: {formal_text} [/INST]"
-        
-        # Generate translation
-        result = model_pipeline(
-            prompt, 
-            max_new_tokens=50, 
-            pad_token_id=model_pipeline.tokenizer.eos_token_id
-        )
-        
-        # Extract response
-        generated_text = result[0]['generated_text']
-        informal_text = generated_text.replace(prompt, "").strip()
-        
-        # Clean up response
-        if informal_text.endswith("</s>"):
-            informal_text = informal_text[:-4].strip()
+        try:
+            future, source = submit_translation(formal_text, trace)
+        except QueueFullError as e:
+            status = 'rejected'
+            return jsonify({'error': str(e)}), 503
+        except ModelUnavailableError as e:
+            return jsonify({'error': str(e)}), 500
+        try:
+            with span('wait', trace):
+                informal_text = future.result(timeout=REQUEST_TIMEOUT)
+        except FutureTimeoutError:
+            # Free the batch slot too: nobody will read this translation any more
+            getattr(future, 'cancel_generation', future.cancel)()
+            status = 'timeout'
+            return jsonify({'error': f'Translation timed out after {REQUEST_TIMEOUT:g}s'}), 504
+        # The engine's own stages: queue_wait, tokenize, prefill, decode, detokenize
+        trace.update(getattr(future, 'timings', {}))
         
+        status = 'ok'
         return jsonify({
             'formal': formal_text,
             'informal': informal_text,
+            'cached': source == 'cache',
+            'source': source,
+            # Acceptance rate and tokens per forward pass when SLANG_SPECULATIVE is on
+            'speculation': getattr(future, 'speculation', None),
+            # Queue wait plus prefill, for model answers from the continuous scheduler
+            'time_to_first_token_ms': (round(1000 * future.time_to_first_token, 1)
+                                       if hasattr(future, 'time_to_first_token') else None),
             'success': True
         })
         
     except Exception as e:
         logger.error(f"Translation error: {e}")
         return jsonify({'error': f'Translation failed: {str(e)}'}), 500
+    finally:
+        observe_request('/translate', source, status, started, trace)
+
+@app.route('/translate/stream', methods=['POST'])
+def translate_stream():
+    """Translate formal text to informal, streaming tokens as server-sent events
+    
+    Emits `token` events with each new piece of text, then one `done` event
+    with the full translation (or an `error` event).
+    """
+    started = time.perf_counter()
+    trace = {}
+    with span('parse', trace):
+        data = request.get_json(silent=True) or {}
+        formal_text = data.get('text', '').strip()
+    
+    if not formal_text:
+        observe_request('/translate/stream', None, 'invalid', started, trace)
+        return jsonify({'error': 'Please enter some text'}), 400
+    
+    try:
+        pieces, source = stream_translation(formal_text, trace)
+    except QueueFullError as e:
+        observe_request('/translate/stream', None, 'rejected', started, trace)
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.error(f"Translation error: {e}")
+        observe_request('/translate/stream', None, 'error', started, trace)
+        return jsonify({'error': f'Translation failed: {str(e)}'}), 500
+    
+    def events():
+        first_token_ms = None
+        parts = []
+        # Stays 'cancelled' if the client goes away mid-stream
+        status = 'cancelled'
+        try:
+            for piece in pieces:
+                if first_token_ms is None:
+                    first_token_ms = round(1000 * (time.perf_counter() - started), 1)
+                    logger.info(f"metric time_to_first_token_ms={first_token_ms} source={source}")
+                    trace['first_token'] = first_token_ms / 1000
+                parts.append(piece)
+                yield sse_event('token', {'token': piece})
+            status = 'ok'
+        except Exception as e:
+            status = 'error'
+            logger.error(f"Translation error: {e}")
+            yield sse_event('error', {'error': f'Translation failed: {str(e)}'})
+            return
+        finally:
+            observe_request('/translate/stream', source, status, started, trace)
+        yield sse_event('done', {
+            'formal': formal_text,
+            'informal': ''.join(parts).strip(),
+            'cached': source == 'cache',
+            'source': source,
+            'time_to_first_token_ms': first_token_ms,
+            'total_ms': round(1000 * (time.perf_counter() - started), 1),
+            'success': True
+        })
+    
+    # Disable proxy buffering so each event reaches the browser as soon as it is written
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue a translation and return its job ID immediately"""
+    data = request.get_json(silent=True) or {}
+    formal_text = data.get('text', '').strip()
+    
+    if not formal_text:
+        return jsonify({'error': 'Please enter some text'}), 400
+    
+    try:
+        job = get_job_queue().submit(formal_text)
+    except JobQueueFullError as e:
+        response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    
+    response = jsonify({**job.to_dict(), 'status_url': url_for('get_job', job_id=job.id)})
+    response.headers['Location'] = url_for('get_job', job_id=job.id)
+    return response, 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll a job's status and result; polling also keeps the job alive"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
 
 @app.route('/health')
 def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'model_loaded': model_pipeline is not None})
 
+@app.route('/ready')
+def ready():
+    """Readiness endpoint: 200 once the model is loaded and warmed up, 503 before"""
+    status_code = 200 if startup_state['status'] in ('ready', 'lazy') else 503
+    return jsonify({**startup_state, 'ready': status_code == 200}), status_code
+
+@app.route('/stats')
+def stats():
+    """Scheduler and cache statistics: batch fill, slot occupancy, queue wait, cache and phrasebook hits"""
+    if scheduler is None:
+        return jsonify({'scheduler': SCHEDULER, 'batching': None, 'cache': translation_cache.stats(),
+                        'phrasebook': phrasebook.stats() if phrasebook else None,
+                        'jobs': job_queue.stats() if job_queue else None,
+                        'process': {'pid': os.getpid(), **process_memory()}})
+    if isinstance(scheduler, MicroBatcher):
+        batching = {
+            **scheduler.stats.snapshot(),
+            'queue_depth': scheduler.queue.qsize(),
+            'max_wait_ms': BATCH_MAX_WAIT_MS,
+        }
+    else:
+        batching = scheduler.stats()
+    batching.update({'max_batch_size': BATCH_MAX_SIZE, 'max_queue_size': BATCH_QUEUE_SIZE})
+    return jsonify({'scheduler': SCHEDULER, 'batching': batching, 'cache': translation_cache.stats(),
+                    'phrasebook': phrasebook.stats() if phrasebook else None,
+                    'jobs': job_queue.stats() if job_queue else None,
+                    'process': {'pid': os.getpid(), **process_memory()}})
+
+def collect_metrics():
+    """Model, cache, phrasebook, scheduler and memory figures read from their own stats at scrape time"""
+    families = [('slang_model_loaded', 'gauge', 'Whether the model is loaded.',
+                 [({}, int(model_pipeline is not None))])]
+    for key, name in (('load_seconds', 'slang_model_load_seconds'), ('warmup_seconds', 'slang_warmup_seconds'),
+                      ('startup_seconds', 'slang_startup_seconds')):
+        if startup_state[key] is not None:
+            families.append((name, 'gauge', f"Seconds taken by startup step {key[:-len('_seconds')]}.",
+                             [({}, startup_state[key])]))
+    
+    cache = translation_cache.stats()
+    families += [
+        ('slang_cache_hits_total', 'counter', 'Result cache hits.', [({}, cache['hits'])]),
+        ('slang_cache_misses_total', 'counter', 'Result cache misses.', [({}, cache['misses'])]),
+        ('slang_cache_entries', 'gauge', 'Translations in the in-memory result cache.', [({}, cache['entries'])]),
+    ]
+    if phrasebook is not None:
+        book = phrasebook.stats()
+        families += [
+            ('slang_phrasebook_hits_total', 'counter', 'Phrasebook answers by match kind.',
+             [({'match': 'exact'}, book['exact_hits']), ({'match': 'near'}, book['near_hits'])]),
+            ('slang_phrasebook_misses_total', 'counter', 'Phrasebook lookups passed on to the model.',
+             [({}, book['misses'])]),
+        ]
+    if scheduler is not None:
+        running = scheduler.stats()['running'] if isinstance(scheduler, GenerationEngine) else 0
+        families += [
+            ('slang_queue_depth', 'gauge', 'Requests waiting for the scheduler.', [({}, scheduler.queue.qsize())]),
+            ('slang_running_sequences', 'gauge', 'Sequences being decoded (continuous scheduler).',
+             [({}, running)]),
+        ]
+    memory = process_memory()
+    if 'rss_mb' in memory:
+        families.append(('process_resident_memory_bytes', 'gauge', 'Resident memory of this process.',
+                         [({}, int(memory['rss_mb'] * 1024 * 1024))]))
+    return families
+
+register_collector(collect_metrics)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics: request latency, per-stage timings, tokens, queue wait, model load, cache hits"""
+    return Response(render(), content_type=CONTENT_TYPE)
+
+@app.route('/profiler/start', methods=['POST'])
+def start_profiler():
+    """Start the sampling profiler; optional JSON body {"interval_ms": 5}"""
+    if not PROFILER:
+        return jsonify({'error': 'Profiler is disabled (set SLANG_PROFILER=1)'}), 404
+    data = request.get_json(silent=True) or {}
+    interval_ms = data.get('interval_ms', 5)
+    if isinstance(interval_ms, bool) or not isinstance(interval_ms, (int, float)) \
+            or not math.isfinite(interval_ms) or interval_ms < 1000 * MIN_INTERVAL:
+        return jsonify({'error': f'interval_ms must be a number of at least {1000 * MIN_INTERVAL:g}'}), 400
+    if not profiler.start(interval_ms / 1000):
+        return jsonify({'error': 'Profiler is already running', **profiler.status()}), 409
+    return jsonify(profiler.status())
+
+@app.route('/profiler/stop', methods=['POST'])
+def stop_profiler():
+    """Stop the sampling profiler and return its samples as folded stacks (for flamegraph tools)"""
+    if not PROFILER:
+        return jsonify({'error': 'Profiler is disabled (set SLANG_PROFILER=1)'}), 404
+    folded, samples, seconds = profiler.stop()
+    return Response(folded, mimetype='text/plain',
+                    headers={'X-Profile-Samples': str(samples), 'X-Profile-Seconds': f"{seconds:.3f}"})
+
 if __name__ == '__main__':
     # Get port from environment variable (Docker/Cloud requirement)
     port = int(os.environ.get('PORT', 5001))
     
-    # Load model on startup (commented out for faster startup)
-    # load_model()
+    # Development server; use `gunicorn --config web_app/gunicorn.conf.py` for production
+    # Load and warm up the model in the background; /ready reports when it is done
+    if EAGER_LOAD:
+        start_background_startup()
     
     # Run the app
     app.run(debug=False, host='0.0.0.0', port=port)
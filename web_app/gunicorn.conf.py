@@ -0,0 +1,43 @@
+"""
+Gunicorn config for production serving.
+
+The model is loaded once in the master process (preload) and workers are
+forked from it, so the read-only weights are shared copy-on-write instead of
+being loaded N times. Each worker gets its own intra-op thread pool; size
+SLANG_WORKERS x SLANG_TORCH_THREADS to the host's physical cores.
+
+Run from the project root:
+    gunicorn --config web_app/gunicorn.conf.py
+"""
+import gc
+import os
+
+pythonpath = "web_app"
+wsgi_app = "app:app"
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Worker processes, each with a pool of HTTP threads feeding its generation engine
+workers = int(os.environ.get("SLANG_WORKERS", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("SLANG_HTTP_THREADS", 16))
+timeout = 120
+graceful_timeout = 30
+
+# Load the app (and the model) in the master before forking
+preload_app = True
+
+
+def when_ready(server):
+    import app
+
+    app.preload()
+    # Move everything allocated so far out of the GC's reach, so collections
+    # in the workers do not write to (and un-share) these pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app
+
+    app.configure_worker(workers)
+    app.start_background_startup()